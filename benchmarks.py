@@ -0,0 +1,290 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Measures what the intercooler_helpers middleware costs per request, using
+RequestFactory rather than a server.
+
+Usage::
+
+    python benchmarks.py               # run everything, print a report
+    python benchmarks.py polling form  # only run scenarios matching these
+    python benchmarks.py --save        # store the results as the baseline
+    python benchmarks.py --check       # exit 1 if anything regressed
+
+Baselines are stored in ``benchmarks.json``. Timings are compared relative to
+a calibration loop run on the same machine, so that a baseline saved on one
+machine is still roughly comparable on another.
+"""
+from __future__ import absolute_import, division, print_function
+import argparse
+import gc
+import json
+import os
+import sys
+import timeit
+sys.dont_write_bytecode = True
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_settings")
+
+import django
+if hasattr(django, 'setup'):
+    django.setup()
+
+from django.http import HttpResponse
+from django.shortcuts import redirect
+from django.test import RequestFactory
+
+from intercooler_helpers.middleware import (HttpMethodOverride,
+                                            IntercoolerData,
+                                            IntercoolerRedirector)
+
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+BASELINE = os.path.join(HERE, 'benchmarks.json')
+MIDDLEWARE = (HttpMethodOverride, IntercoolerData, IntercoolerRedirector)
+IC_HEADERS = {
+    'HTTP_X_IC_REQUEST': 'true',
+    'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest',
+}
+IC_DATA = {
+    'ic-id': '42',
+    'ic-request': 'true',
+    'ic-element-id': 'poller',
+    'ic-target-id': 'poller',
+    'ic-current-url': '/polling/',
+}
+
+rf = RequestFactory()
+SCENARIOS = []
+
+
+def scenario(name, weight=1.0):
+    """
+    Registers a function returning a ``(make_request, make_response, view)``
+    triple. ``view`` is given the request and the pre-built response, so that
+    constructing responses isn't counted as middleware time.
+
+    ``weight`` scales ``--number`` down for expensive scenarios.
+    """
+    def decorator(func):
+        SCENARIOS.append((name, weight, func))
+        return func
+    return decorator
+
+
+def build(view):
+    """
+    Chains the middleware together the way Django's handler does, so that
+    requests go through each middleware's ``__call__``. Before Django 1.10
+    there is no ``__call__``, so the handler's calls to ``process_request``
+    and ``process_response`` are approximated instead.
+    """
+    def get_response(request):
+        return view(request, request.benchmark_response)
+
+    if django.VERSION >= (1, 10):
+        handler = get_response
+        for cls in reversed(MIDDLEWARE):
+            handler = cls(handler)
+        return handler
+    middleware = [cls() for cls in MIDDLEWARE]
+
+    def handler(request):
+        for mw in middleware:
+            if hasattr(mw, 'process_request'):
+                mw.process_request(request)
+        response = get_response(request)
+        for mw in reversed(middleware):
+            if hasattr(mw, 'process_response'):
+                response = mw.process_response(request, response)
+        return response
+    return handler
+
+
+def ok():
+    return HttpResponse('ok')
+
+
+def passthrough(request, response):
+    return response
+
+
+def reads_intercooler_data(request, response):
+    if request.is_intercooler():
+        data = request.intercooler_data
+        data.id, data.target_id, data.element, data.url.match
+    return response
+
+
+@scenario('plain GET')
+def plain_get():
+    return (lambda: rf.get('/'), ok, passthrough)
+
+
+@scenario('IC GET polling')
+def ic_polling():
+    return (lambda: rf.get('/polling/', data=IC_DATA, **IC_HEADERS),
+            ok, reads_intercooler_data)
+
+
+@scenario('IC POST large form', weight=0.02)
+def ic_post_large_form():
+    data = dict(IC_DATA)
+    data.update(('field_{}'.format(i), 'value') for i in range(500))
+    return (lambda: rf.post('/form/', data=data, **IC_HEADERS),
+            ok, reads_intercooler_data)
+
+
+@scenario('method override querystring')
+def method_override_querystring():
+    return (lambda: rf.post('/?_method=PUT', **IC_HEADERS), ok, passthrough)
+
+
+@scenario('method override header')
+def method_override_header():
+    return (lambda: rf.post('/', HTTP_X_HTTP_METHOD_OVERRIDE='DELETE',
+                            **IC_HEADERS), ok, passthrough)
+
+
+@scenario('IC redirect')
+def ic_redirect():
+    return (lambda: rf.post('/form/', data=IC_DATA, **IC_HEADERS),
+            lambda: redirect('/redirector/redirected/'), passthrough)
+
+
+def measure(make_request, make_response, view, number, repeat):
+    handler = build(view)
+
+    def prepare():
+        # Building requests and responses is the test's cost, not the
+        # middleware's, so do it ahead of time.
+        requests = []
+        for _ in range(number):
+            request = make_request()
+            request.benchmark_response = make_response()
+            requests.append(request)
+        return requests
+
+    timings = []
+    for _ in range(repeat):
+        requests = prepare()
+        gc.collect()
+        start = timeit.default_timer()
+        for request in requests:
+            handler(request)
+        timings.append(timeit.default_timer() - start)
+    result = {'ns': min(timings) * 1e9 / number}
+    if tracemalloc is not None:
+        # Count what is left hanging off the requests (or anywhere else)
+        # once they've been through the middleware.
+        requests = prepare()
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for request in requests:
+            handler(request)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        stats = after.compare_to(before, 'filename')
+        result['blocks'] = sum(s.count_diff for s in stats) / number
+        result['bytes'] = sum(s.size_diff for s in stats) / number
+    return result
+
+
+CALIBRATION = 'calibration'
+
+
+def calibrate(number, repeat):
+    """
+    How long building a request and a response takes on this machine, which
+    the middleware timings are compared relative to.
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = timeit.default_timer()
+        for _ in range(number):
+            rf.get('/polling/', data=IC_DATA, **IC_HEADERS)
+            ok()
+        timings.append(timeit.default_timer() - start)
+    return {'ns': min(timings) * 1e9 / number}
+
+
+def change(result, calibration, baseline, name):
+    """
+    How much slower (or faster, if negative) ``result`` is than the
+    baseline for ``name``, after allowing for how much faster or slower this
+    machine is than the one the baseline was saved on.
+    """
+    scale = 1.0
+    if CALIBRATION in baseline:
+        scale = calibration['ns'] / baseline[CALIBRATION]['ns']
+    return result['ns'] / (baseline[name]['ns'] * scale) - 1
+
+
+def load_baseline():
+    if not os.path.isfile(BASELINE):
+        return {}
+    with open(BASELINE) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('names', nargs='*',
+                        help="only run scenarios containing these strings")
+    parser.add_argument('--number', type=int, default=2000,
+                        help="requests per timing round")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="timing rounds; the fastest is reported")
+    parser.add_argument('--save', action='store_true',
+                        help="store the results in {}".format(BASELINE))
+    parser.add_argument('--check', action='store_true',
+                        help="exit 1 if any scenario is slower than the "
+                             "baseline by more than --tolerance, relative "
+                             "to the calibration loop")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown as a fraction (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline()
+    calibration = calibrate(args.number, args.repeat)
+    results = {CALIBRATION: calibration}
+    regressions = []
+    row = "{name:<32} {ns:>12} {blocks:>9} {bytes:>10} {change:>9}"
+    print(row.format(name='scenario', ns='ns/request', blocks='blocks/req',
+                     bytes='bytes/req', change='vs base'))
+    for name, weight, setup in SCENARIOS:
+        if args.names and not any(n in name for n in args.names):
+            continue
+        number = max(1, int(args.number * weight))
+        result = measure(*setup(), number=number, repeat=args.repeat)
+        results[name] = result
+        ratio = ''
+        if name in baseline:
+            ratio = change(result, calibration, baseline, name)
+            if ratio > args.tolerance:
+                regressions.append(name)
+            ratio = '{:+.1%}'.format(ratio)
+        print(row.format(name=name, ns='{:.0f}'.format(result['ns']),
+                         blocks='{:.1f}'.format(result.get('blocks', 0)),
+                         bytes='{:.0f}'.format(result.get('bytes', 0)),
+                         change=ratio))
+    if args.save:
+        baseline.update(results)
+        with open(BASELINE, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if args.check and regressions:
+        print("Regressed by more than {:.0%}: {}".format(
+            args.tolerance, ", ".join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compares the middleware running directly on the event loop against Django's
+default async handling (a sync_to_async thread hop per hook), with an async
+view, as it would be under ASGI.
+
+Needs Python 3.7+ and Django 3.1+::
+
+    python benchmarks_asgi.py
+    python benchmarks_asgi.py --number 5000 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import timeit
+sys.dont_write_bytecode = True
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_settings")
+
+import django
+if django.VERSION < (3, 1):
+    sys.stdout.write("Async middleware needs Django 3.1+\n")
+    sys.exit(1)
+django.setup()
+
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory
+from django.utils.deprecation import MiddlewareMixin
+
+from intercooler_helpers.middleware import (HttpMethodOverride,
+                                            IntercoolerData,
+                                            IntercoolerRedirector)
+
+
+INLINE = (HttpMethodOverride, IntercoolerData, IntercoolerRedirector)
+THREADED = tuple(type(str('Threaded{}'.format(cls.__name__)), (cls,),
+                      {'__acall__': MiddlewareMixin.__acall__})
+                 for cls in INLINE)
+
+arf = AsyncRequestFactory()
+
+
+async def view(request):
+    request.is_intercooler() and request.intercooler_data.id
+    return HttpResponse('ok')
+
+
+def build(classes):
+    handler = view
+    for cls in reversed(classes):
+        handler = cls(handler)
+    return handler
+
+
+def make_request(ic_id):
+    request = arf.get('/polling/', data={'ic-id': ic_id,
+                                         'ic-target-id': 'poller'})
+    request.META.update(HTTP_X_IC_REQUEST='true',
+                        HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    return request
+
+
+async def run(handler, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(request):
+        async with semaphore:
+            start = timeit.default_timer()
+            await handler(request)
+            return timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    latencies = await asyncio.gather(*(one(r) for r in requests))
+    return timeit.default_timer() - start, sorted(latencies)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--number', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    row = "{name:<10} {rps:>12} {p50:>12} {p99:>12}"
+    print(row.format(name='mode', rps='requests/s', p50='p50 us',
+                     p99='p99 us'))
+    for name, classes in (('threaded', THREADED), ('inline', INLINE)):
+        handler = build(classes)
+        best = None
+        for _ in range(args.repeat):
+            requests = [make_request(i) for i in range(args.number)]
+            result = asyncio.run(run(handler, requests, args.concurrency))
+            if best is None or result[0] < best[0]:
+                best = result
+        elapsed, latencies = best
+        print(row.format(
+            name=name, rps='{:.0f}'.format(args.number / elapsed),
+            p50='{:.0f}'.format(latencies[len(latencies) // 2] * 1e6),
+            p99='{:.0f}'.format(latencies[int(len(latencies) * 0.99)] * 1e6)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
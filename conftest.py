@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 import os
+import sys
+
+# async/await is a syntax error before Python 3.5.
+collect_ignore = []
+if sys.version_info < (3, 5):
+    collect_ignore.append(os.path.join('intercooler_helpers', 'tests',
+                                       'test_async_middleware.py'))
+
 
 def pytest_configure():
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_settings")
     import django
     from django.conf import settings
-    if settings.configured and hasattr(django, 'setup'):
+    # Touching a setting forces the lazy settings to be configured, so that
+    # the app registry is ready for tests which load templates.
+    if settings.INSTALLED_APPS and hasattr(django, 'setup'):
         django.setup()
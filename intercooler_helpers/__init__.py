@@ -7,5 +7,14 @@ __version__ = '0.2.0'
 version = '0.2.0'
 VERSION = '0.2.0'
 
+try:
+    import django
+except ImportError:  # pragma: no cover
+    pass
+else:
+    # Django 3.2+ finds the AppConfig by itself.
+    if django.VERSION < (3, 2):
+        default_app_config = 'intercooler_helpers.apps.IntercoolerHelpersConfig'
+
 def get_version():
     return version  # pragma: no cover
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Only importable on Python 3.6+, as it uses async/await syntax and
+asynchronous generators.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import asyncio
+
+
+async def acall_inline(middleware, request):
+    """
+    The same as ``MiddlewareMixin.__acall__`` on Django 3.1+, except that
+    ``process_request`` and ``process_response`` are called directly on the
+    event loop, rather than via ``sync_to_async``, which costs a thread hop
+    each. Only suitable for middleware whose hooks never block.
+    """
+    response = None
+    if hasattr(middleware, 'process_request'):
+        response = middleware.process_request(request)
+    response = response or await middleware.get_response(request)
+    if hasattr(middleware, 'process_response'):
+        response = middleware.process_response(request, response)
+    return response
+
+
+async def local_alisten(broker, channel, last_id, timeout=None):
+    """
+    ``LocalBroker.listen`` for the event loop: waiting for events is done
+    with an ``asyncio`` future which ``publish`` (from any thread) resolves,
+    so a waiting client doesn't hold on to a thread.
+    """
+    loop = asyncio.get_event_loop()
+    if timeout is not None:
+        deadline = loop.time() + timeout
+    while True:
+        with broker._condition:
+            events = broker._after(channel, last_id)
+            if events or timeout is None:
+                return events
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return events
+            waiter = (loop, loop.create_future())
+            broker._waiters.setdefault(channel, set()).add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], remaining)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with broker._condition:
+                waiters = broker._waiters.get(channel)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del broker._waiters[channel]
+
+
+async def local_alatest_id(broker, channel):
+    return broker.latest_id(channel)
+
+
+async def _broker_call(broker, name, *args, **kwargs):
+    # Brokers without an async version of a method have the blocking one
+    # run in a thread instead.
+    method = getattr(broker, 'a' + name, None)
+    if method is not None:
+        return await method(*args, **kwargs)
+    from asgiref.sync import sync_to_async
+    method = sync_to_async(getattr(broker, name), thread_sensitive=False)
+    return await method(*args, **kwargs)
+
+
+async def astream(broker, channel, last_id, heartbeat, retry, max_duration):
+    """
+    The asynchronous version of ``intercooler_helpers.sse._stream``.
+    """
+    from .sse import format_event
+    if retry is not None:
+        yield format_event(retry=retry)
+    loop = asyncio.get_event_loop()
+    if max_duration is not None:
+        deadline = loop.time() + max_duration
+    while True:
+        events = await _broker_call(broker, 'listen', channel, last_id,
+                                    timeout=heartbeat)
+        if events:
+            for event in events:
+                yield format_event(event.data, event=event.event, id=event.id)
+            last_id = events[-1].id
+        else:
+            yield ':\n\n'
+        if max_duration is not None and loop.time() >= deadline:
+            return
+
+
+async def aevent_stream(request, channel, broker=None, heartbeat=15,
+                        retry=None, max_duration=None):
+    """
+    The asynchronous version of ``intercooler_helpers.sse.event_stream``.
+    """
+    from .sse import _event_stream_response, _last_event_id, get_broker
+    if broker is None:
+        broker = get_broker()
+    last_id = _last_event_id(request)
+    if last_id is None:
+        last_id = await _broker_call(broker, 'latest_id', channel)
+    return _event_stream_response(
+        astream(broker, channel, last_id, heartbeat, retry, max_duration))
+
+
+async def event_stream_aget(view, request, *args, **kwargs):
+    """
+    ``AsyncEventStreamView.get``.
+    """
+    return await aevent_stream(request, view.get_channel(),
+                               heartbeat=view.heartbeat, retry=view.retry,
+                               max_duration=view.max_duration)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import logging
+from threading import Lock
+
+from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+
+
+__all__ = ['IntercoolerHelpersConfig']
+
+
+logger = logging.getLogger('intercooler_helpers')
+
+_WARM_UP_UID = 'intercooler_helpers.apps.warm_up'
+_warm_up_lock = Lock()
+
+
+def _warm_up(**kwargs):
+    with _warm_up_lock:
+        # Only once per process.
+        if not request_started.disconnect(dispatch_uid=_WARM_UP_UID):
+            return
+        from .warmup import warm_up
+        report = warm_up()
+    logger.info("Warmed up %d templates and %d URLs in %.1fms",
+                len(report.templates), len(report.urls),
+                sum(report.timings.values()) * 1000)
+    for name, error in report.errors:
+        logger.warning("Couldn't compile %s: %s", name, error)
+
+
+class IntercoolerHelpersConfig(AppConfig):
+    name = 'intercooler_helpers'
+    verbose_name = 'Intercooler.js helpers'
+
+    def ready(self):
+        # Off by default, as ready() runs for every management command too.
+        if not getattr(settings, 'INTERCOOLER_HELPERS_WARM_UP', False):
+            return
+        # Importing the URLconf while apps are still loading would build it
+        # before they're all ready (eg: before admin's autodiscovery), so
+        # wait for the first request instead.
+        request_started.connect(_warm_up, dispatch_uid=_WARM_UP_UID,
+                                weak=False)
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import copy
+import json
+import logging
+import sys
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import close_old_connections
+from django.http import (Http404, HttpResponseBadRequest, JsonResponse,
+                         QueryDict)
+from django.utils.datastructures import MultiValueDict
+from django.utils.encoding import force_bytes, force_text
+from django.views.generic import View
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # Python 2 without the futures backport
+    ThreadPoolExecutor = None
+try:
+    from urllib.parse import urlsplit
+except ImportError:  # Python 2
+    from urlparse import urlsplit
+
+from .headers import _set_current_request, current_request
+from .middleware import IntercoolerRequestMixin, _intercooler_request_class
+from .resolver import cached_resolve
+from .scope import in_scope
+
+
+__all__ = ['SubRequestError', 'clone_request', 'dispatch_subrequest',
+           'BatchView']
+
+
+logger = logging.getLogger('django.request')
+
+
+# Attributes of the outer request which only describe it, rather than the
+# client making it (eg: request.user, request.session), and so mustn't leak
+# into the sub-requests.
+_PER_REQUEST_ATTRIBUTES = frozenset((
+    'GET', '_post', '_files', '_body', '_stream', '_read_started',
+    'resolver_match', 'content_type', 'content_params', 'changed_method',
+    'original_method', 'intercooler_data', '_processed_intercooler_data',
+    '_is_intercooler_request', 'intercooler_headers',
+    '_intercooler_polling_started', '_intercooler_coalescing',
+    '_load_post_and_files', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'HEAD',
+    '_intercooler_in_scope', 'is_intercooler', 'maybe_intercooler',
+))
+
+_BODY_META = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_CONTENT_TYPE',
+              'HTTP_CONTENT_LENGTH', 'wsgi.input')
+
+# Besides X-IC-*, the only headers a batch may set for its sub-requests.
+# Anything else (eg: Host, Cookie, Authorization, X-Forwarded-For) would let
+# the client pass itself off as someone, or somewhere, else.
+_ALLOWED_HEADERS = frozenset(('HTTP_ACCEPT', 'HTTP_ACCEPT_LANGUAGE',
+                              'HTTP_X_REQUESTED_WITH'))
+
+
+class SubRequestError(ValueError):
+    pass
+
+
+def clone_request(request, url, method='GET', data=None, headers=None):
+    """
+    A copy of ``request`` for ``url``, sharing its user, session and cookies,
+    but with its own ``GET``/``POST`` data, and so its own
+    ``intercooler_data``. ``data`` is urlencoded into the body for anything
+    other than ``GET`` and ``HEAD``. ``headers`` (eg: ``X-IC-Request``)
+    replace those of ``request``, and may only be ``X-IC-*``, ``Accept``,
+    ``Accept-Language`` or ``X-Requested-With``.
+    """
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path.startswith('/'):
+        raise SubRequestError("{url!r} is not a local path".format(url=url))
+    method = method.upper()
+    query = parts.query
+    body = b''
+    if data:
+        encoded = QueryDict('', mutable=True, encoding=request.encoding)
+        for key, value in data.items():
+            encoded.setlist(key, value if isinstance(value, list)
+                            else [value])
+        if method in ('GET', 'HEAD'):
+            query = '&'.join(part for part in (query, encoded.urlencode())
+                             if part)
+        else:
+            body = force_bytes(encoded.urlencode())
+
+    clone = copy.copy(request)
+    for attribute in _PER_REQUEST_ATTRIBUTES.intersection(clone.__dict__):
+        del clone.__dict__[attribute]
+    meta = dict((key, value) for key, value in request.META.items()
+                if key not in _BODY_META and not key.startswith('HTTP_X_IC_'))
+    for header, value in (headers or {}).items():
+        key = header.upper().replace('-', '_')
+        if not key.startswith('HTTP_'):
+            key = 'HTTP_' + key
+        if key not in _ALLOWED_HEADERS and not key.startswith('HTTP_X_IC_'):
+            raise SubRequestError("{header!s} may not be set".format(
+                header=header))
+        meta[key] = value
+    meta.update(REQUEST_METHOD=method, PATH_INFO=parts.path,
+                QUERY_STRING=query)
+    if body:
+        meta.update(CONTENT_TYPE='application/x-www-form-urlencoded',
+                    CONTENT_LENGTH=str(len(body)))
+    clone.META = meta
+    if 'environ' in clone.__dict__:
+        clone.environ = meta
+    clone.method = method
+    clone.path_info = parts.path
+    script_name = request.path[:len(request.path) - len(request.path_info)]
+    clone.path = script_name.rstrip('/') + parts.path
+    clone.GET = QueryDict(query, encoding=request.encoding)
+    clone.POST = QueryDict(body, encoding=request.encoding)
+    clone._files = MultiValueDict()
+    clone._body = body
+    clone._stream = BytesIO(body)
+    clone._read_started = False
+    clone.content_type = meta.get('CONTENT_TYPE', '')
+    clone.content_params = {}
+    clone.resolver_match = None
+    if not isinstance(clone, IntercoolerRequestMixin):
+        clone.__class__ = _intercooler_request_class(clone.__class__)
+    if not in_scope(clone):
+        clone._is_intercooler_request = False
+    return clone
+
+
+def _render(response):
+    render = getattr(response, 'render', None)
+    if callable(render) and not getattr(response, 'is_rendered', True):
+        response = render()
+    if getattr(response, 'streaming', False):
+        content = b''.join(response.streaming_content)
+    else:
+        content = response.content
+    return force_text(content, encoding=response.charset, errors='replace')
+
+
+def dispatch_subrequest(request):
+    """
+    Runs the view which ``request.path_info`` resolves to, without going
+    through any middleware, and returns the rendered response and its
+    content as text, or ``None`` if the path doesn't resolve. Headers
+    collected in ``request.intercooler_headers`` are applied to the response.
+    """
+    match = cached_resolve(request.path_info)
+    if match is None:
+        return None
+    request.resolver_match = match
+    previous = current_request()
+    _set_current_request(request)
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+        content = _render(response)
+    finally:
+        _set_current_request(previous)
+    headers = request.__dict__.get('intercooler_headers')
+    if headers:
+        headers.apply(response)
+    return response, content
+
+
+class BatchView(View):
+    """
+    Serves many fragments in one request. Accepts a ``POST`` of JSON like::
+
+        {"requests": [{"id": "sidebar", "url": "/sidebar/?page=2",
+                       "method": "GET", "data": {"ic-target-id": "sidebar"},
+                       "headers": {"X-IC-Request": "true"}}]}
+
+    Each sub-request is dispatched straight to its view (via the cached
+    resolver, skipping the middleware stack), using a copy of this request,
+    and the results are returned, in the same order, as::
+
+        {"responses": [{"id": "sidebar", "status": 200,
+                        "headers": {...}, "content": "..."}]}
+
+    The batch request itself still passes through the middleware, so
+    authentication and CSRF protection happen once for all of them. Only
+    ``X-IC-*``, ``Accept``, ``Accept-Language`` and ``X-Requested-With`` may
+    be given as ``headers``; anything else is a bad request.
+
+    Sub-responses' cookies are silently dropped: ``Set-Cookie`` headers
+    aren't included in ``headers``, and nothing is set on the batch response,
+    so views which need to set cookies (eg: by logging in, or rotating the
+    CSRF token) shouldn't be batched.
+
+    ``max_workers`` (default: ``INTERCOOLER_HELPERS_BATCH_WORKERS``, or ``0``)
+    renders up to that many sub-requests at once on a shared thread pool.
+    Those threads share the batch request's ``session`` and ``user``, which
+    aren't thread-safe, so only do that for views which leave them alone.
+    """
+    http_method_names = ['post']
+    allowed_methods = ('GET', 'HEAD')
+    max_requests = 50
+    max_workers = None
+
+    def get_max_workers(self):
+        if self.max_workers is not None:
+            return self.max_workers
+        return getattr(settings, 'INTERCOOLER_HELPERS_BATCH_WORKERS', 0)
+
+    def parse(self, request):
+        try:
+            payload = json.loads(force_text(request.body))
+            specs = payload['requests']
+        except (ValueError, TypeError, KeyError):
+            raise SubRequestError("Expected a JSON object with a list of "
+                                  "'requests'")
+        if not isinstance(specs, list):
+            raise SubRequestError("'requests' should be a list")
+        if len(specs) > self.max_requests:
+            raise SubRequestError("At most {max:d} requests may be batched "
+                                  "together".format(max=self.max_requests))
+        subrequests = []
+        for spec in specs:
+            if not isinstance(spec, dict) or 'url' not in spec:
+                raise SubRequestError("Each request needs a 'url'")
+            method = spec.get('method', 'GET').upper()
+            if method not in self.allowed_methods:
+                raise SubRequestError("{method!s} may not be batched".format(
+                    method=method))
+            clone = clone_request(request, spec['url'], method=method,
+                                  data=spec.get('data'),
+                                  headers=spec.get('headers'))
+            subrequests.append((spec.get('id'), clone))
+        return subrequests
+
+    def handle(self, ident, request):
+        try:
+            result = dispatch_subrequest(request)
+        except Http404:
+            result = None
+        except PermissionDenied:
+            return {'id': ident, 'status': 403, 'headers': {}, 'content': ''}
+        except Exception:
+            logger.error('Internal Server Error: %s', request.path,
+                         exc_info=sys.exc_info(),
+                         extra={'status_code': 500, 'request': request})
+            return {'id': ident, 'status': 500, 'headers': {}, 'content': ''}
+        if result is None:
+            return {'id': ident, 'status': 404, 'headers': {}, 'content': ''}
+        response, content = result
+        return {'id': ident, 'status': response.status_code,
+                'headers': dict(response.items()), 'content': content}
+
+    def _handle_in_thread(self, args):
+        try:
+            return self.handle(*args)
+        finally:
+            # Threads outlive the request, so Django won't tidy up their
+            # database connections otherwise.
+            close_old_connections()
+
+    def post(self, request, *args, **kwargs):
+        try:
+            subrequests = self.parse(request)
+        except SubRequestError as e:
+            return HttpResponseBadRequest(force_text(e))
+        executor = _get_executor(self.get_max_workers())
+        if executor is None or len(subrequests) < 2:
+            results = [self.handle(*args) for args in subrequests]
+        else:
+            results = list(executor.map(self._handle_in_thread, subrequests))
+        return JsonResponse({'responses': results})
+
+
+_executors = {}
+_executors_lock = Lock()
+
+
+def _get_executor(max_workers):
+    if not max_workers or max_workers < 2 or ThreadPoolExecutor is None:
+        return None
+    try:
+        return _executors[max_workers]
+    except KeyError:
+        with _executors_lock:
+            if max_workers not in _executors:
+                _executors[max_workers] = ThreadPoolExecutor(max_workers)
+            return _executors[max_workers]
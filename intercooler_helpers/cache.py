@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import math
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import wraps
+from operator import itemgetter
+from threading import Event, Lock
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, QueryDict
+from django.middleware.cache import (CacheMiddleware, FetchFromCacheMiddleware,
+                                     UpdateCacheMiddleware)
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware_with_args
+from django.utils.encoding import force_bytes
+try:
+    from asyncio import iscoroutinefunction
+except ImportError:  # Python 2
+    def iscoroutinefunction(func):
+        return False
+
+from .middleware import IC_KEYS
+
+
+__all__ = ['normalize_query_string', 'IntercoolerUpdateCacheMiddleware',
+           'IntercoolerFetchFromCacheMiddleware', 'IntercoolerCacheMiddleware',
+           'intercooler_cache_page', 'intercooler_single_flight']
+
+
+def normalize_query_string(query_string, keep=(), encoding=None):
+    """
+    Remove the ``ic-*`` parameters not named in ``keep`` from a query string,
+    and sort what remains by key, so that requests which only differ by
+    things like ``ic-id`` produce the same string.
+    """
+    data = QueryDict(query_string, encoding=encoding)
+    drop = frozenset(IC_KEYS).difference(keep)
+    items = sorted(((key, values) for key, values in data.lists()
+                    if key not in drop), key=itemgetter(0))
+    normalized = QueryDict('', mutable=True, encoding=encoding)
+    for key, values in items:
+        normalized.setlist(key, values)
+    return normalized.urlencode()
+
+
+def _default_ic_keys():
+    return getattr(settings, 'INTERCOOLER_HELPERS_CACHE_IC_KEYS',
+                   ('ic-target-id',))
+
+
+@contextmanager
+def _normalized_query_string(request, keep):
+    # Django builds cache keys from request.build_absolute_uri(), which reads
+    # the raw QUERY_STRING, so that's what has to be normalized.
+    meta = request.META
+    missing = 'QUERY_STRING' not in meta
+    original = meta.get('QUERY_STRING', '')
+    meta['QUERY_STRING'] = normalize_query_string(original, keep,
+                                                  request.encoding)
+    try:
+        yield
+    finally:
+        if missing:
+            del meta['QUERY_STRING']
+        else:
+            meta['QUERY_STRING'] = original
+
+
+class IntercoolerUpdateCacheMiddleware(UpdateCacheMiddleware):
+    """
+    Like Django's ``UpdateCacheMiddleware``, but ignores ``ic-*`` parameters
+    other than those in ``INTERCOOLER_HELPERS_CACHE_IC_KEYS`` when building
+    the cache key, and varies on the ``X-IC-Request`` header.
+    """
+    def __init__(self, *args, **kwargs):
+        super(IntercoolerUpdateCacheMiddleware, self).__init__(*args, **kwargs)
+        self.ic_keys = _default_ic_keys()
+
+    def process_response(self, request, response):
+        patch_vary_headers(response, ('X-IC-Request',))
+        with _normalized_query_string(request, self.ic_keys):
+            return super(IntercoolerUpdateCacheMiddleware,
+                         self).process_response(request, response)
+
+
+class IntercoolerFetchFromCacheMiddleware(FetchFromCacheMiddleware):
+    """
+    The counterpart to ``IntercoolerUpdateCacheMiddleware``.
+    """
+    def __init__(self, *args, **kwargs):
+        super(IntercoolerFetchFromCacheMiddleware, self).__init__(*args,
+                                                                  **kwargs)
+        self.ic_keys = _default_ic_keys()
+
+    def process_request(self, request):
+        with _normalized_query_string(request, self.ic_keys):
+            return super(IntercoolerFetchFromCacheMiddleware,
+                         self).process_request(request)
+
+
+class IntercoolerCacheMiddleware(CacheMiddleware):
+    """
+    Both halves at once, for use as a view decorator via
+    ``intercooler_cache_page``. Accepts ``ic_keys`` in addition to the
+    arguments ``CacheMiddleware`` takes.
+    """
+    def __init__(self, *args, **kwargs):
+        ic_keys = kwargs.pop('ic_keys', None)
+        super(IntercoolerCacheMiddleware, self).__init__(*args, **kwargs)
+        if ic_keys is None:
+            ic_keys = _default_ic_keys()
+        self.ic_keys = ic_keys
+
+    def process_request(self, request):
+        with _normalized_query_string(request, self.ic_keys):
+            return super(IntercoolerCacheMiddleware,
+                         self).process_request(request)
+
+    def process_response(self, request, response):
+        patch_vary_headers(response, ('X-IC-Request',))
+        with _normalized_query_string(request, self.ic_keys):
+            return super(IntercoolerCacheMiddleware,
+                         self).process_response(request, response)
+
+
+def intercooler_cache_page(timeout, cache=None, key_prefix=None,
+                           ic_keys=None):
+    """
+    Like Django's ``cache_page``, but ``ic-*`` parameters other than those
+    in ``ic_keys`` (default: ``INTERCOOLER_HELPERS_CACHE_IC_KEYS``) don't
+    affect the cache key.
+    """
+    return decorator_from_middleware_with_args(IntercoolerCacheMiddleware)(
+        cache_timeout=timeout, cache_alias=cache, key_prefix=key_prefix,
+        ic_keys=ic_keys)
+
+
+_Shared = namedtuple('_Shared', 'content status reason headers')
+
+
+def _share(response):
+    # Responses setting cookies are probably specific to their client.
+    if response.streaming or response.cookies:
+        return None
+    if not getattr(response, 'is_rendered', True):
+        response.render()
+    return _Shared(response.content, response.status_code,
+                   response.reason_phrase, list(response.items()))
+
+
+def _unshare(shared):
+    # Each request gets its own response, as middleware may change it.
+    response = HttpResponse(shared.content, status=shared.status,
+                            reason=shared.reason)
+    for key, value in shared.headers:
+        response[key] = value
+    return response
+
+
+class _Flight(object):
+    __slots__ = ('done', 'shared', 'expires')
+
+    def __init__(self):
+        self.done = Event()
+        self.shared = None
+        self.expires = None
+
+
+class _SingleFlight(object):
+    def __init__(self, view, interval, ic_keys, cache, wait):
+        self.view = view
+        self.interval = interval
+        self.ic_keys = ic_keys
+        self.cache = cache
+        self.wait = wait
+        self._flights = {}
+        self._lock = Lock()
+
+    def get_key(self, request):
+        # The host too, as one site may serve several.
+        return '{}:{}{}?{}'.format(request.method, request.get_host(),
+                                   request.path, normalize_query_string(
+                                       request.META.get('QUERY_STRING', ''),
+                                       self.ic_keys, request.encoding))
+
+    def __call__(self, request, *args, **kwargs):
+        if (request.method not in ('GET', 'HEAD') or
+                request.META.get('HTTP_X_IC_REQUEST') != 'true'):
+            return self.view(request, *args, **kwargs)
+        key = self.get_key(request)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None or (flight.done.is_set() and
+                                        flight.expires <= default_timer())
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            if flight.done.wait(self.wait) and flight.shared is not None:
+                return _unshare(flight.shared)
+            # The leader failed, took too long, or can't share its response.
+            return self.view(request, *args, **kwargs)
+        try:
+            response, flight.shared = self.compute(key, request, *args,
+                                                   **kwargs)
+        finally:
+            flight.expires = default_timer() + self.interval
+            if flight.shared is None:
+                with self._lock:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+            flight.done.set()
+        self._prune()
+        return response
+
+    def _prune(self):
+        now = default_timer()
+        with self._lock:
+            expired = [key for key, flight in self._flights.items()
+                       if flight.done.is_set() and flight.expires <= now]
+            for key in expired:
+                del self._flights[key]
+
+    def compute(self, key, request, *args, **kwargs):
+        if self.cache is None:
+            response = self.view(request, *args, **kwargs)
+            return response, _share(response)
+        cache = caches[self.cache]
+        digest = hashlib.md5(force_bytes(key)).hexdigest()
+        result_key = 'intercooler_helpers.single_flight.{}'.format(digest)
+        lock_key = '{}.lock'.format(result_key)
+        lock_timeout = int(math.ceil(self.wait))
+        deadline = default_timer() + self.wait
+        acquired = False
+        while True:
+            shared = cache.get(result_key)
+            if shared is not None:
+                shared = _Shared(*shared)
+                return _unshare(shared), shared
+            acquired = cache.add(lock_key, True, lock_timeout)
+            if acquired or default_timer() >= deadline:
+                break
+            # Another process is computing it.
+            time.sleep(0.05)
+        try:
+            response = self.view(request, *args, **kwargs)
+            shared = _share(response)
+            if shared is not None:
+                cache.set(result_key, tuple(shared),
+                          max(1, int(math.ceil(self.interval))))
+        finally:
+            if acquired:
+                cache.delete(lock_key)
+        return response, shared
+
+
+def intercooler_single_flight(interval=1, ic_keys=None, cache=None,
+                              wait=2):
+    """
+    For views polled by many clients at once: concurrent Intercooler.js
+    ``GET`` requests for the same path and querystring (ignoring ``ic-*``
+    parameters other than those in ``ic_keys``) wait for a single request
+    to run the view, and each get a copy of its response, which is reused
+    for ``interval`` seconds.
+
+    Pass a cache alias as ``cache`` to also share responses (and the lock
+    deciding who runs the view) across processes. Requests wait up to
+    ``wait`` seconds, holding on to a worker meanwhile, then run the view
+    themselves.
+
+    Like ``cache_page``, only use it for views whose response doesn't depend
+    on who is asking. Responses which set cookies or are streamed are never
+    shared. Async views aren't supported.
+    """
+    if ic_keys is None:
+        ic_keys = _default_ic_keys()
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            raise TypeError("intercooler_single_flight can't be used on "
+                            "async views, such as {!r}".format(view))
+        flight = _SingleFlight(view, interval, ic_keys, cache, wait)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return flight(request, *args, **kwargs)
+        return wrapper
+    return decorator
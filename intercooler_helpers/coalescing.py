@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import itertools
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.encoding import force_bytes
+from django.utils.module_loading import import_string
+
+from .middleware import MiddlewareMixin, _client_key, _empty_response
+
+
+__all__ = ['LocalCoalescingBackend', 'CacheCoalescingBackend', 'get_backend',
+           'IntercoolerCoalescing']
+
+
+def _timeout():
+    return getattr(settings, 'INTERCOOLER_HELPERS_COALESCING_TIMEOUT', 60)
+
+
+class LocalCoalescingBackend(object):
+    """
+    Remembers the newest request seen for each of the last ``size``
+    client/element keys, in memory, for ``timeout`` seconds (default:
+    ``INTERCOOLER_HELPERS_COALESCING_TIMEOUT``, or ``60``). Each process has
+    its own, so requests are only coalesced when they reach the same process.
+
+    Other backends need to provide ``claim`` and ``is_latest`` with the same
+    signatures.
+    """
+    def __init__(self, size=10000, timeout=None):
+        self.size = size
+        self.timeout = _timeout() if timeout is None else timeout
+        # key -> (token, expiry), oldest claim first.
+        self._latest = OrderedDict()
+        self._counter = itertools.count(1)
+        self._lock = Lock()
+
+    def claim(self, key):
+        """
+        Records a new request as the newest for ``key``, returning a token
+        for ``is_latest``.
+        """
+        now = default_timer()
+        with self._lock:
+            token = next(self._counter)
+            self._latest.pop(key, None)
+            self._latest[key] = (token, now + self.timeout)
+            latest = self._latest
+            while latest and (len(latest) > self.size or
+                              next(iter(latest.values()))[1] <= now):
+                latest.popitem(last=False)
+            return token
+
+    def is_latest(self, key, token):
+        with self._lock:
+            latest = self._latest.get(key)
+        return (latest is None or latest[1] <= default_timer() or
+                latest[0] == token)
+
+
+class CacheCoalescingBackend(object):
+    """
+    Remembers the newest request for each client/element key in the
+    ``INTERCOOLER_HELPERS_COALESCING_CACHE`` cache (default: ``'default'``)
+    for ``INTERCOOLER_HELPERS_COALESCING_TIMEOUT`` seconds, so that requests
+    are coalesced across processes.
+
+    Claims aren't atomic, so of two requests arriving at the same moment,
+    either may end up the newest.
+    """
+    def __init__(self, alias=None, timeout=None):
+        if alias is None:
+            alias = getattr(settings, 'INTERCOOLER_HELPERS_COALESCING_CACHE',
+                            'default')
+        if timeout is None:
+            timeout = _timeout()
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def _cache_key(self, key):
+        return 'intercooler_helpers.coalescing.{}'.format(key)
+
+    def claim(self, key):
+        token = uuid.uuid4().hex
+        self.cache.set(self._cache_key(key), token, self.timeout)
+        return token
+
+    def is_latest(self, key, token):
+        latest = self.cache.get(self._cache_key(key))
+        return latest is None or latest == token
+
+
+_backend = None
+_backend_lock = Lock()
+
+
+def get_backend():
+    """
+    The backend named by ``INTERCOOLER_HELPERS_COALESCING_BACKEND``, shared
+    by the whole process.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(
+                    settings, 'INTERCOOLER_HELPERS_COALESCING_BACKEND',
+                    'intercooler_helpers.coalescing.LocalCoalescingBackend')
+                _backend = import_string(path)()
+    return _backend
+
+
+def _superseded_response():
+    # Intercooler.js doesn't swap anything in for an empty response.
+    return HttpResponse()
+
+
+class IntercoolerCoalescing(MiddlewareMixin):
+    """
+    Skips work for Intercooler.js requests which have been superseded by a
+    later request from the same client and element, as the client only
+    swaps in the last response anyway. Requests are ordered by when they
+    arrive: ``ic-id`` can't be used, as it starts again from 1 whenever the
+    page is loaded.
+
+    For requests whose method is in ``INTERCOOLER_HELPERS_COALESCING_METHODS``
+    (default: ``GET`` and ``HEAD``):
+
+    - if ``INTERCOOLER_HELPERS_COALESCING_DEBOUNCE`` is set, ``GET`` and
+      ``HEAD`` requests wait that many seconds first, and get an empty
+      response if a newer one arrived meanwhile. The wait holds on to a
+      worker, so keep it short;
+    - a response to a request superseded while it was being handled is
+      emptied, so at least it isn't sent.
+
+    Only add methods like ``POST`` for views where skipping an older request
+    is harmless, such as the ``click`` demo's counter. Requests without a
+    session, or without an ``ic-element-id`` or ``ic-trigger-id``, are never
+    coalesced. Add it after
+    ``IntercoolerData`` (and the session middleware, if any).
+    """
+    def __init__(self, *args, **kwargs):
+        super(IntercoolerCoalescing, self).__init__(*args, **kwargs)
+        self.methods = frozenset(getattr(
+            settings, 'INTERCOOLER_HELPERS_COALESCING_METHODS',
+            ('GET', 'HEAD')))
+        self.debounce = getattr(settings,
+                                'INTERCOOLER_HELPERS_COALESCING_DEBOUNCE', 0)
+
+    def get_client_key(self, request):
+        return _client_key(request)
+
+    def get_key(self, request):
+        data = request.intercooler_data
+        element = data.element.id or data.trigger.id
+        if not element:
+            return None
+        client_key = self.get_client_key(request)
+        if client_key is None:
+            return None
+        parts = (client_key, element)
+        return hashlib.md5(force_bytes('\n'.join(parts))).hexdigest()
+
+    def process_request(self, request):
+        if request.method not in self.methods or not request.is_intercooler():
+            return None
+        key = self.get_key(request)
+        if key is None:
+            return None
+        backend = get_backend()
+        token = backend.claim(key)
+        if self.debounce and request.method in ('GET', 'HEAD'):
+            time.sleep(self.debounce)
+            if not backend.is_latest(key, token):
+                return _superseded_response()
+        request._intercooler_coalescing = (key, token)
+
+    def process_response(self, request, response):
+        claimed = request.__dict__.pop('_intercooler_coalescing', None)
+        if claimed is None:
+            return response
+        if response.status_code != 200 or response.streaming:
+            return response
+        if not get_backend().is_latest(*claimed):
+            return _empty_response(response)
+        return response
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from collections import defaultdict
+from threading import Lock
+
+from django.db.models.signals import post_delete, post_save
+try:
+    from django.urls import reverse
+except ImportError:  # Django <1.10
+    from django.core.urlresolvers import reverse
+
+from .headers import current_request
+
+
+__all__ = ['DependencyRegistry', 'dependencies', 'register', 'changed']
+
+
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'TRACE'))
+
+
+class DependencyRegistry(object):
+    """
+    Maps models (or arbitrary keys, eg: cache keys) to the URL paths whose
+    content depends on them. When a registered model is saved or deleted
+    during a mutating Intercooler.js request, or ``changed(key)`` is called,
+    the dependent paths are added to the request's ``X-IC-Refresh`` header
+    (via ``IntercoolerResponseHeaders``, which must be installed, and only
+    if the response is a ``2xx``), so that only the affected elements are
+    refreshed.
+
+    Dependencies may be given as:
+
+    - a path, starting with ``/``;
+    - a URL name, which is reversed when needed;
+    - a callable, taking the changed instance (or ``None`` for keys), and
+      returning a path, or an iterable of them.
+    """
+    def __init__(self):
+        self._dependencies = defaultdict(list)
+        self._connected = False
+        self._lock = Lock()
+
+    def register(self, key, *dependencies):
+        with self._lock:
+            self._dependencies[key].extend(dependencies)
+            if not self._connected:
+                # Connected for all senders, so that proxy models are
+                # caught too.
+                post_save.connect(self._model_changed, weak=False,
+                                  dispatch_uid=self._dispatch_uid())
+                post_delete.connect(self._model_changed, weak=False,
+                                    dispatch_uid=self._dispatch_uid())
+                self._connected = True
+
+    def unregister(self, key):
+        with self._lock:
+            self._dependencies.pop(key, None)
+
+    def _dispatch_uid(self):
+        return 'intercooler_helpers.dependencies.{:d}'.format(id(self))
+
+    def paths_for(self, key, instance=None):
+        paths = []
+        for dependency in self._dependencies.get(key, ()):
+            if callable(dependency):
+                result = dependency(instance)
+                if result is None:
+                    continue
+                if isinstance(result, (list, tuple, set, frozenset)):
+                    paths.extend(result)
+                else:
+                    paths.append(result)
+            elif dependency.startswith('/'):
+                paths.append(dependency)
+            else:
+                paths.append(reverse(dependency))
+        return paths
+
+    def changed(self, key, instance=None):
+        """
+        Refresh everything depending on ``key``, if the current request is
+        a mutating Intercooler.js one. Returns the paths which were added.
+        """
+        request = current_request()
+        if request is None or request.method in SAFE_METHODS:
+            return []
+        is_intercooler = getattr(request, 'is_intercooler', None)
+        if is_intercooler is None or not is_intercooler():
+            return []
+        headers = getattr(request, 'intercooler_headers', None)
+        if headers is None:
+            return []
+        paths = self.paths_for(key, instance)
+        headers.refresh(*paths)
+        return paths
+
+    def _model_changed(self, sender, instance, **kwargs):
+        if sender not in self._dependencies:
+            sender = sender._meta.concrete_model
+            if sender not in self._dependencies:
+                return
+        self.changed(sender, instance)
+
+
+dependencies = DependencyRegistry()
+register = dependencies.register
+changed = dependencies.changed
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import json
+from collections import OrderedDict
+try:
+    from asgiref.local import Local
+except ImportError:  # Django <3.0 doesn't depend on asgiref
+    from threading import local as Local
+
+
+__all__ = ['IntercoolerHeaders', 'coalesce_paths', 'current_request',
+           'current_headers', 'trigger', 'refresh']
+
+
+_current = Local()
+
+
+def coalesce_paths(paths):
+    """
+    Intercooler.js refreshes every element whose path starts with a given
+    path (or vice versa), so a path which begins with another path in the
+    list is redundant, as are duplicates.
+    """
+    unique = list(OrderedDict.fromkeys(
+        path.strip() for path in paths if path.strip()))
+    return [path for path in unique
+            if not any(path != other and path.startswith(other)
+                       for other in unique)]
+
+
+def _parse_triggers(value):
+    if not value:
+        return OrderedDict()
+    try:
+        triggers = json.loads(value, object_pairs_hook=OrderedDict)
+    except ValueError:
+        # A plain event name.
+        return OrderedDict(((value, []),))
+    if not isinstance(triggers, dict):
+        return OrderedDict(((value, []),))
+    return triggers
+
+
+class IntercoolerHeaders(object):
+    """
+    Collects the ``X-IC-*`` response headers wanted while handling a request,
+    from anywhere (views, signal handlers, template tags), and writes them
+    all out, deduplicated, once the response is ready.
+
+    Available as ``request.intercooler_headers``, and applied by the
+    ``IntercoolerResponseHeaders`` middleware. Headers the view set directly
+    on the response take precedence, or for ``X-IC-Trigger``,
+    ``X-IC-Refresh``, ``X-IC-Script`` and ``X-IC-Set-Local-Vars``, are
+    merged. Collected refresh paths are only sent with ``2xx`` responses.
+    """
+    def __init__(self):
+        self.triggers = OrderedDict()
+        self.refresh_paths = []
+        self.scripts = []
+        self.local_vars = OrderedDict()
+        self.headers = OrderedDict()
+
+    def trigger(self, event, *args):
+        # Triggering the same event twice is the same as triggering it once,
+        # with the latest arguments.
+        self.triggers[event] = list(args)
+        return self
+
+    def refresh(self, *paths):
+        self.refresh_paths.extend(paths)
+        return self
+
+    def script(self, script):
+        self.scripts.append(script)
+        return self
+
+    def set_local_vars(self, **local_vars):
+        self.local_vars.update(local_vars)
+        return self
+
+    def redirect(self, url):
+        self.headers['X-IC-Redirect'] = url
+        return self
+
+    def push_url(self, url):
+        self.headers['X-IC-PushURL'] = url
+        return self
+
+    def open(self, url):
+        self.headers['X-IC-Open'] = url
+        return self
+
+    def title(self, title):
+        self.headers['X-IC-Title'] = title
+        return self
+
+    def remove(self, delay=None):
+        self.headers['X-IC-Remove'] = 'true' if delay is None else delay
+        return self
+
+    def transition_duration(self, duration):
+        self.headers['X-IC-Transition-Duration'] = duration
+        return self
+
+    def set_poll_interval(self, interval):
+        self.headers['X-IC-SetPollInterval'] = interval
+        return self
+
+    def cancel_polling(self):
+        self.headers.pop('X-IC-ResumePolling', None)
+        self.headers['X-IC-CancelPolling'] = 'true'
+        return self
+
+    def resume_polling(self):
+        self.headers.pop('X-IC-CancelPolling', None)
+        self.headers['X-IC-ResumePolling'] = 'true'
+        return self
+
+    def __bool__(self):
+        return bool(self.triggers or self.refresh_paths or self.scripts or
+                    self.local_vars or self.headers)
+    __nonzero__ = __bool__
+
+    def apply(self, response):
+        for header, value in self.headers.items():
+            if not response.has_header(header):
+                response[header] = value
+        if self.triggers:
+            triggers = OrderedDict(self.triggers)
+            triggers.update(_parse_triggers(response.get('X-IC-Trigger')))
+            response['X-IC-Trigger'] = json.dumps(triggers)
+        if self.refresh_paths and 200 <= response.status_code < 300:
+            # A failed request (whose changes may have been rolled back)
+            # has nothing new to show.
+            existing = response.get('X-IC-Refresh', '').split(',')
+            paths = coalesce_paths(existing + self.refresh_paths)
+            response['X-IC-Refresh'] = ','.join(paths)
+        if self.scripts:
+            scripts = [response['X-IC-Script']] if response.has_header(
+                'X-IC-Script') else []
+            response['X-IC-Script'] = '; '.join(scripts + self.scripts)
+        if self.local_vars:
+            local_vars = OrderedDict(self.local_vars)
+            existing = response.get('X-IC-Set-Local-Vars')
+            if existing:
+                local_vars.update(json.loads(existing))
+            response['X-IC-Set-Local-Vars'] = json.dumps(local_vars)
+        return response
+
+    def __repr__(self):
+        return "<{cls!s}: triggers={triggers!r}, refresh={refresh!r}, " \
+               "headers={headers!r}>".format(cls=self.__class__.__name__,
+                                            triggers=dict(self.triggers),
+                                            refresh=self.refresh_paths,
+                                            headers=dict(self.headers))
+
+
+def _set_current_request(request):
+    _current.request = request
+
+
+def current_request():
+    """
+    The request currently being handled by ``IntercoolerResponseHeaders``,
+    if any.
+    """
+    return getattr(_current, 'request', None)
+
+
+def current_headers():
+    """
+    The ``IntercoolerHeaders`` for the request currently being handled, or
+    ``None`` if there isn't one (eg: a signal fired from a management
+    command).
+    """
+    return getattr(current_request(), 'intercooler_headers', None)
+
+
+def trigger(event, *args):
+    headers = current_headers()
+    if headers is not None:
+        headers.trigger(event, *args)
+    return headers
+
+
+def refresh(*paths):
+    headers = current_headers()
+    if headers is not None:
+        headers.refresh(*paths)
+    return headers
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from intercooler_helpers.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = ("Compiles the templates used for Intercooler.js requests and "
+            "primes the URL resolver, reporting how long each took.")
+    # An empty list, rather than False, is what Django 3.2+ expects.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('templates', nargs='*',
+                            help="Templates to compile, instead of those "
+                                 "found automatically.")
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        report = warm_up(templates=options['templates'] or None)
+        if verbosity > 1:
+            for name, duration in report.templates:
+                self.stdout.write("  {:>8.2f}ms  {}".format(duration * 1000,
+                                                           name))
+        for name, error in report.errors:
+            self.stderr.write("Couldn't compile {}: {}".format(name, error))
+        timings = report.timings
+        self.stdout.write("Resolver: populated in {:.1f}ms".format(
+            timings['resolver'] * 1000))
+        self.stdout.write("Templates: {} compiled in {:.1f}ms".format(
+            len(report.templates),
+            (timings['discovery'] + timings['templates']) * 1000))
+        if not report.cached:
+            self.stdout.write("  (not kept, as there is no cached template "
+                              "loader)")
+        self.stdout.write("URLs: {} resolved in {:.1f}ms".format(
+            len(report.urls), timings['urls'] * 1000))
+        self.stdout.write("Total: {:.1f}ms".format(
+            sum(timings.values()) * 1000))
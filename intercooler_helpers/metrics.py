@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from bisect import bisect_left
+from collections import namedtuple
+from operator import itemgetter
+from threading import Lock
+from timeit import default_timer
+
+from django.conf import settings
+from django.dispatch import Signal
+from django.http import HttpResponse
+
+from .middleware import _InlineAsyncMiddlewareMixin
+
+
+__all__ = ['Labels', 'Histogram', 'MetricsRegistry', 'registry',
+           'request_measured', 'IntercoolerMetrics', 'prometheus_text',
+           'metrics_view']
+
+
+Labels = namedtuple('Labels', 'view target trigger method changed_method')
+
+# The same defaults as the Prometheus client libraries.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                    10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000)
+
+#: Sent after each Intercooler.js request is measured, with ``request``,
+#: ``labels``, ``duration`` (in seconds), ``size`` (in bytes, or ``None`` for
+#: streaming responses) and ``status``.
+request_measured = Signal()
+
+
+class Histogram(object):
+    """
+    Counts of observations falling into each bucket, plus their total.
+    Not thread-safe by itself; ``MetricsRegistry`` holds a lock around it.
+    """
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # The extra one is for values above the largest bucket.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class _Series(object):
+    __slots__ = ('duration', 'size', 'statuses')
+
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.statuses = {}
+
+
+class MetricsRegistry(object):
+    """
+    In-process latency and response size histograms, and status code counts,
+    for each distinct set of ``Labels``.
+
+    To stop unbounded ``ic-target-id`` values using unbounded memory, once
+    ``max_series`` (default: ``INTERCOOLER_HELPERS_METRICS_MAX_SERIES``, or
+    ``1000``) label sets exist, new ones are counted under ``overflow``.
+    """
+    overflow = Labels(view='other', target='other', trigger='other',
+                      method='other', changed_method='other')
+
+    def __init__(self, max_series=None):
+        self._max_series = max_series
+        self._series = {}
+        self._lock = Lock()
+
+    @property
+    def max_series(self):
+        # Read lazily, so that the module may be imported before settings
+        # are configured.
+        if self._max_series is None:
+            self._max_series = getattr(
+                settings, 'INTERCOOLER_HELPERS_METRICS_MAX_SERIES', 1000)
+        return self._max_series
+
+    def observe(self, labels, duration, size, status):
+        with self._lock:
+            try:
+                series = self._series[labels]
+            except KeyError:
+                if len(self._series) >= self.max_series:
+                    labels = self.overflow
+                series = self._series.setdefault(labels, _Series())
+            series.duration.observe(duration)
+            if size is not None:
+                series.size.observe(size)
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    def collect(self):
+        """
+        A consistent copy of every series, as ``(labels, duration, size,
+        statuses)`` tuples.
+        """
+        with self._lock:
+            return [(labels, _copy(series.duration), _copy(series.size),
+                     dict(series.statuses))
+                    for labels, series in self._series.items()]
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _copy(histogram):
+    new = Histogram(histogram.buckets)
+    new.counts = list(histogram.counts)
+    new.sum = histogram.sum
+    return new
+
+
+registry = MetricsRegistry()
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return ''
+    return match.view_name or match._func_path
+
+
+class IntercoolerMetrics(_InlineAsyncMiddlewareMixin):
+    """
+    Records how long each Intercooler.js request took, how big the response
+    was and its status code, labelled by view, ``ic-target-id``, the
+    triggering element and method, into ``registry``.
+
+    Add it after ``IntercoolerData``, and as near the top as possible so that
+    it measures the time spent in the rest of the stack.
+    """
+    registry = registry
+
+    def process_request(self, request):
+        request._intercooler_metrics_started = default_timer()
+
+    def process_response(self, request, response):
+        started = request.__dict__.pop('_intercooler_metrics_started', None)
+        if started is None or not request.is_intercooler():
+            return response
+        duration = default_timer() - started
+        data = request.intercooler_data
+        labels = Labels(
+            view=_view_name(request),
+            target=data.target_id or '',
+            trigger=data.trigger.id or data.element.id or '',
+            method=request.method,
+            changed_method='true' if data.changed_method else 'false')
+        size = None if response.streaming else len(response.content)
+        self.registry.observe(labels, duration, size, response.status_code)
+        # Checking .receivers directly is much cheaper than has_listeners().
+        if request_measured.receivers:
+            request_measured.send(sender=self.__class__, request=request,
+                                  labels=labels, duration=duration, size=size,
+                                  status=response.status_code)
+        return response
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(labels, **extra):
+    pairs = list(labels._asdict().items()) + sorted(extra.items())
+    return ','.join('{}="{}"'.format(key, _escape('{}'.format(value)))
+                    for key, value in pairs)
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def _histogram_lines(name, labels, histogram):
+    for bound, total in histogram.cumulative():
+        yield '{}_bucket{{{}}} {:d}'.format(
+            name, _format_labels(labels, le=_format_bound(bound)), total)
+    yield '{}_sum{{{}}} {!r}'.format(name, _format_labels(labels),
+                                     float(histogram.sum))
+    yield '{}_count{{{}}} {:d}'.format(name, _format_labels(labels),
+                                       histogram.count)
+
+
+def prometheus_text(registry=registry):
+    """
+    Everything in ``registry``, in the Prometheus text exposition format.
+    """
+    series = sorted(registry.collect(), key=itemgetter(0))
+    lines = [
+        '# HELP intercooler_request_duration_seconds Time taken to respond '
+        'to Intercooler.js requests.',
+        '# TYPE intercooler_request_duration_seconds histogram',
+    ]
+    for labels, duration, size, statuses in series:
+        lines.extend(_histogram_lines('intercooler_request_duration_seconds',
+                                      labels, duration))
+    lines.extend([
+        '# HELP intercooler_response_size_bytes Size of responses to '
+        'Intercooler.js requests.',
+        '# TYPE intercooler_response_size_bytes histogram',
+    ])
+    for labels, duration, size, statuses in series:
+        lines.extend(_histogram_lines('intercooler_response_size_bytes',
+                                      labels, size))
+    lines.extend([
+        '# HELP intercooler_responses_total Responses to Intercooler.js '
+        'requests, by status code.',
+        '# TYPE intercooler_responses_total counter',
+    ])
+    for labels, duration, size, statuses in series:
+        for status, count in sorted(statuses.items()):
+            lines.append('intercooler_responses_total{{{}}} {:d}'.format(
+                _format_labels(labels, status=status), count))
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Serves ``prometheus_text()`` for scraping. It isn't protected in any way,
+    so wrap it in whatever the project uses to restrict access.
+    """
+    return HttpResponse(prometheus_text(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
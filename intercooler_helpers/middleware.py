@@ -1,59 +1,264 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals
 
+import logging
+import re
 from collections import namedtuple
 from contextlib import contextmanager
-
-from django.http import QueryDict, HttpResponse
+from io import BytesIO
+from threading import Lock
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.exceptions import DisallowedHost, PermissionDenied
+from django.http import Http404, QueryDict
+from django.utils.datastructures import MultiValueDictKeyError
+from django.utils.functional import SimpleLazyObject, cached_property
+try:
+    from urllib.parse import (unquote_plus, urljoin, urlparse, urlsplit,
+                              urlunsplit)
+except ImportError:  # Python 2
+    from urllib import unquote_plus
+    from urlparse import urljoin, urlparse, urlsplit, urlunsplit
 try:
-    from django.urls import Resolver404, resolve
-except ImportError:  # Django <1.10
-    from django.core.urlresolvers import Resolver404, resolve
-from django.utils.functional import SimpleLazyObject
-from django.utils.six.moves.urllib.parse import urlparse
+    from asyncio import iscoroutinefunction
+except ImportError:  # Python 2
+    def iscoroutinefunction(func):
+        return False
 try:
     from django.utils.deprecation import MiddlewareMixin
 except ImportError:  # < Django 1.10
     class MiddlewareMixin(object):
         pass
 
+from .headers import IntercoolerHeaders, _set_current_request
+from .resolver import cached_resolve
+from .scope import get_index, in_scope
+try:
+    from ._async import acall_inline
+except SyntaxError:  # Python 2, or Python 3 before async/await
+    acall_inline = None
+
+
+logger = logging.getLogger('intercooler_helpers')
+
+
+class _InlineAsyncMiddlewareMixin(MiddlewareMixin):
+    """
+    For middleware whose hooks never block. Under ASGI (Django 3.1+), they're
+    run directly on the event loop instead of each being sent to a thread
+    via ``sync_to_async``. Elsewhere, this changes nothing.
+    """
+    sync_capable = True
+    async_capable = acall_inline is not None
+
+    if acall_inline is not None:
+        def __acall__(self, request):
+            return acall_inline(self, request)
+
+
+__all__ = ['IntercoolerData', 'HttpMethodOverride', 'IntercoolerRedirector',
+           'IntercoolerRequestMixin', 'IntercoolerParams', 'QueryDictView',
+           'LoadMonitor', 'IntercoolerPollingBackpressure',
+           'IntercoolerResponseHeaders']
 
-__all__ = ['IntercoolerData', 'HttpMethodOverride']
 
+OVERRIDE_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE',
+                              'OPTIONS'))
+_URLENCODED_METHOD = re.compile(br'(?:^|&)_method=([^&]*)')
+_MULTIPART_METHOD = re.compile(
+    br'Content-Disposition:[ \t]*form-data;[ \t]*name="_method"\r\n'
+    br'(?:[^\r\n]+\r\n)*\r\n([^\r\n]*)\r\n', re.IGNORECASE)
 
-class HttpMethodOverride(MiddlewareMixin):
+
+class _PrefixedStream(object):
+    """
+    Bytes already read from the start of a stream, followed by the rest of
+    the stream, so that peeking at a request body doesn't consume it.
+    """
+    def __init__(self, prefix, stream):
+        self._prefix = BytesIO(prefix)
+        self._stream = stream
+
+    def read(self, size=None):
+        if size is None or size < 0:
+            return self._prefix.read() + self._stream.read()
+        data = self._prefix.read(size)
+        if len(data) < size:
+            data += self._stream.read(size - len(data))
+        return data
+
+    def readline(self, size=None):
+        if size is None or size < 0:
+            line = self._prefix.readline()
+            if not line.endswith(b'\n'):
+                line += self._stream.readline()
+            return line
+        line = self._prefix.readline(size)
+        if not line.endswith(b'\n') and len(line) < size:
+            line += self._stream.readline(size - len(line))
+        return line
+
+
+def _peek_body(request, size):
+    body = request.__dict__.get('_body')
+    if body is not None:
+        return body[:size], len(body) <= size
+    if getattr(request, '_read_started', False):
+        return b'', False
+    stream = request._stream
+    prefix = stream.read(size)
+    request._stream = _PrefixedStream(prefix, stream)
+    return prefix, len(prefix) < size
+
+
+def _scan_body_for_method(request, size):
+    """
+    Looks for ``_method`` in (up to) the first ``size`` bytes of a
+    urlencoded or multipart body, without parsing it into ``request.POST``.
+    """
+    content_type = request.META.get('CONTENT_TYPE', '')
+    if content_type.startswith('application/x-www-form-urlencoded'):
+        pattern = _URLENCODED_METHOD
+    elif content_type.startswith('multipart/form-data'):
+        pattern = _MULTIPART_METHOD
+    else:
+        return None
+    prefix, complete = _peek_body(request, size)
+    match = pattern.search(prefix)
+    # A match running up to the end of a partial read may have been cut off.
+    if match is None or (not complete and match.end() == len(prefix)):
+        return None
+    return unquote_plus(match.group(1).decode('latin-1'))
+
+
+# Where change_method() is told the override came from the unparsed body.
+_BODY = object()
+
+
+def _defer_post(request, strip=()):
+    """
+    Makes ``request.POST`` and ``request.FILES`` parse the body when first
+    used, as though the request were still a ``POST`` (Django only parses
+    the body of a ``POST``), and then remove the ``strip`` keys.
+    """
+    def load_post_and_files():
+        # Back to the class's own, which this shadows until now.
+        del request._load_post_and_files
+        method = request.method
+        request.method = 'POST'
+        try:
+            request._load_post_and_files()
+        finally:
+            request.method = method
+        if strip:
+            with _mutate_querydict(request._post) as post:
+                for key in strip:
+                    post.pop(key, None)
+
+    request._load_post_and_files = load_post_and_files
+
+
+class HttpMethodOverride(_InlineAsyncMiddlewareMixin):
     """
     Support for X-HTTP-Method-Override and _method=PUT style request method
     changing.
 
+    The header is checked first, then the querystring, then the body, as
+    decided by ``INTERCOOLER_HELPERS_METHOD_OVERRIDE_BODY``:
+
+    - ``'parse'`` (the default) looks in ``request.POST``, which parses the
+      whole body, including any file uploads.
+    - ``'scan'`` looks through only the first
+      ``INTERCOOLER_HELPERS_METHOD_OVERRIDE_SCAN_BYTES`` of a urlencoded or
+      multipart body, leaving the view to decide how to read it.
+    - ``'ignore'`` never looks at the body.
+
+    Under ASGI, it runs on the event loop, except for multipart ``POST``
+    requests in ``'parse'`` mode, where parsing the body may write uploaded
+    files to disk.
+
     Note: if https://pypi.python.org/pypi/django-method-override gets updated
     with support for newer Django (ie: implements MiddlewareMixin), without
     dropping older versions, I could possibly replace this with that.
     """
+    def __init__(self, *args, **kwargs):
+        super(HttpMethodOverride, self).__init__(*args, **kwargs)
+        self.body_mode = getattr(
+            settings, 'INTERCOOLER_HELPERS_METHOD_OVERRIDE_BODY', 'parse')
+        self.scan_bytes = getattr(
+            settings, 'INTERCOOLER_HELPERS_METHOD_OVERRIDE_SCAN_BYTES', 16384)
+        # Build the scope's path index at startup, not on the first request.
+        get_index()
+
+    if acall_inline is not None:
+        def __acall__(self, request):
+            if (self.body_mode == 'parse' and request.method == 'POST' and
+                    request.META.get('CONTENT_TYPE', '').startswith(
+                        'multipart/')):
+                return super(_InlineAsyncMiddlewareMixin, self).__acall__(
+                    request)
+            return acall_inline(self, request)
+
     def process_request(self, request):
         request.changed_method = False
-        if request.method != 'POST':
+        if request.method != 'POST' or not _in_scope(request):
             return
-        methods = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
         potentials = ((request.META, 'HTTP_X_HTTP_METHOD_OVERRIDE'),
-                      (request.GET, '_method'),
-                      (request.POST, '_method'))
+                      (request.GET, '_method'))
+        if self.body_mode == 'parse':
+            potentials += ((request.POST, '_method'),)
         for querydict, key in potentials:
-            if key in querydict and querydict[key].upper() in methods:
-                newmethod = querydict[key].upper()
-                # Don't change the method data if the calling method was
-                # the same as the indended method.
-                if newmethod == request.method:
-                    return
-                request.original_method = request.method
-                if hasattr(querydict, '_mutable'):
-                    with _mutate_querydict(querydict):
-                        querydict.pop(key)
-                if not hasattr(request, newmethod):
-                    setattr(request, newmethod, request.POST)
-                request.method = newmethod
-                request.changed_method = True
+            if key in querydict and querydict[key].upper() in OVERRIDE_METHODS:
+                self.change_method(request, querydict[key].upper(),
+                                   querydict, key)
                 return
+        if self.body_mode == 'scan':
+            newmethod = _scan_body_for_method(request, self.scan_bytes)
+            if newmethod and newmethod.upper() in OVERRIDE_METHODS:
+                self.change_method(request, newmethod.upper(), _BODY,
+                                   '_method')
+
+    def change_method(self, request, newmethod, querydict=None, key=None):
+        # Don't change the method data if the calling method was
+        # the same as the indended method.
+        if newmethod == request.method:
+            return
+        request.original_method = request.method
+        strip = ()
+        if querydict is _BODY:
+            strip = (key,)
+        elif hasattr(querydict, '_mutable'):
+            with _mutate_querydict(querydict):
+                querydict.pop(key)
+        if self.body_mode == 'parse' or '_post' in request.__dict__:
+            # As before, 'parse' mode parses the body here, wherever the
+            # method came from.
+            post = request.POST
+        else:
+            # Only parse the body if something asks for it, and then the
+            # same way whatever the method (and whichever is asked first).
+            _defer_post(request, strip)
+            post = SimpleLazyObject(lambda: request.POST)
+        if not hasattr(request, newmethod):
+            setattr(request, newmethod, post)
+        request.method = newmethod
+        request.changed_method = True
+
+
+def _in_scope(request):
+    # Both HttpMethodOverride and IntercoolerData ask, so only walk the
+    # path index once.
+    try:
+        return request._intercooler_in_scope
+    except AttributeError:
+        result = in_scope(request)
+        request._intercooler_in_scope = result
+        return result
+
+
+def _not_intercooler():
+    return False
 
 
 def _maybe_intercooler(self):
@@ -61,14 +266,24 @@ def _maybe_intercooler(self):
 
 
 def _is_intercooler(self):
-    return self.is_ajax() and self.maybe_intercooler()
+    try:
+        return self._is_intercooler_request
+    except AttributeError:
+        # Equivalent to request.is_ajax(), which newer Django deprecates.
+        is_ajax = self.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest'
+        result = is_ajax and self.maybe_intercooler()
+        self._is_intercooler_request = result
+        return result
 
 
 @contextmanager
 def _mutate_querydict(qd):
+    mutable = qd._mutable
     qd._mutable = True
-    yield qd
-    qd._mutable = False
+    try:
+        yield qd
+    finally:
+        qd._mutable = mutable
 
 
 NameId = namedtuple('NameId', 'name id')
@@ -76,19 +291,32 @@ UrlMatch = namedtuple('UrlMatch', 'url match')
 
 
 class IntercoolerQueryDict(QueryDict):
+    """
+    A ``QueryDict`` of ``ic-*`` values with the same properties as
+    ``IntercoolerParams``, for code which needs a real ``QueryDict``; see
+    ``IntercoolerParams.querydict()``.
+    """
+    _url_cache = (None, UrlMatch(None, None))
+
     @property
     def url(self):
-        url = self.get('ic-current-url', None)
+        raw_url = self.get('ic-current-url', None)
+        # Parsing and resolving is only done again if ic-current-url has
+        # changed since the last access.
+        cached_raw_url, cached = self._url_cache
+        if raw_url == cached_raw_url:
+            return cached
+        url = raw_url
         match = None
         if url is not None:
             url = url.strip()
             url = urlparse(url)
             if url.path:
-                try:
-                    match = resolve(url.path)
-                except Resolver404:
-                    pass
-        return UrlMatch(url, match)
+                match = cached_resolve(url.path)
+        result = UrlMatch(url, match)
+        # IntercoolerParams shares this, and is otherwise immutable.
+        object.__setattr__(self, '_url_cache', (raw_url, result))
+        return result
 
     current_url = url
 
@@ -126,50 +354,340 @@ class IntercoolerQueryDict(QueryDict):
                                              attrs=", ".join(attrs))
 
 
+IC_KEYS = ('ic-current-url', 'ic-element-id', 'ic-element-name', 'ic-id',
+           'ic-prompt-value', 'ic-target-id', 'ic-trigger-id',
+           'ic-trigger-name', 'ic-request')
+
+
+class QueryDictView(object):
+    """
+    A read-only view over a ``QueryDict`` which hides the given keys, without
+    copying the underlying data.
+
+    Supports the reading half of the ``QueryDict`` API; use ``copy()`` to get
+    a real (mutable) ``QueryDict`` of the visible data.
+    """
+    __slots__ = ('_data', '_hidden')
+
+    def __init__(self, data, hidden):
+        self._data = data
+        self._hidden = frozenset(hidden)
+
+    @property
+    def encoding(self):
+        return self._data.encoding
+
+    def __contains__(self, key):
+        return key not in self._hidden and key in self._data
+
+    def __getitem__(self, key):
+        if key in self._hidden:
+            raise MultiValueDictKeyError(key)
+        return self._data[key]
+
+    def __iter__(self):
+        hidden = self._hidden
+        return (key for key in self._data if key not in hidden)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def get(self, key, default=None):
+        if key in self._hidden:
+            return default
+        return self._data.get(key, default)
+
+    def getlist(self, key, default=None):
+        if key in self._hidden:
+            return [] if default is None else default
+        return self._data.getlist(key, default)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(key, self._data[key]) for key in self]
+
+    def lists(self):
+        return [(key, self._data.getlist(key)) for key in self]
+
+    def values(self):
+        return [self._data[key] for key in self]
+
+    def dict(self):
+        return {key: self._data[key] for key in self}
+
+    def copy(self):
+        qd = QueryDict('', mutable=True, encoding=self.encoding)
+        for key, values in self.lists():
+            qd.setlist(key, list(values))
+        return qd
+
+    def urlencode(self, safe=None):
+        return self.copy().urlencode(safe=safe)
+
+    def __reduce__(self):
+        return (self.__class__, (self._data, self._hidden))
+
+    def __repr__(self):
+        return "<{cls!s}: {data!r}>".format(cls=self.__class__.__name__,
+                                            data=dict(self.lists()))
+
+
+class IntercoolerParams(object):
+    """
+    The ``ic-*`` values of a request (and ``_method``), parsed once when
+    created, as ``request.intercooler_data``. It can't be changed, and is
+    cheap to keep around, log or pickle (pickling leaves out ``app_data``).
+
+    The derived values (``element``, ``target_id`` and so on) are plain
+    attributes, except ``id``, which is converted on access (raising
+    ``ValueError`` if ``ic-id`` isn't a number), and ``url``, whose
+    ``ResolverMatch`` is looked up on first access and then remembered.
+
+    Supports the reading half of the ``QueryDict`` API for the raw values;
+    ``querydict()`` returns an equivalent (immutable)
+    ``IntercoolerQueryDict`` for code which needs a real ``QueryDict``, and
+    ``copy()`` a mutable one.
+    """
+    __slots__ = ('_data', 'encoding', 'app_data', 'changed_method',
+                 'request', 'target_id', 'element', 'trigger', 'prompt_value',
+                 '_url_cache')
+
+    def __init__(self, data, encoding=None, app_data=None,
+                 changed_method=False):
+        get = data.get
+        init = object.__setattr__
+        init(self, '_data', data)
+        init(self, 'encoding', encoding or settings.DEFAULT_CHARSET)
+        init(self, 'app_data', app_data)
+        init(self, 'changed_method', changed_method)
+        init(self, 'request', bool(get('ic-request')))
+        init(self, 'target_id', get('ic-target-id'))
+        init(self, 'element', NameId(get('ic-element-name'),
+                                     get('ic-element-id')))
+        init(self, 'trigger', NameId(get('ic-trigger-name'),
+                                     get('ic-trigger-id')))
+        init(self, 'prompt_value', get('ic-prompt-value'))
+        init(self, '_url_cache', IntercoolerQueryDict._url_cache)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{cls!s} is immutable".format(
+            cls=self.__class__.__name__))
+
+    __delattr__ = __setattr__
+
+    id = IntercoolerQueryDict.id
+    url = IntercoolerQueryDict.url
+    current_url = url
+
+    def __reduce__(self):
+        # app_data is a view of the whole of request.GET (or POST).
+        return (self.__class__, (self._data, self.encoding, None,
+                                 self.changed_method))
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __getitem__(self, key):
+        try:
+            return self._data[key]
+        except KeyError:
+            raise MultiValueDictKeyError(key)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def getlist(self, key, default=None):
+        if key in self._data:
+            return [self._data[key]]
+        return [] if default is None else default
+
+    def keys(self):
+        return list(self._data)
+
+    def items(self):
+        return list(self._data.items())
+
+    def lists(self):
+        return [(key, [value]) for key, value in self._data.items()]
+
+    def values(self):
+        return list(self._data.values())
+
+    def dict(self):
+        return dict(self._data)
+
+    def querydict(self, mutable=False):
+        """
+        The same data as an ``IntercoolerQueryDict``, for code which needs
+        a real ``QueryDict``.
+        """
+        qd = IntercoolerQueryDict('', mutable=True, encoding=self.encoding)
+        for key, value in self._data.items():
+            qd.setlist(key, [value])
+        qd.app_data = self.app_data
+        qd.changed_method = self.changed_method
+        qd._mutable = mutable
+        return qd
+
+    def copy(self):
+        return self.querydict(mutable=True)
+
+    def urlencode(self, safe=None):
+        return self.querydict().urlencode(safe=safe)
+
+    def __repr__(self):
+        props = ('id', 'request', 'target_id', 'element', 'trigger',
+                 'prompt_value', 'url')
+        attrs = ['{name!s}={val!r}'.format(name=prop, val=getattr(self, prop))
+                 for prop in props]
+        return "<{cls!s}: {attrs!s}>".format(cls=self.__class__.__name__,
+                                             attrs=", ".join(attrs))
+
+
+def _preserve_request_data():
+    return getattr(settings, 'INTERCOOLER_HELPERS_PRESERVE_REQUEST_DATA',
+                   False)
+
+
 def intercooler_data(self):
     if not hasattr(self, '_processed_intercooler_data'):
-        IC_KEYS = ['ic-current-url', 'ic-element-id', 'ic-element-name',
-                   'ic-id', 'ic-prompt-value', 'ic-target-id',
-                   'ic-trigger-id', 'ic-trigger-name', 'ic-request']
-        ic_qd = IntercoolerQueryDict('', encoding=self.encoding)
         if self.method in ('GET', 'HEAD', 'OPTIONS'):
             query_params = self.GET
         else:
             query_params = self.POST
-        query_keys = tuple(query_params.keys())
-        for ic_key in IC_KEYS:
-            if ic_key in query_keys:
-                # emulate how .get() behaves, because pop returns the
-                # whole shebang.
-                # For a little while, we need to pop data out of request.GET
-                with _mutate_querydict(query_params) as REQUEST_DATA:
-                    try:
-                        removed = REQUEST_DATA.pop(ic_key)[-1]
-                    except IndexError:
-                        removed = []
-                with _mutate_querydict(ic_qd) as IC_DATA:
-                    IC_DATA.update({ic_key: removed})
+        # Membership tests are O(1), so this is a single pass over IC_KEYS
+        # regardless of how many fields the form had.
+        found = [ic_key for ic_key in IC_KEYS if ic_key in query_params]
+        data = {}
+        for ic_key in found:
+            # emulate how .get() behaves, only keeping the last value.
+            values = query_params.getlist(ic_key)
+            if values:
+                data[ic_key] = values[-1]
         # Don't pop these ones off, so that decisions can be made for
         # handling _method
-        ic_request = query_params.get('_method')
-        with _mutate_querydict(ic_qd) as IC_DATA:
-            IC_DATA.update({'_method': ic_request})
-        # If HttpMethodOverride is in the middleware stack, this may
-        # return True.
-        IC_DATA.changed_method = getattr(self, 'changed_method', False)
-        self._processed_intercooler_data = ic_qd
+        data['_method'] = query_params.get('_method')
+        if found and not _preserve_request_data():
+            with _mutate_querydict(query_params) as REQUEST_DATA:
+                for ic_key in found:
+                    del REQUEST_DATA[ic_key]
+        self._processed_intercooler_data = IntercoolerParams(
+            data, encoding=self.encoding,
+            app_data=QueryDictView(query_params, IC_KEYS),
+            # If HttpMethodOverride is in the middleware stack, this may
+            # be True.
+            changed_method=getattr(self, 'changed_method', False))
     return self._processed_intercooler_data
 
 
-class IntercoolerData(MiddlewareMixin):
+def _intercooler_headers(self):
+    return IntercoolerHeaders()
+
+
+class IntercoolerRequestMixin(object):
+    """
+    Provides ``maybe_intercooler()``, ``is_intercooler()`` and the lazy
+    ``intercooler_data`` and ``intercooler_headers`` attributes at the class
+    level, so that nothing needs to be allocated per request to make them
+    available.
+
+    ``IntercoolerData`` mixes this into the class of each request it sees.
+    """
+    maybe_intercooler = _maybe_intercooler
+    is_intercooler = _is_intercooler
+    intercooler_data = cached_property(intercooler_data,
+                                       name='intercooler_data')
+    intercooler_headers = cached_property(_intercooler_headers,
+                                          name='intercooler_headers')
+
+
+_request_classes = {}
+
+
+def _intercooler_request_class(cls):
+    try:
+        return _request_classes[cls]
+    except KeyError:
+        name = str('Intercooler{name!s}'.format(name=cls.__name__))
+        new_cls = type(name, (IntercoolerRequestMixin, cls), {})
+        return _request_classes.setdefault(cls, new_cls)
+
+
+class IntercoolerData(_InlineAsyncMiddlewareMixin):
+    """
+    Makes ``request.is_intercooler()``, ``request.intercooler_data`` and
+    friends available. Requests outside the scope set by
+    ``INTERCOOLER_HELPERS_SCOPE_*`` are otherwise left alone: they only get
+    ``is_intercooler()`` and ``maybe_intercooler()``, which return ``False``,
+    so the rest of this app's middleware ignores them too.
+    """
+    def __init__(self, *args, **kwargs):
+        super(IntercoolerData, self).__init__(*args, **kwargs)
+        get_index()
+
+    def process_request(self, request):
+        if not _in_scope(request):
+            request.is_intercooler = request.maybe_intercooler = \
+                _not_intercooler
+            return
+        # Swapping the class means the only per-request cost is a dictionary
+        # lookup; the original request class is never modified.
+        if not isinstance(request, IntercoolerRequestMixin):
+            request.__class__ = _intercooler_request_class(request.__class__)
+
+
+class IntercoolerResponseHeaders(_InlineAsyncMiddlewareMixin):
+    """
+    Writes out the ``X-IC-*`` headers collected in
+    ``request.intercooler_headers`` during the request, and makes them
+    available to code without access to the request via
+    ``intercooler_helpers.headers.current_headers()``.
+
+    Must come after ``IntercoolerData``.
+    """
     def process_request(self, request):
-        request.maybe_intercooler = _maybe_intercooler.__get__(request)
-        request.is_intercooler = _is_intercooler.__get__(request)
-        request.intercooler_data = SimpleLazyObject(intercooler_data.__get__(request))
+        _set_current_request(request)
+
+    def process_response(self, request, response):
+        _set_current_request(None)
+        # Only present if something asked for it, so most requests skip this.
+        headers = request.__dict__.get('intercooler_headers')
+        if headers:
+            headers.apply(response)
+        return response
 
 
+class IntercoolerRedirector(_InlineAsyncMiddlewareMixin):
+    """
+    Turns redirects in response to Intercooler.js requests into
+    ``X-IC-Redirect`` headers, so the browser follows them.
+
+    With ``INTERCOOLER_HELPERS_FOLLOW_REDIRECTS``, redirects to this site
+    which resolve to a view are instead followed here, and the view's
+    response is sent back straight away with ``X-IC-PushURL`` set, saving a
+    round trip. The view is given a ``GET`` (or ``HEAD``) for the new URL with
+    the same ``ic-*`` parameters, so that it can respond with a fragment.
+    """
+    def __init__(self, *args, **kwargs):
+        super(IntercoolerRedirector, self).__init__(*args, **kwargs)
+        self.follow = getattr(settings, 'INTERCOOLER_HELPERS_FOLLOW_REDIRECTS',
+                              False)
+        if self.follow:
+            # Following a redirect runs a view, which mustn't happen on the
+            # event loop, so use the normal async handling instead.
+            acall = getattr(super(_InlineAsyncMiddlewareMixin, self),
+                            '__acall__', None)
+            if acall is not None:
+                self.__acall__ = acall
 
-class IntercoolerRedirector(MiddlewareMixin):
     def process_response(self, request, response):
         if not request.is_intercooler():
             return response
@@ -177,9 +695,213 @@ class IntercoolerRedirector(MiddlewareMixin):
             if response.has_header('Location'):
                 url = response['Location']
                 del response['Location']
-                new_resp = HttpResponse()
-                for k, v in response.items():
-                    new_resp[k] = v
-                new_resp['X-IC-Redirect'] = url
-                return new_resp
+                response.status_code = 200
+                response.reason_phrase = 'OK'
+                if self.follow and self.follow_redirect(request, response,
+                                                        url):
+                    return response
+                # Intercooler.js ignores the body of a redirect.
+                _empty_response(response)
+                response['X-IC-Redirect'] = url
+        return response
+
+    def get_local_url(self, request, url):
+        """
+        The path and querystring (relative to the script prefix) of ``url``,
+        if it's on this site, or ``None``.
+        """
+        parts = urlsplit(urljoin(request.path, url))
+        if parts.scheme and parts.scheme != request.scheme:
+            return None
+        if parts.netloc:
+            try:
+                host = request.get_host()
+            except DisallowedHost:
+                return None
+            if parts.netloc != host:
+                return None
+        script_name = request.path[:len(request.path) -
+                                   len(request.path_info)].rstrip('/')
+        path = parts.path
+        if script_name:
+            if not path.startswith(script_name + '/'):
+                return None
+            path = path[len(script_name):]
+        return urlunsplit(('', '', path, parts.query, ''))
+
+    def follow_redirect(self, request, response, url):
+        """
+        Replaces the body and headers of ``response`` with those of the view
+        ``url`` resolves to, returning whether it did. Async views are left
+        to the browser, and errors are logged and left to it too.
+        """
+        # batch imports this module.
+        from .batch import SubRequestError, clone_request, dispatch_subrequest
+        if response.status_code in (307, 308) and request.method not in (
+                'GET', 'HEAD'):
+            # The browser would repeat the request, body and all.
+            return False
+        local_url = self.get_local_url(request, url)
+        if local_url is None:
+            return False
+        match = cached_resolve(urlsplit(local_url).path)
+        if match is None or iscoroutinefunction(match.func):
+            return False
+        data = request.intercooler_data
+        ic_data = dict((key, data[key]) for key in IC_KEYS if key in data)
+        method = 'HEAD' if request.method == 'HEAD' else 'GET'
+        try:
+            clone = clone_request(request, local_url, method=method,
+                                  data=ic_data,
+                                  headers={'X-IC-Request': 'true'})
+            result = dispatch_subrequest(clone)
+        except (SubRequestError, Http404, PermissionDenied):
+            return False
+        except Exception:
+            logger.exception("Couldn't follow the redirect to %s", url)
+            return False
+        if result is None:
+            return False
+        followed, content = result
+        if followed.status_code != 200:
+            return False
+        response.content = content.encode(followed.charset)
+        for key, value in followed.items():
+            response[key] = value
+        response.cookies.update(followed.cookies)
+        response['X-IC-PushURL'] = url
+        return True
+
+
+def _client_key(request):
+    # Only the session identifies a client; tabs and people sharing an IP
+    # address and user agent can't be told apart.
+    session = getattr(request, 'session', None)
+    return getattr(session, 'session_key', None) or None
+
+
+def _empty_response(response):
+    response.content = b''
+    if response.has_header('Content-Length'):
+        response['Content-Length'] = '0'
+    return response
+
+
+LoadSnapshot = namedtuple('LoadSnapshot', 'in_flight latency last_overloaded')
+
+
+class LoadMonitor(object):
+    """
+    Thread-safe tracking of how many requests are in flight, and an
+    exponentially weighted moving average of how long they take.
+    """
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self.in_flight = 0
+        self.latency = 0.0
+        self.last_overloaded = None
+        self._lock = Lock()
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+        return default_timer()
+
+    def finished(self, started):
+        elapsed = default_timer() - started
+        with self._lock:
+            self.in_flight -= 1
+            self.latency += self.alpha * (elapsed - self.latency)
+        return elapsed
+
+    def overloaded(self, now):
+        self.last_overloaded = now
+
+    def snapshot(self):
+        with self._lock:
+            return LoadSnapshot(in_flight=self.in_flight, latency=self.latency,
+                                last_overloaded=self.last_overloaded)
+
+
+class IntercoolerPollingBackpressure(_InlineAsyncMiddlewareMixin):
+    """
+    Slows down (and later restores) Intercooler.js polling when the server
+    is busy, using the ``X-IC-SetPollInterval`` response header.
+
+    Only ``GET`` requests whose ``ic-target-id`` is a key of
+    ``INTERCOOLER_HELPERS_POLL_INTERVALS`` (mapping it to that element's
+    ``ic-poll`` interval, in seconds) or one of
+    ``INTERCOOLER_HELPERS_POLL_LOW_PRIORITY_TARGETS`` count as polling, as
+    the headers affect whichever element nearest the target polls.
+
+    Load is the larger of in-flight requests relative to
+    ``INTERCOOLER_HELPERS_POLL_MAX_IN_FLIGHT``, and the average latency
+    relative to ``INTERCOOLER_HELPERS_POLL_TARGET_LATENCY``. Above ``1``,
+    the target's interval is stretched in proportion to the load (but never
+    shortened); above ``INTERCOOLER_HELPERS_POLL_SHED_LOAD``, low priority
+    targets have their polling cancelled outright.
+
+    Responses which already set any polling headers are left alone.
+    """
+    monitor = LoadMonitor()
+    polling_headers = ('X-IC-SetPollInterval', 'X-IC-CancelPolling',
+                       'X-IC-ResumePolling')
+
+    def __init__(self, *args, **kwargs):
+        super(IntercoolerPollingBackpressure, self).__init__(*args, **kwargs)
+        self.intervals = dict(getattr(
+            settings, 'INTERCOOLER_HELPERS_POLL_INTERVALS', {}))
+        self.max_interval = getattr(
+            settings, 'INTERCOOLER_HELPERS_POLL_MAX_INTERVAL', 30.0)
+        self.max_in_flight = getattr(
+            settings, 'INTERCOOLER_HELPERS_POLL_MAX_IN_FLIGHT', 50)
+        self.target_latency = getattr(
+            settings, 'INTERCOOLER_HELPERS_POLL_TARGET_LATENCY', 0.25)
+        self.shed_load = getattr(settings, 'INTERCOOLER_HELPERS_POLL_SHED_LOAD',
+                                 2.0)
+        self.low_priority_targets = frozenset(getattr(
+            settings, 'INTERCOOLER_HELPERS_POLL_LOW_PRIORITY_TARGETS', ()))
+        # How long after the last overload clients are told to go back to
+        # their own interval.
+        self.recovery = getattr(settings, 'INTERCOOLER_HELPERS_POLL_RECOVERY',
+                                self.max_interval * 2)
+
+    def load(self, snapshot):
+        return max(snapshot.in_flight / float(self.max_in_flight),
+                   snapshot.latency / float(self.target_latency))
+
+    def process_request(self, request):
+        request._intercooler_polling_started = self.monitor.started()
+
+    def process_response(self, request, response):
+        started = getattr(request, '_intercooler_polling_started', None)
+        if started is None:
+            return response
+        del request._intercooler_polling_started
+        self.monitor.finished(started)
+        if request.method != 'GET' or not request.is_intercooler():
+            return response
+        target_id = request.intercooler_data.target_id
+        interval = self.intervals.get(target_id)
+        low_priority = target_id in self.low_priority_targets
+        if interval is None and not low_priority:
+            return response
+        if any(response.has_header(h) for h in self.polling_headers):
+            return response
+        snapshot = self.monitor.snapshot()
+        load = self.load(snapshot)
+        now = default_timer()
+        if load > 1:
+            self.monitor.overloaded(now)
+            if load >= self.shed_load and low_priority:
+                response['X-IC-CancelPolling'] = 'true'
+            elif interval is not None:
+                stretched = max(min(interval * load, self.max_interval),
+                                interval)
+                response['X-IC-SetPollInterval'] = '{:.0f}ms'.format(
+                    stretched * 1000)
+        elif (interval is not None and snapshot.last_overloaded is not None
+                and now - snapshot.last_overloaded < self.recovery):
+            response['X-IC-SetPollInterval'] = '{:.0f}ms'.format(
+                interval * 1000)
         return response
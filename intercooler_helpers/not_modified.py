@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.encoding import force_bytes
+
+from .middleware import MiddlewareMixin, _client_key, _empty_response
+
+
+__all__ = ['IntercoolerNotModified']
+
+
+def _etag_matches(etag, if_none_match):
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag or candidate == '*':
+            return True
+    return False
+
+
+class IntercoolerNotModified(MiddlewareMixin):
+    """
+    Avoids re-sending identical fragments (eg: to polling elements) to
+    Intercooler.js clients.
+
+    For successful Intercooler.js GET requests, the response body is
+    fingerprinted and sent as an ``ETag`` if there isn't one already. Then:
+
+    - if the request's ``If-None-Match`` matches, the response becomes a 304;
+    - otherwise, if this client was last sent the same fingerprint for this
+      path, target element and page (``ic-current-url``), the body is
+      emptied, which Intercooler.js treats as nothing to swap.
+
+    Requests without a session, ``ic-target-id`` or ``ic-current-url``
+    always get the full body, as whoever sent them can't be told apart from
+    another tab (or person) which never received the fragment.
+
+    Headers (eg: ``X-IC-CancelPolling``) are always left untouched.
+    """
+    def get_client_key(self, request):
+        return _client_key(request)
+
+    def get_cache_key(self, request):
+        data = request.intercooler_data
+        current_url = data.get('ic-current-url')
+        if not data.target_id or not current_url:
+            return None
+        client_key = self.get_client_key(request)
+        if client_key is None:
+            return None
+        parts = (client_key, current_url, request.path,
+                 data.app_data.urlencode(), data.target_id)
+        digest = hashlib.md5(force_bytes('\n'.join(parts))).hexdigest()
+        return 'intercooler_helpers.not_modified.{}'.format(digest)
+
+    def process_response(self, request, response):
+        if request.method not in ('GET', 'HEAD'):
+            return response
+        if response.status_code != 200 or response.streaming:
+            return response
+        if not request.is_intercooler():
+            return response
+        if not response.has_header('ETag'):
+            digest = hashlib.md5(response.content).hexdigest()
+            response['ETag'] = '"{}"'.format(digest)
+        etag = response['ETag']
+        if _etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response.status_code = 304
+            return _empty_response(response)
+        key = self.get_cache_key(request)
+        if key is None:
+            return response
+        cache = caches[getattr(settings,
+                               'INTERCOOLER_HELPERS_NOT_MODIFIED_CACHE',
+                               'default')]
+        timeout = getattr(settings, 'INTERCOOLER_HELPERS_NOT_MODIFIED_TIMEOUT',
+                          300)
+        if cache.get(key) == etag:
+            return _empty_response(response)
+        cache.set(key, etag, timeout)
+        return response
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+from django.core import signing
+from django.core.exceptions import SuspiciousOperation
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model, Q
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template
+from django.utils.html import format_html, format_html_join
+
+from .middleware import IC_KEYS
+
+
+__all__ = ['InvalidCursor', 'encode_cursor', 'decode_cursor', 'KeysetPage',
+           'next_page_element', 'KeysetStreamingMixin']
+
+
+_SALT = 'intercooler_helpers.pagination'
+
+
+class InvalidCursor(SuspiciousOperation):
+    pass
+
+
+class _CursorSerializer(object):
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'),
+                          cls=DjangoJSONEncoder).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+def encode_cursor(values):
+    """
+    An opaque, tamper-proof string for the ordering values of the last row
+    sent.
+    """
+    return signing.dumps(list(values), salt=_SALT,
+                         serializer=_CursorSerializer, compress=True)
+
+
+def decode_cursor(cursor):
+    try:
+        values = signing.loads(cursor, salt=_SALT,
+                               serializer=_CursorSerializer)
+    except signing.BadSignature:
+        raise InvalidCursor("Invalid pagination cursor")
+    if not isinstance(values, list):
+        raise InvalidCursor("Invalid pagination cursor")
+    return values
+
+
+def _ordering_fields(queryset, ordering):
+    fields = [(name[1:], True) if name.startswith('-') else (name, False)
+              for name in ordering]
+    pk_names = ('pk', queryset.model._meta.pk.name)
+    # Rows are only told apart reliably if the ordering ends with a unique
+    # field.
+    if not any(name in pk_names for name, _ in fields):
+        fields.append(('pk', fields[-1][1] if fields else False))
+    return fields
+
+
+def _row_value(row, name):
+    value = row
+    for attr in name.split('__'):
+        value = getattr(value, attr)
+    if isinstance(value, Model):
+        value = value.pk
+    return value
+
+
+def _after(fields, values):
+    # (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(fields, values):
+        lookup = '{}__{}'.format(name, 'lt' if descending else 'gt')
+        condition |= equal & Q(**{lookup: value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+class KeysetPage(object):
+    """
+    Up to ``page_size`` rows of ``queryset`` in ``ordering``, starting after
+    the row ``cursor`` was made from. Rows are fetched as the page is
+    iterated, and each page costs the same however deep it is (given an
+    index matching ``ordering``).
+
+    ``next_cursor`` is only known once the page has been iterated, and is
+    ``None`` if there are no more rows. The fields in ``ordering`` mustn't be
+    nullable, and the primary key is added to it if it isn't there already.
+    """
+    def __init__(self, queryset, ordering, page_size=25, cursor=None):
+        self.fields = _ordering_fields(queryset, ordering)
+        self.page_size = page_size
+        self.cursor = cursor
+        self.next_cursor = None
+        queryset = queryset.order_by(*(
+            '-' + name if descending else name
+            for name, descending in self.fields))
+        if cursor is not None:
+            values = decode_cursor(cursor)
+            if len(values) != len(self.fields):
+                raise InvalidCursor("Invalid pagination cursor")
+            queryset = queryset.filter(_after(self.fields, values))
+        self.queryset = queryset
+
+    def __iter__(self):
+        last = None
+        count = 0
+        # One more row than needed shows whether there's a next page.
+        for row in self.queryset[:self.page_size + 1].iterator():
+            if count == self.page_size:
+                self.next_cursor = encode_cursor(
+                    _row_value(last, name) for name, _ in self.fields)
+                return
+            count += 1
+            last = row
+            yield row
+
+
+def next_page_element(request, page, tag='div', target=None, indicator=None,
+                      trigger='scrolled-into-view', cursor_param='cursor',
+                      url=None):
+    """
+    The element which appends the next page to ``target`` once scrolled into
+    view, or an empty string if ``page`` was the last one.
+    """
+    if page.next_cursor is None:
+        return ''
+    query = request.GET.copy()
+    for key in IC_KEYS:
+        query.pop(key, None)
+    query[cursor_param] = page.next_cursor
+    attrs = [('ic-append-from', '{}?{}'.format(url or request.path,
+                                               query.urlencode())),
+             ('ic-trigger-on', trigger)]
+    if target:
+        attrs.append(('ic-target', target))
+    if indicator:
+        attrs.append(('ic-indicator', indicator))
+    return format_html('<{tag} {attrs}></{tag}>', tag=tag,
+                       attrs=format_html_join(' ', '{}="{}"', attrs))
+
+
+class KeysetStreamingMixin(object):
+    """
+    For use with ``TemplateView`` (or anything else with
+    ``get_context_data``), to paginate ``get_queryset()`` by ``ordering``
+    for infinite scrolling.
+
+    Normal requests get the full page, with the first ``KeysetPage`` in the
+    context as ``page``; use ``{% ic_next_page page %}`` after the rows.
+    Intercooler.js requests get a ``StreamingHttpResponse`` of each row
+    rendered with ``row_template_name`` (as ``object``), followed by the next
+    page element, so the client gets the first rows as soon as they're
+    rendered.
+    """
+    queryset = None
+    ordering = ('pk',)
+    page_size = 25
+    cursor_param = 'cursor'
+    row_template_name = None
+    next_page_tag = 'div'
+    next_page_target = None
+    next_page_indicator = None
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    def get_page(self):
+        return KeysetPage(self.get_queryset(), self.ordering,
+                          page_size=self.page_size,
+                          cursor=self.request.GET.get(self.cursor_param))
+
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault('page', self.get_page())
+        return super(KeysetStreamingMixin, self).get_context_data(**kwargs)
+
+    def get(self, request, *args, **kwargs):
+        if request.is_intercooler():
+            return StreamingHttpResponse(self.render_rows(self.get_page()))
+        return super(KeysetStreamingMixin, self).get(request, *args, **kwargs)
+
+    def render_rows(self, page):
+        template = get_template(self.row_template_name)
+        for row in page:
+            yield template.render({'object': row, 'view': self}, self.request)
+        yield next_page_element(self.request, page, tag=self.next_page_tag,
+                                target=self.next_page_target,
+                                indicator=self.next_page_indicator,
+                                cursor_param=self.cursor_param)
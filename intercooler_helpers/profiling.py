@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import cProfile
+import marshal
+import os
+import random
+import re
+import time
+from collections import deque, namedtuple
+from threading import Lock
+from timeit import default_timer
+
+from django.conf import settings
+from django.contrib.auth.decorators import user_passes_test
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.utils.html import format_html, format_html_join
+from django.utils.module_loading import import_string
+
+from .middleware import MiddlewareMixin
+
+
+__all__ = ['ProfileRecord', 'LocalProfileStore', 'DirectoryProfileStore',
+           'get_store', 'IntercoolerProfiler', 'profiles_view']
+
+
+ProfileRecord = namedtuple('ProfileRecord',
+                           'id created view target method path duration')
+
+
+class LocalProfileStore(object):
+    """
+    Keeps the last ``size`` profiles in memory, in the format written by
+    ``cProfile.Profile.dump_stats``. Each process has its own.
+
+    Other stores need to provide ``add``, ``records`` and ``data`` with the
+    same signatures.
+    """
+    def __init__(self, size=50):
+        self._records = deque(maxlen=size)
+        self._data = {}
+        self._last_id = 0
+        self._lock = Lock()
+
+    def _next_id(self):
+        self._last_id += 1
+        return '{:d}-{:d}'.format(os.getpid(), self._last_id)
+
+    def add(self, data, **info):
+        with self._lock:
+            record = ProfileRecord(id=self._next_id(), created=time.time(),
+                                   **info)
+            if len(self._records) == self._records.maxlen:
+                self._discard(self._records[0])
+            self._records.append(record)
+            self._save(record, data)
+        return record
+
+    def _save(self, record, data):
+        self._data[record.id] = data
+
+    def _discard(self, record):
+        self._data.pop(record.id, None)
+
+    def records(self):
+        """
+        The stored profiles, newest first.
+        """
+        with self._lock:
+            return list(reversed(self._records))
+
+    def data(self, profile_id):
+        """
+        The profile's ``pstats``-compatible data, or ``None`` if it has
+        been discarded.
+        """
+        with self._lock:
+            return self._data.get(profile_id)
+
+
+class DirectoryProfileStore(LocalProfileStore):
+    """
+    Writes profiles to ``directory`` (default:
+    ``INTERCOOLER_HELPERS_PROFILE_DIRECTORY``), as ``.prof`` files which
+    ``python -m pstats`` and similar tools can open, deleting all but the last
+    ``size`` this process wrote.
+    """
+    def __init__(self, size=50, directory=None):
+        super(DirectoryProfileStore, self).__init__(size=size)
+        if directory is None:
+            directory = settings.INTERCOOLER_HELPERS_PROFILE_DIRECTORY
+        self.directory = directory
+
+    def _path(self, record):
+        return os.path.join(self.directory, '{}.prof'.format(record.id))
+
+    def _save(self, record, data):
+        with open(self._path(record), 'wb') as f:
+            f.write(data)
+
+    def _discard(self, record):
+        try:
+            os.remove(self._path(record))
+        except OSError:
+            pass
+
+    def data(self, profile_id):
+        with self._lock:
+            records = [r for r in self._records if r.id == profile_id]
+        if not records:
+            return None
+        try:
+            with open(self._path(records[0]), 'rb') as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+
+_store = None
+_store_lock = Lock()
+
+
+def get_store():
+    """
+    The store named by ``INTERCOOLER_HELPERS_PROFILE_STORE``, shared by the
+    whole process.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = getattr(
+                    settings, 'INTERCOOLER_HELPERS_PROFILE_STORE',
+                    'intercooler_helpers.profiling.LocalProfileStore')
+                _store = import_string(path)()
+    return _store
+
+
+class IntercoolerProfiler(MiddlewareMixin):
+    """
+    Runs ``cProfile`` over a sample of Intercooler.js requests, and keeps the
+    results in ``get_store()`` for ``profiles_view`` to list.
+
+    A request is profiled if any of:
+
+    - a random ``INTERCOOLER_HELPERS_PROFILE_SAMPLE_RATE`` fraction of
+      requests (default: ``0``) is hit;
+    - its ``X-IC-Profile`` header matches
+      ``INTERCOOLER_HELPERS_PROFILE_TOKEN`` (default: unset, so never);
+    - its ``ic-element-id`` is in ``INTERCOOLER_HELPERS_PROFILE_ELEMENTS``.
+
+    Add it after ``IntercoolerData``, and as near the bottom as possible, so
+    that it mostly measures the view. Only useful under WSGI, as the
+    profiler follows a single thread.
+    """
+    def __init__(self, *args, **kwargs):
+        super(IntercoolerProfiler, self).__init__(*args, **kwargs)
+        self.sample_rate = getattr(
+            settings, 'INTERCOOLER_HELPERS_PROFILE_SAMPLE_RATE', 0.0)
+        self.token = getattr(settings, 'INTERCOOLER_HELPERS_PROFILE_TOKEN',
+                             None)
+        self.elements = frozenset(getattr(
+            settings, 'INTERCOOLER_HELPERS_PROFILE_ELEMENTS', ()))
+
+    def should_profile(self, request):
+        if not request.is_intercooler():
+            return False
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if self.token:
+            header = request.META.get('HTTP_X_IC_PROFILE', '')
+            if header and constant_time_compare(header, self.token):
+                return True
+        if self.elements:
+            return request.intercooler_data.element.id in self.elements
+        return False
+
+    def process_request(self, request):
+        if not self.should_profile(request):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Something else is already profiling this thread.
+            return None
+        request._intercooler_profiler = (profiler, default_timer())
+
+    def process_response(self, request, response):
+        started = request.__dict__.pop('_intercooler_profiler', None)
+        if started is None:
+            return response
+        profiler, start = started
+        profiler.disable()
+        duration = default_timer() - start
+        profiler.create_stats()
+        match = getattr(request, 'resolver_match', None)
+        view = '' if match is None else match.view_name or match._func_path
+        get_store().add(marshal.dumps(profiler.stats), view=view,
+                        target=request.intercooler_data.target_id or '',
+                        method=request.method, path=request.path,
+                        duration=duration)
+        return response
+
+
+def _filename(record):
+    name = '-'.join(part for part in (record.view, record.target, record.id)
+                    if part)
+    return '{}.prof'.format(re.sub(r'[^\w.-]+', '_', name))
+
+
+def _is_staff(user):
+    return user.is_active and user.is_staff
+
+
+@user_passes_test(_is_staff)
+def profiles_view(request):
+    """
+    Lists the stored profiles (optionally only those matching the ``view``
+    and ``target`` querystring parameters) for staff, with links to
+    download each as a ``.prof`` file via ``?download=<id>``.
+    """
+    store = get_store()
+    download = request.GET.get('download')
+    if download:
+        records = [r for r in store.records() if r.id == download]
+        data = store.data(download) if records else None
+        if data is None:
+            raise Http404("No such profile")
+        response = HttpResponse(data, content_type='application/octet-stream')
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+            _filename(records[0]))
+        return response
+    records = store.records()
+    for key in ('view', 'target'):
+        value = request.GET.get(key)
+        if value is not None:
+            records = [r for r in records if getattr(r, key) == value]
+    rows = format_html_join(
+        '\n', '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td>'
+              '<td>{}ms</td><td><a href="?download={}">download</a></td>'
+              '</tr>',
+        ((time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(r.created)),
+          r.view, r.target, r.method, r.path,
+          '{:.1f}'.format(r.duration * 1000), r.id)
+         for r in records))
+    return HttpResponse(format_html(
+        '<!DOCTYPE html><html><head><title>Profiles</title></head><body>'
+        '<table><thead><tr><th>When</th><th>View</th><th>Target</th>'
+        '<th>Method</th><th>Path</th><th>Duration</th><th></th></tr></thead>'
+        '<tbody>{}</tbody></table></body></html>', rows))
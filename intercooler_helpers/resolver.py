@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+try:
+    from django.urls import Resolver404, get_resolver, get_urlconf, resolve
+except ImportError:  # Django <1.10
+    from django.core.urlresolvers import (Resolver404, get_resolver,
+                                          get_urlconf, resolve)
+try:
+    from django.core.signals import setting_changed
+except ImportError:  # pragma: no cover
+    from django.test.signals import setting_changed
+from django.dispatch import receiver
+
+
+__all__ = ['ResolverCache', 'resolver_cache', 'cached_resolve', 'cache_info',
+           'cache_clear']
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+class ResolverCache(object):
+    """
+    A bounded, thread-safe LRU mapping of (urlconf, path) to the
+    ``ResolverMatch`` Django would give for it (or ``None`` if it 404s).
+
+    Entries remember which resolver produced them; if Django's resolver has
+    been replaced (eg: ``clear_url_caches()`` was called, or ``ROOT_URLCONF``
+    was changed), the whole cache is thrown away on the next lookup.
+
+    The same ``ResolverMatch`` instance is handed out for repeated lookups,
+    so treat it as read-only.
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._resolvers = {}
+        self._lock = Lock()
+
+    def resolve(self, path):
+        urlconf = get_urlconf()
+        resolver = get_resolver(urlconf)
+        key = (urlconf, path)
+        with self._lock:
+            if self._resolvers.get(urlconf, resolver) is not resolver:
+                self._clear()
+            if key in self._data:
+                match = self._data.pop(key)
+                # re-insert to mark it as the most recently used.
+                self._data[key] = match
+                self.hits += 1
+                return match
+            self.misses += 1
+        try:
+            match = resolve(path, urlconf=urlconf)
+        except Resolver404:
+            match = None
+        if self.maxsize > 0:
+            with self._lock:
+                self._resolvers[urlconf] = resolver
+                self._data[key] = match
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return match
+
+    def _clear(self):
+        self._data.clear()
+        self._resolvers.clear()
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(hits=self.hits, misses=self.misses,
+                             maxsize=self.maxsize, currsize=len(self._data))
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return "<{cls!s}: {info!r}>".format(cls=self.__class__.__name__,
+                                            info=self.info())
+
+
+def _default_maxsize():
+    from django.conf import settings
+    return getattr(settings, 'INTERCOOLER_HELPERS_RESOLVER_CACHE_SIZE', 256)
+
+
+class _LazyResolverCache(ResolverCache):
+    """
+    Reads ``INTERCOOLER_HELPERS_RESOLVER_CACHE_SIZE`` on first use, so that
+    importing this module doesn't require settings to be configured.
+    """
+    def __init__(self):
+        super(_LazyResolverCache, self).__init__(maxsize=None)
+
+    def resolve(self, path):
+        if self.maxsize is None:
+            self.maxsize = _default_maxsize()
+        return super(_LazyResolverCache, self).resolve(path)
+
+
+resolver_cache = _LazyResolverCache()
+cached_resolve = resolver_cache.resolve
+cache_info = resolver_cache.info
+cache_clear = resolver_cache.clear
+
+
+@receiver(setting_changed)
+def _reset_resolver_cache(sender, setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        resolver_cache.clear()
+    elif setting == 'INTERCOOLER_HELPERS_RESOLVER_CACHE_SIZE':
+        resolver_cache.clear()
+        resolver_cache.maxsize = None
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from django.template.context import make_context
+from django.template.loader_tags import (BLOCK_CONTEXT_KEY, BlockContext,
+                                         BlockNode, ExtendsNode)
+from django.template.response import TemplateResponse
+
+
+__all__ = ['BlockNotFound', 'render_block', 'IntercoolerTemplateResponse']
+
+
+class BlockNotFound(LookupError):
+    pass
+
+
+def _block_context(template, context):
+    # Every block up the {% extends %} chain, the most derived last, as
+    # ExtendsNode.render collects them, so that blocks nested inside the
+    # one rendered (and {{ block.super }}) come out as in the full page.
+    block_context = BlockContext()
+    while template is not None:
+        block_context.add_blocks(dict(
+            (node.name, node)
+            for node in template.nodelist.get_nodes_by_type(BlockNode)))
+        parent = None
+        for node in template.nodelist.get_nodes_by_type(ExtendsNode):
+            parent = node.get_parent(context)
+            break
+        template = parent
+    return block_context
+
+
+def render_block(template, name, context=None, request=None):
+    """
+    Render only the ``{% block name %}`` of a template (as returned by
+    ``get_template`` or ``select_template``), skipping everything else,
+    including any ``{% extends %}`` parents. The block, and any blocks
+    within it, come out just as they would in the full page.
+
+    Raises ``BlockNotFound`` if the block doesn't exist, or the template
+    isn't from the ``DjangoTemplates`` backend.
+    """
+    base_template = getattr(template, 'template', template)
+    if not hasattr(base_template, 'nodelist'):
+        raise BlockNotFound("{name!r} cannot be extracted from {tmpl!r} "
+                            "as it isn't a Django template".format(
+                                name=name, tmpl=template))
+    context = make_context(context, request)
+    # bind_template runs any context processors, and allows tags like
+    # {% include %} and {% extends %} to find the template engine.
+    with context.bind_template(base_template):
+        block_context = _block_context(base_template, context)
+        node = block_context.get_block(name)
+        if node is None:
+            raise BlockNotFound("{name!r} is not a block in {tmpl!s}".format(
+                name=name, tmpl=base_template.name))
+        context.render_context[BLOCK_CONTEXT_KEY] = block_context
+        return node.render(context)
+
+
+class IntercoolerTemplateResponse(TemplateResponse):
+    """
+    A ``TemplateResponse`` which, for Intercooler.js requests, renders only a
+    single block of the full-page template, so that separate fragment
+    templates aren't required.
+
+    The block rendered is ``block`` if given, otherwise the block whose name
+    matches ``request.intercooler_data.target_id``, if there is one.
+    Non-Intercooler requests always get the full page.
+    """
+    def __init__(self, request, template, context=None, *args, **kwargs):
+        self.block = kwargs.pop('block', None)
+        super(IntercoolerTemplateResponse, self).__init__(
+            request, template, context, *args, **kwargs)
+
+    def resolve_block(self):
+        request = self._request
+        if not request.is_intercooler():
+            return None, False
+        if self.block is not None:
+            return self.block, True
+        return request.intercooler_data.target_id, False
+
+    @property
+    def rendered_content(self):
+        block, required = self.resolve_block()
+        if not block:
+            return super(IntercoolerTemplateResponse, self).rendered_content
+        template = self.resolve_template(self.template_name)
+        context = self.resolve_context(self.context_data)
+        try:
+            return render_block(template, block, context, self._request)
+        except BlockNotFound:
+            if required:
+                raise
+        return template.render(context, self._request)
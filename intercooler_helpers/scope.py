@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from threading import Lock
+
+from django.conf import settings
+from django.dispatch import receiver
+try:
+    from django.core.signals import setting_changed
+except ImportError:  # pragma: no cover
+    from django.test.signals import setting_changed
+try:
+    from django.urls import get_resolver
+except ImportError:  # Django <1.10
+    from django.core.urlresolvers import get_resolver
+try:
+    from django.urls import LocalePrefixPattern
+except ImportError:  # Django <2.0, where the resolver is the pattern
+    try:
+        from django.urls import LocaleRegexURLResolver as LocalePrefixPattern
+    except ImportError:  # Django <1.10
+        from django.core.urlresolvers import (
+            LocaleRegexURLResolver as LocalePrefixPattern)
+
+
+__all__ = ['PathIndex', 'uses_intercooler', 'find_prefixes', 'get_index',
+           'in_scope']
+
+
+_END = None
+_REGEX_SPECIAL = frozenset('.^$*+?{}[]\\|()')
+
+
+class PathIndex(object):
+    """
+    A trie of path prefixes, so that checking whether a path starts with
+    any of them takes (at most) one step per character of the path,
+    however many prefixes there are.
+    """
+    __slots__ = ('_root', '_size')
+
+    def __init__(self, prefixes=()):
+        self._root = {}
+        self._size = 0
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def add(self, prefix):
+        node = self._root
+        for char in prefix:
+            if _END in node:
+                # A shorter prefix already covers this one.
+                return
+            node = node.setdefault(char, {})
+        # ... and this one covers any longer ones.
+        node.clear()
+        node[_END] = True
+        self._size += 1
+
+    def matches(self, path):
+        node = self._root
+        if _END in node:
+            return True
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                return False
+            if _END in node:
+                return True
+        return False
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return "<{cls!s}: {size!r} prefixes>".format(
+            cls=self.__class__.__name__, size=self._size)
+
+
+def uses_intercooler(view):
+    """
+    Marks a view as one which Intercooler.js talks to, for
+    ``INTERCOOLER_HELPERS_SCOPE_VIEWS``.
+    """
+    view.uses_intercooler = True
+    return view
+
+
+def _literal_prefix(pattern):
+    # The fixed start of what a URL pattern matches, and whether that's all
+    # of it (so that any patterns included beneath it can be appended).
+    inner = getattr(pattern, 'pattern', pattern)  # Django 2.0+
+    if isinstance(inner, LocalePrefixPattern):
+        # The language prefix depends on the request.
+        return '', False
+    route = getattr(inner, '_route', None)
+    if route is not None:
+        literal = route.split('<', 1)[0]
+        return literal, literal == route
+    regex = getattr(inner, '_regex', None)
+    if regex is None:
+        regex = inner.regex.pattern
+    if '|' in regex:
+        return '', False
+    if regex.startswith('^'):
+        regex = regex[1:]
+    for index, char in enumerate(regex):
+        if char in _REGEX_SPECIAL:
+            # A trailing $ is only there to end the (complete) pattern.
+            return regex[:index], regex[index:] == '$'
+    return regex, True
+
+
+def _walk(patterns, prefix, namespace, namespaces, views, found):
+    for pattern in patterns:
+        literal, complete = _literal_prefix(pattern)
+        path = prefix + literal
+        if hasattr(pattern, 'url_patterns'):
+            current = namespace
+            if pattern.namespace:
+                current = '{}:{}'.format(namespace, pattern.namespace) \
+                    if namespace else pattern.namespace
+                if current in namespaces or pattern.namespace in namespaces:
+                    found.append(path)
+                    continue
+            if complete:
+                _walk(pattern.url_patterns, path, current, namespaces, views,
+                      found)
+            elif _walk(pattern.url_patterns, prefix, current, namespaces,
+                       views, []):
+                # Something beneath matched, but where it starts isn't
+                # fixed, so everything beneath is included.
+                found.append(path)
+        elif views and getattr(pattern.callback, 'uses_intercooler', False):
+            found.append(path)
+    return found
+
+
+def find_prefixes(paths=(), namespaces=(), views=False, urlconf=None):
+    """
+    ``paths``, plus the prefixes of everything included under any of the
+    URL ``namespaces``, plus (if ``views``) the prefixes of URL patterns for
+    views marked with ``uses_intercooler``.
+
+    Where a URL pattern doesn't start with fixed text, the fixed part before
+    it is used, which errs towards including more paths rather than fewer.
+    """
+    prefixes = list(paths)
+    if namespaces or views:
+        resolver = get_resolver(urlconf)
+        found = _walk(resolver.url_patterns, '', '', frozenset(namespaces),
+                      views, [])
+        prefixes.extend('/' + prefix for prefix in found)
+    return prefixes
+
+
+_index = None
+_index_built = False
+_index_lock = Lock()
+
+
+def get_index():
+    """
+    The ``PathIndex`` built from ``INTERCOOLER_HELPERS_SCOPE_PATHS``,
+    ``INTERCOOLER_HELPERS_SCOPE_NAMESPACES`` and
+    ``INTERCOOLER_HELPERS_SCOPE_VIEWS``, or ``None`` if none are set, meaning
+    everywhere is in scope. Built once, on first use.
+    """
+    global _index, _index_built
+    if not _index_built:
+        with _index_lock:
+            if not _index_built:
+                paths = getattr(settings, 'INTERCOOLER_HELPERS_SCOPE_PATHS',
+                                ())
+                namespaces = getattr(
+                    settings, 'INTERCOOLER_HELPERS_SCOPE_NAMESPACES', ())
+                views = getattr(settings, 'INTERCOOLER_HELPERS_SCOPE_VIEWS',
+                                False)
+                index = None
+                if paths or namespaces or views:
+                    index = PathIndex(find_prefixes(paths, namespaces, views))
+                _index = index
+                _index_built = True
+    return _index
+
+
+def in_scope(request):
+    index = get_index()
+    return index is None or index.matches(request.path_info)
+
+
+@receiver(setting_changed)
+def _reset_index(sender, setting, **kwargs):
+    global _index, _index_built
+    if setting in ('ROOT_URLCONF', 'INTERCOOLER_HELPERS_SCOPE_PATHS',
+                   'INTERCOOLER_HELPERS_SCOPE_NAMESPACES',
+                   'INTERCOOLER_HELPERS_SCOPE_VIEWS'):
+        with _index_lock:
+            _index = None
+            _index_built = False
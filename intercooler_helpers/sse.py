@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from collections import deque, namedtuple
+from threading import Condition, Lock
+from timeit import default_timer
+
+import django
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.module_loading import import_string
+from django.views.generic import View
+try:
+    from django.utils.encoding import force_text
+except ImportError:  # Django 4.0+
+    from django.utils.encoding import force_str as force_text
+try:
+    from ._async import (aevent_stream, event_stream_aget, local_alatest_id,
+                         local_alisten)
+except SyntaxError:  # Python 2, or Python 3 before async generators
+    aevent_stream = event_stream_aget = None
+    local_alatest_id = local_alisten = None
+
+
+__all__ = ['Event', 'format_event', 'LocalBroker', 'get_broker', 'publish',
+           'event_stream', 'EventStreamView', 'ASYNC_STREAMING']
+
+
+# StreamingHttpResponse only accepts asynchronous iterators from Django 4.2.
+ASYNC_STREAMING = aevent_stream is not None and django.VERSION >= (4, 2)
+
+
+Event = namedtuple('Event', 'id event data')
+
+
+def format_event(data=None, event=None, id=None, retry=None):
+    """
+    Serialize one message in the ``text/event-stream`` format.
+    """
+    lines = []
+    if id is not None:
+        lines.append('id: {}'.format(id))
+    if event is not None:
+        lines.append('event: {}'.format(event))
+    if retry is not None:
+        lines.append('retry: {:d}'.format(retry))
+    if data is not None:
+        lines.extend('data: {}'.format(line)
+                     for line in force_text(data).splitlines() or [''])
+    return '\n'.join(lines) + '\n\n'
+
+
+class LocalBroker(object):
+    """
+    In-process publish/subscribe, suitable for a single (threaded) worker.
+
+    Each channel keeps the last ``history`` events, which all subscribers
+    read from, so publishing costs the same however many clients are
+    listening, and reconnecting clients can catch up via ``Last-Event-ID``.
+
+    Other brokers (eg: backed by Redis) need to provide ``publish``,
+    ``listen`` and ``latest_id`` with the same signatures, and may provide
+    coroutine versions, ``alisten`` and ``alatest_id``, for
+    ``aevent_stream``; otherwise the blocking ones are run in a thread.
+    """
+    def __init__(self, history=100):
+        self.history = history
+        self._channels = {}
+        self._last_id = 0
+        self._condition = Condition(Lock())
+        # Event loop futures waiting in alisten(), by channel.
+        self._waiters = {}
+
+    def publish(self, channel, data, event=None):
+        with self._condition:
+            self._last_id += 1
+            new_event = Event(id=self._last_id, event=event, data=data)
+            if channel not in self._channels:
+                self._channels[channel] = deque(maxlen=self.history)
+            self._channels[channel].append(new_event)
+            self._condition.notify_all()
+            waiters = self._waiters.pop(channel, ())
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:  # The loop has been closed.
+                pass
+        return new_event
+
+    def latest_id(self, channel):
+        """
+        The id of the newest event on ``channel``, or ``0`` if there are
+        none.
+        """
+        with self._condition:
+            events = self._channels.get(channel)
+            return events[-1].id if events else 0
+
+    def _after(self, channel, last_id):
+        return [event for event in self._channels.get(channel, ())
+                if event.id > last_id]
+
+    def listen(self, channel, last_id, timeout=None):
+        """
+        Returns the events on ``channel`` newer than ``last_id``, waiting up
+        to ``timeout`` seconds for some to arrive.
+        """
+        with self._condition:
+            events = self._after(channel, last_id)
+            if events or timeout is None:
+                return events
+            deadline = default_timer() + timeout
+            while not events:
+                remaining = deadline - default_timer()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+                events = self._after(channel, last_id)
+            return events
+
+    if local_alisten is not None:
+        alisten = local_alisten
+        alatest_id = local_alatest_id
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+_broker = None
+_broker_lock = Lock()
+
+
+def get_broker():
+    """
+    The broker named by ``INTERCOOLER_HELPERS_SSE_BROKER``, shared by the
+    whole process.
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'INTERCOOLER_HELPERS_SSE_BROKER',
+                               'intercooler_helpers.sse.LocalBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish(channel, data, event=None):
+    return get_broker().publish(channel, data, event=event)
+
+
+def _last_event_id(request):
+    last_id = request.META.get('HTTP_LAST_EVENT_ID',
+                               request.GET.get('lastEventId'))
+    try:
+        return int(last_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _stream(broker, channel, last_id, heartbeat, retry, max_duration):
+    if retry is not None:
+        yield format_event(retry=retry)
+    if max_duration is not None:
+        deadline = default_timer() + max_duration
+    while True:
+        events = broker.listen(channel, last_id, timeout=heartbeat)
+        if events:
+            for event in events:
+                yield format_event(event.data, event=event.event, id=event.id)
+            last_id = events[-1].id
+        else:
+            # A comment line, which keeps proxies from timing out the
+            # connection and lets the server notice disconnected clients.
+            yield ':\n\n'
+        if max_duration is not None and default_timer() >= deadline:
+            return
+
+
+def event_stream(request, channel, broker=None, heartbeat=15, retry=None,
+                 max_duration=None):
+    """
+    A ``StreamingHttpResponse`` of the events published to ``channel``,
+    for use with ``ic-sse-src``.
+
+    Clients reconnecting with a ``Last-Event-ID`` get any events they missed
+    which are still in the broker's history; new clients only get events
+    published after they connected.
+
+    ``max_duration`` (in seconds) ends the stream so the client reconnects,
+    which stops long-lived connections tying up a worker forever.
+
+    Each open stream occupies a thread; under ASGI, on Django 4.2+, use
+    ``aevent_stream`` instead.
+    """
+    if broker is None:
+        broker = get_broker()
+    last_id = _last_event_id(request)
+    if last_id is None:
+        last_id = broker.latest_id(channel)
+    return _event_stream_response(
+        _stream(broker, channel, last_id, heartbeat, retry, max_duration))
+
+
+def _event_stream_response(content):
+    response = StreamingHttpResponse(content,
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class EventStreamView(View):
+    """
+    Serves ``event_stream`` for ``channel`` (or ``get_channel()``) on GET.
+    """
+    channel = None
+    heartbeat = 15
+    retry = None
+    max_duration = None
+
+    def get_channel(self):
+        return self.channel
+
+    def get(self, request, *args, **kwargs):
+        return event_stream(request, self.get_channel(),
+                            heartbeat=self.heartbeat, retry=self.retry,
+                            max_duration=self.max_duration)
+
+
+if ASYNC_STREAMING:
+    __all__ += ['aevent_stream', 'AsyncEventStreamView']
+
+    class AsyncEventStreamView(EventStreamView):
+        """
+        ``EventStreamView`` as an asynchronous view, serving
+        ``aevent_stream``, so that under ASGI each open stream is only a
+        coroutine waiting on the event loop rather than a thread.
+        """
+        get = event_stream_aget
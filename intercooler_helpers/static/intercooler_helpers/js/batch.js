@@ -0,0 +1,106 @@
+/*
+ * Loads every element with an ic-batch-src attribute in a single request to
+ * intercooler_helpers.batch.BatchView, rather than one ic-src request each.
+ *
+ *   <meta name="ic-batch-url" content="/batch/">
+ *   <div id="sidebar" ic-batch-src="/sidebar/"></div>
+ *
+ * Each fragment is swapped into its element and then processed by
+ * Intercooler.js, so it may use ic-src, ic-poll and friends as normal.
+ * X-IC-Trigger, X-IC-Redirect and X-IC-Refresh on the fragments are honoured.
+ */
+(function ($, Intercooler) {
+    "use strict";
+
+    var requestId = 0;
+
+    function csrfToken() {
+        var match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+        return match ? decodeURIComponent(match[1]) : null;
+    }
+
+    function subRequest(elt, index) {
+        var id = elt.attr("id") || ("ic-batch-" + index);
+        requestId += 1;
+        return {
+            id: id,
+            url: elt.attr("ic-batch-src"),
+            method: "GET",
+            data: {
+                "ic-request": "true",
+                "ic-id": String(requestId),
+                "ic-element-id": elt.attr("id") || "",
+                "ic-element-name": elt.attr("name") || "",
+                "ic-target-id": elt.attr("id") || "",
+                "ic-current-url": window.location.pathname + window.location.search
+            },
+            headers: {
+                "X-IC-Request": "true",
+                "X-Requested-With": "XMLHttpRequest"
+            }
+        };
+    }
+
+    function applyHeaders(elt, headers) {
+        if (headers["X-IC-Redirect"]) {
+            window.location = headers["X-IC-Redirect"];
+            return false;
+        }
+        if (headers["X-IC-Trigger"]) {
+            var triggers;
+            try {
+                triggers = JSON.parse(headers["X-IC-Trigger"]);
+            } catch (e) {
+                triggers = {};
+                triggers[headers["X-IC-Trigger"]] = [];
+            }
+            $.each(triggers, function (name, args) {
+                elt.trigger(name, args);
+            });
+        }
+        if (headers["X-IC-Refresh"]) {
+            $.each(headers["X-IC-Refresh"].split(","), function (i, path) {
+                Intercooler.refresh($.trim(path));
+            });
+        }
+        return true;
+    }
+
+    function load(elements, url) {
+        url = url || $("meta[name='ic-batch-url']").attr("content");
+        elements = $(elements || "[ic-batch-src]");
+        if (!url || !elements.length) {
+            return $.Deferred().resolve().promise();
+        }
+        var byId = {};
+        var requests = elements.map(function (index, node) {
+            var elt = $(node);
+            var request = subRequest(elt, index);
+            byId[request.id] = elt;
+            return request;
+        }).get();
+        return $.ajax({
+            url: url,
+            type: "POST",
+            contentType: "application/json",
+            data: JSON.stringify({requests: requests}),
+            headers: {"X-CSRFToken": csrfToken()}
+        }).done(function (payload) {
+            $.each(payload.responses, function (i, response) {
+                var elt = byId[response.id];
+                if (!elt || response.status !== 200) {
+                    return;
+                }
+                elt.html(response.content);
+                Intercooler.processNodes(elt.children());
+                return applyHeaders(elt, response.headers);
+            });
+        });
+    }
+
+    window.IntercoolerBatch = {load: load};
+
+    $(function () {
+        load();
+    });
+})(jQuery, Intercooler);
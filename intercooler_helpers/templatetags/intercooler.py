@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from django import template
+
+from ..headers import current_headers
+from ..pagination import next_page_element
+
+
+register = template.Library()
+
+
+def _headers(context):
+    request = context.get('request')
+    headers = getattr(request, 'intercooler_headers', None)
+    if headers is None:
+        headers = current_headers()
+    return headers
+
+
+@register.simple_tag(takes_context=True)
+def ic_trigger(context, event, *args):
+    """
+    {% ic_trigger "eventName" arg1 arg2 %} sends ``X-IC-Trigger`` with the
+    response.
+    """
+    headers = _headers(context)
+    if headers is not None:
+        headers.trigger(event, *args)
+    return ''
+
+
+@register.simple_tag(takes_context=True)
+def ic_refresh(context, *paths):
+    """
+    {% ic_refresh "/path/" "/other/" %} sends ``X-IC-Refresh`` with the
+    response.
+    """
+    headers = _headers(context)
+    if headers is not None:
+        headers.refresh(*paths)
+    return ''
+
+
+@register.simple_tag(takes_context=True)
+def ic_next_page(context, page, tag='div', target=None, indicator=None,
+                 trigger='scrolled-into-view', cursor_param='cursor',
+                 url=None):
+    """
+    {% ic_next_page page tag="tr" target="#rows" %} outputs an element which
+    appends the next ``KeysetPage`` to the target once it's scrolled into
+    view, or nothing on the last page. Use it after iterating over ``page``.
+    """
+    # RequestContext has the request even without the request context
+    # processor.
+    request = getattr(context, 'request', None) or context['request']
+    return next_page_element(request, page, tag=tag,
+                             target=target, indicator=indicator,
+                             trigger=trigger, cursor_param=cursor_param,
+                             url=url)
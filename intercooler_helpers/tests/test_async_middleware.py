@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import asyncio
+import io
+import threading
+
+import django
+import pytest
+from django.http import HttpResponse
+from django.shortcuts import redirect
+
+from intercooler_helpers.middleware import (HttpMethodOverride,
+                                            IntercoolerData,
+                                            IntercoolerRedirector)
+
+pytestmark = pytest.mark.skipif(django.VERSION < (3, 1),
+                                reason="async middleware needs Django 3.1+")
+
+
+class RecordingIntercoolerData(IntercoolerData):
+    def process_request(self, request):
+        request.middleware_thread = threading.get_ident()
+        return super(RecordingIntercoolerData, self).process_request(request)
+
+
+def _chain(view):
+    return HttpMethodOverride(RecordingIntercoolerData(
+        IntercoolerRedirector(view)))
+
+
+def _request():
+    from django.test import AsyncRequestFactory
+    request = AsyncRequestFactory().post(
+        '/?_method=PUT', data='a=1',
+        content_type='application/x-www-form-urlencoded')
+    # Passing extra headers to AsyncRequestFactory differs between versions.
+    request.META.update(HTTP_X_IC_REQUEST='true',
+                        HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    return request
+
+
+def test_middleware_runs_on_event_loop():
+    async def view(request):
+        assert request.middleware_thread == threading.get_ident()
+        assert request.method == 'PUT'
+        assert request.is_intercooler() is True
+        return HttpResponse('ok')
+
+    response = asyncio.run(_chain(view)(_request()))
+    assert response.content == b'ok'
+
+
+def test_multipart_body_parsed_off_the_event_loop():
+    from django.test import AsyncRequestFactory
+    request = AsyncRequestFactory().post('/', data={'_method': 'PUT',
+                                                    'a': '1'})
+    # The multipart parser reads past the end of the factory's FakePayload.
+    request._stream = io.BytesIO(request._stream.read())
+    request.META.update(HTTP_X_IC_REQUEST='true',
+                        HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    class RecordingOverride(HttpMethodOverride):
+        def process_request(self, request):
+            request.override_thread = threading.get_ident()
+            return super(RecordingOverride, self).process_request(request)
+
+    async def view(request):
+        assert request.override_thread != threading.get_ident()
+        assert request.middleware_thread == threading.get_ident()
+        assert request.method == 'PUT'
+        return HttpResponse('ok')
+
+    response = asyncio.run(RecordingOverride(RecordingIntercoolerData(
+        IntercoolerRedirector(view)))(request))
+    assert response.content == b'ok'
+
+
+def test_redirect_converted_under_async():
+    async def view(request):
+        return redirect('/redirector/redirected/')
+
+    response = asyncio.run(_chain(view)(_request()))
+    assert response['X-IC-Redirect'] == '/redirector/redirected/'
+
+
+def test_sync_chain_still_works(rf):
+    def view(request):
+        return HttpResponse('ok')
+
+    response = _chain(view)(rf.get('/'))
+    assert response.content == b'ok'
+
+
+def test_redirect_followed_off_the_event_loop(settings):
+    from django.utils.deprecation import MiddlewareMixin
+    settings.INTERCOOLER_HELPERS_FOLLOW_REDIRECTS = True
+
+    async def view(request):
+        return redirect('/redirector/redirected/')
+
+    redirector = IntercoolerRedirector(view)
+    assert redirector.__acall__.__func__ is MiddlewareMixin.__acall__
+    response = asyncio.run(HttpMethodOverride(RecordingIntercoolerData(
+        redirector))(_request()))
+    assert response['X-IC-PushURL'] == '/redirector/redirected/'
+    assert b'redirected' in response.content
+
+
+def test_redirects_to_async_views_not_followed(rf, settings, monkeypatch):
+    from django.urls import ResolverMatch
+    from intercooler_helpers import middleware
+
+    async def view(request):
+        return HttpResponse('async')
+    settings.INTERCOOLER_HELPERS_FOLLOW_REDIRECTS = True
+    monkeypatch.setattr(middleware, 'cached_resolve',
+                        lambda path: ResolverMatch(view, (), {}))
+    request = rf.get('/', HTTP_X_IC_REQUEST='true',
+                     HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    IntercoolerData().process_request(request)
+    response = IntercoolerRedirector().process_response(
+        request, redirect('/redirector/redirected/'))
+    assert response['X-IC-Redirect'] == '/redirector/redirected/'
+
+
+def test_single_flight_rejects_async_views():
+    from intercooler_helpers.cache import intercooler_single_flight
+
+    async def view(request):
+        return HttpResponse('async')
+    with pytest.raises(TypeError):
+        intercooler_single_flight(1)(view)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+from intercooler_helpers import batch
+from intercooler_helpers.batch import (BatchView, SubRequestError,
+                                       clone_request)
+from intercooler_helpers.middleware import IntercoolerData
+
+
+IC_HEADERS = {'X-IC-Request': 'true', 'X-Requested-With': 'XMLHttpRequest'}
+
+
+def _post(rf, requests, **initkwargs):
+    request = rf.post('/batch/', data=json.dumps({'requests': requests}),
+                      content_type='application/json')
+    request.user = AnonymousUser()
+    IntercoolerData().process_request(request)
+    return BatchView.as_view(**initkwargs)(request)
+
+
+def _batch(rf, requests, **initkwargs):
+    response = _post(rf, requests, **initkwargs)
+    return response, json.loads(response.content.decode('utf-8'))
+
+
+def test_clone_request_has_its_own_data(rf):
+    request = rf.post('/batch/', data={'a': '1'}, HTTP_X_IC_REQUEST='true')
+    request.user = AnonymousUser()
+    clone = clone_request(request, '/polling/?b=2', data={'ic-id': '3'},
+                          headers=IC_HEADERS)
+    assert clone.method == 'GET'
+    assert clone.path == '/polling/'
+    assert clone.user is request.user
+    assert clone.is_intercooler() is True
+    assert clone.intercooler_data.id == 3
+    assert clone.GET.dict() == {'b': '2'}
+    assert clone.POST.dict() == {}
+    assert request.POST.dict() == {'a': '1'}
+
+
+def test_clone_request_encodes_data_into_the_body(rf):
+    request = rf.get('/batch/')
+    clone = clone_request(request, '/form/', method='post',
+                          data={'field': ['a', 'b']})
+    assert clone.method == 'POST'
+    assert clone.POST.getlist('field') == ['a', 'b']
+    assert clone.body == b'field=a&field=b'
+
+
+@pytest.mark.parametrize("url", ['http://example.com/', '//example.com/',
+                                 'polling/'])
+def test_clone_request_refuses_other_sites(rf, url):
+    with pytest.raises(SubRequestError):
+        clone_request(rf.get('/batch/'), url)
+
+
+def test_clone_request_only_sets_allowed_headers(rf):
+    clone = clone_request(rf.get('/batch/'), '/polling/', headers={
+        'X-IC-Target-Id': 'poller', 'Accept-Language': 'fr'})
+    assert clone.META['HTTP_X_IC_TARGET_ID'] == 'poller'
+    assert clone.META['HTTP_ACCEPT_LANGUAGE'] == 'fr'
+
+
+@pytest.mark.parametrize("header", ['Host', 'Cookie', 'Authorization',
+                                    'X-Forwarded-For', 'HTTP_X_FORWARDED_HOST',
+                                    'Content-Type'])
+def test_clone_request_refuses_other_headers(rf, header):
+    with pytest.raises(SubRequestError):
+        clone_request(rf.get('/batch/'), '/polling/',
+                      headers={header: 'evil.example.com'})
+
+
+def test_batch_returns_responses_in_order(rf):
+    response, payload = _batch(rf, [
+        {'id': 'stop', 'url': '/polling/stop/'},
+        {'id': 'poll', 'url': '/polling/', 'headers': IC_HEADERS,
+         'data': {'ic-id': '1', 'ic-target-id': 'poller'}},
+        {'id': 'missing', 'url': '/nope/'},
+        {'id': 'not-intercooler', 'url': '/click/'},
+    ])
+    assert response.status_code == 200
+    stop, poll, missing, not_intercooler = payload['responses']
+    assert stop == {'id': 'stop', 'status': 200, 'content': 'Cancelled',
+                    'headers': {'Content-Type': 'text/html; charset=utf-8',
+                                'X-IC-CancelPolling': 'true'}}
+    assert poll['status'] == 200
+    assert '<html' not in poll['content']
+    assert missing['status'] == 404
+    # click() raises Http404 for non-Intercooler.js requests.
+    assert not_intercooler['status'] == 404
+
+
+def test_batch_permission_denied_is_403(rf, monkeypatch):
+    def dispatch_subrequest(request):
+        raise PermissionDenied()
+
+    monkeypatch.setattr(batch, 'dispatch_subrequest', dispatch_subrequest)
+    response, payload = _batch(rf, [{'id': 'forbidden', 'url': '/polling/'}])
+    assert payload['responses'] == [{'id': 'forbidden', 'status': 403,
+                                     'headers': {}, 'content': ''}]
+
+
+def test_batch_drops_cookies(rf, monkeypatch):
+    def dispatch_subrequest(request):
+        response = HttpResponse('hello')
+        response.set_cookie('sessionid', 'other')
+        return response, 'hello'
+
+    monkeypatch.setattr(batch, 'dispatch_subrequest', dispatch_subrequest)
+    response, payload = _batch(rf, [{'id': 'cookie', 'url': '/polling/'}])
+    assert 'Set-Cookie' not in payload['responses'][0]['headers']
+    assert not response.cookies
+
+
+def test_batch_renders_template_responses(rf):
+    response, payload = _batch(rf, [
+        {'id': 'rows', 'url': '/infinite/scrolling/', 'headers': IC_HEADERS},
+    ])
+    content = payload['responses'][0]['content']
+    assert '<tr' in content
+    assert '<html' not in content
+
+
+def test_batch_on_a_thread_pool(rf):
+    requests = [{'id': str(i), 'url': '/polling/stop/'} for i in range(5)]
+    response, payload = _batch(rf, requests, max_workers=3)
+    assert [r['id'] for r in payload['responses']] == ['0', '1', '2', '3', '4']
+    assert all(r['content'] == 'Cancelled' for r in payload['responses'])
+
+
+@pytest.mark.parametrize("requests", [
+    [{'url': '/polling/', 'method': 'POST'}],
+    [{'id': 'no-url'}],
+    [{'url': '/polling/', 'headers': {'Cookie': 'sessionid=other'}}],
+    [{'url': '/polling/'}] * 51,
+    {'url': '/polling/'},
+])
+def test_batch_rejects_bad_requests(rf, requests):
+    assert _post(rf, requests).status_code == 400
+
+
+def test_batch_only_accepts_post(rf):
+    assert BatchView.as_view()(rf.get('/batch/')).status_code == 405
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from intercooler_helpers.cache import (normalize_query_string,
+                                       intercooler_cache_page,
+                                       intercooler_single_flight,
+                                       IntercoolerFetchFromCacheMiddleware,
+                                       IntercoolerUpdateCacheMiddleware)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def counting_view():
+    calls = []
+
+    def view(request):
+        calls.append(request)
+        return HttpResponse('call {}'.format(len(calls)))
+    view.calls = calls
+    return view
+
+
+def _ic_get(rf, ic_id, target_id='t', **data):
+    data.update({'ic-id': ic_id, 'ic-target-id': target_id,
+                 'ic-current-url': '/page/{}/'.format(ic_id)})
+    return rf.get('/polling/', data=data, HTTP_X_IC_REQUEST='true',
+                  HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+
+def test_normalize_query_string():
+    qs = 'b=2&ic-id=4&a=1&ic-target-id=t&a=0&ic-current-url=%2F'
+    assert normalize_query_string(qs) == 'a=1&a=0&b=2'
+    assert normalize_query_string(qs, keep=('ic-target-id',)) == \
+        'a=1&a=0&b=2&ic-target-id=t'
+
+
+def test_cache_page_ignores_changing_ic_params(rf, counting_view):
+    view = intercooler_cache_page(60)(counting_view)
+    first = view(_ic_get(rf, 1))
+    second = view(_ic_get(rf, 2))
+    assert len(counting_view.calls) == 1
+    assert first.content == second.content
+
+
+def test_cache_page_varies_on_kept_ic_params(rf, counting_view):
+    view = intercooler_cache_page(60)(counting_view)
+    view(_ic_get(rf, 1, target_id='a'))
+    view(_ic_get(rf, 2, target_id='b'))
+    assert len(counting_view.calls) == 2
+
+
+def test_cache_page_varies_on_other_params(rf, counting_view):
+    view = intercooler_cache_page(60)(counting_view)
+    view(_ic_get(rf, 1, page='1'))
+    view(_ic_get(rf, 2, page='2'))
+    assert len(counting_view.calls) == 2
+
+
+def test_cache_page_varies_on_x_ic_request(rf, counting_view):
+    view = intercooler_cache_page(60)(counting_view)
+    response = view(_ic_get(rf, 1))
+    view(rf.get('/polling/', data={'ic-target-id': 't'}))
+    assert len(counting_view.calls) == 2
+    assert 'X-IC-Request' in response['Vary']
+
+
+def test_query_string_is_restored(rf, counting_view):
+    view = intercooler_cache_page(60)(counting_view)
+    request = _ic_get(rf, 1)
+    query_string = request.META['QUERY_STRING']
+    view(request)
+    assert request.META['QUERY_STRING'] == query_string
+
+
+def test_middleware_pair(rf, counting_view):
+    fetch = IntercoolerFetchFromCacheMiddleware()
+    update = IntercoolerUpdateCacheMiddleware()
+    update.cache_timeout = 60
+
+    def handle(request):
+        response = fetch.process_request(request)
+        if response is None:
+            response = update.process_response(request,
+                                               counting_view(request))
+        return response
+    handle(_ic_get(rf, 1))
+    handle(_ic_get(rf, 2))
+    assert len(counting_view.calls) == 1
+
+
+def test_single_flight_shares_concurrent_polls(rf):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_view(request):
+        calls.append(request)
+        started.set()
+        release.wait(5)
+        response = HttpResponse('shared')
+        response['X-IC-SetPollInterval'] = '2s'
+        return response
+
+    view = intercooler_single_flight(60)(slow_view)
+    responses = []
+
+    def poll(ic_id):
+        responses.append(view(_ic_get(rf, ic_id)))
+
+    leader = threading.Thread(target=poll, args=(1,))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=poll, args=(i,))
+                 for i in range(2, 6)]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    # Later polls within the interval reuse it too.
+    responses.append(view(_ic_get(rf, 6)))
+    assert len(calls) == 1
+    assert len(responses) == 6
+    assert set(r.content for r in responses) == {b'shared'}
+    assert set(r['X-IC-SetPollInterval'] for r in responses) == {'2s'}
+    assert len(set(id(r) for r in responses)) == 6
+
+
+def test_single_flight_only_for_intercooler_gets(rf, counting_view):
+    view = intercooler_single_flight(60)(counting_view)
+    view(_ic_get(rf, 1, target_id='a'))
+    view(_ic_get(rf, 2, target_id='b'))
+    view(rf.get('/polling/'))
+    view(rf.post('/polling/', HTTP_X_IC_REQUEST='true'))
+    assert len(counting_view.calls) == 4
+
+
+def test_single_flight_expires_and_skips_cookies(rf, counting_view):
+    view = intercooler_single_flight(0)(counting_view)
+    assert view(_ic_get(rf, 1)).content == b'call 1'
+    assert view(_ic_get(rf, 2)).content == b'call 2'
+
+    def cookie_view(request):
+        response = counting_view(request)
+        response.set_cookie('a', 'b')
+        return response
+    view = intercooler_single_flight(60)(cookie_view)
+    view(_ic_get(rf, 3))
+    view(_ic_get(rf, 4))
+    assert len(counting_view.calls) == 4
+
+
+def test_single_flight_shared_via_cache(rf, counting_view):
+    # Two decorated copies stand in for two processes.
+    first = intercooler_single_flight(60, cache='default')(counting_view)
+    second = intercooler_single_flight(60, cache='default')(counting_view)
+    assert first(_ic_get(rf, 1)).content == b'call 1'
+    assert second(_ic_get(rf, 2)).content == b'call 1'
+    assert len(counting_view.calls) == 1
+
+
+def test_single_flight_keeps_hosts_apart(rf, counting_view, settings):
+    settings.ALLOWED_HOSTS = ['a.example.com', 'b.example.com']
+    view = intercooler_single_flight(60)(counting_view)
+    for ic_id, host, expected in ((1, 'a.example.com', b'call 1'),
+                                  (2, 'b.example.com', b'call 2'),
+                                  (3, 'a.example.com', b'call 1')):
+        request = _ic_get(rf, ic_id)
+        request.META['HTTP_HOST'] = host
+        assert view(request).content == expected
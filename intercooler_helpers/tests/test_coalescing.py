@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from intercooler_helpers import coalescing
+from intercooler_helpers.coalescing import (CacheCoalescingBackend,
+                                            IntercoolerCoalescing,
+                                            LocalCoalescingBackend)
+from intercooler_helpers.middleware import IntercoolerData
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = LocalCoalescingBackend()
+    monkeypatch.setattr(coalescing, '_backend', backend)
+    return backend
+
+
+class Session(object):
+    def __init__(self, session_key):
+        self.session_key = session_key
+
+
+def _click(rf, ic_id, method='get', element='intro-btn', session='abc',
+           **extra):
+    request = getattr(rf, method)('/click/', data={'ic-id': ic_id,
+                                                   'ic-element-id': element},
+                                  HTTP_X_IC_REQUEST='true',
+                                  HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+                                  **extra)
+    if session is not None:
+        request.session = Session(session)
+    IntercoolerData().process_request(request)
+    return request
+
+
+def test_superseded_response_is_emptied(rf, backend):
+    mw = IntercoolerCoalescing()
+    first, second = _click(rf, 1), _click(rf, 2)
+    assert mw.process_request(first) is None
+    assert mw.process_request(second) is None
+    assert mw.process_response(first, HttpResponse('one')).content == b''
+    assert mw.process_response(second, HttpResponse('two')).content == b'two'
+
+
+def test_requests_after_a_reload_are_served(rf, backend):
+    mw = IntercoolerCoalescing()
+    before = _click(rf, 7)
+    mw.process_request(before)
+    mw.process_response(before, HttpResponse('seven'))
+    # ic-id starts again from 1 when the page is reloaded.
+    for ic_id in (2, 2, 3):
+        request = _click(rf, ic_id)
+        assert mw.process_request(request) is None
+        response = mw.process_response(request, HttpResponse('after'))
+        assert response.content == b'after'
+
+
+def test_separate_clients_and_elements(rf, backend):
+    mw = IntercoolerCoalescing()
+    first = _click(rf, 1)
+    mw.process_request(first)
+    mw.process_request(_click(rf, 2, element='other'))
+    mw.process_request(_click(rf, 3, session='def'))
+    assert mw.process_response(first, HttpResponse('one')).content == b'one'
+
+
+def test_clients_without_a_session_are_not_coalesced(rf, backend):
+    mw = IntercoolerCoalescing()
+    first = _click(rf, 1, session=None)
+    assert mw.process_request(first) is None
+    assert mw.process_request(_click(rf, 2, session=None)) is None
+    assert mw.process_request(_click(rf, 0, session=None)) is None
+    assert mw.process_response(first, HttpResponse('one')).content == b'one'
+
+
+def test_only_configured_methods(rf, backend, settings):
+    mw = IntercoolerCoalescing()
+    first = _click(rf, 1, method='post')
+    mw.process_request(first)
+    mw.process_request(_click(rf, 2, method='post'))
+    assert mw.process_response(first, HttpResponse('one')).content == b'one'
+    settings.INTERCOOLER_HELPERS_COALESCING_METHODS = ['POST']
+    mw = IntercoolerCoalescing()
+    first = _click(rf, 3, method='post')
+    mw.process_request(first)
+    mw.process_request(_click(rf, 1, method='post'))
+    assert mw.process_response(first, HttpResponse('one')).content == b''
+
+
+def test_debounce(rf, backend, settings, monkeypatch):
+    settings.INTERCOOLER_HELPERS_COALESCING_DEBOUNCE = 0.1
+    mw = IntercoolerCoalescing()
+    newer = _click(rf, 2)
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        if len(slept) == 1:
+            # Another click arrives while the first is waiting.
+            assert mw.process_request(newer) is None
+
+    monkeypatch.setattr(coalescing.time, 'sleep', sleep)
+    response = mw.process_request(_click(rf, 1))
+    assert response.content == b''
+    assert slept == [0.1, 0.1]
+    assert mw.process_response(newer, HttpResponse('two')).content == b'two'
+
+
+def test_local_backend_forgets_old_keys(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(coalescing, 'default_timer', lambda: now[0])
+    backend = LocalCoalescingBackend(size=2, timeout=10)
+    first = backend.claim('a')
+    backend.claim('a')
+    assert backend.is_latest('a', first) is False
+    now[0] += 11
+    assert backend.is_latest('a', first) is True
+    backend.claim('b')
+    assert list(backend._latest) == ['b']
+    backend.claim('c')
+    backend.claim('d')
+    assert list(backend._latest) == ['c', 'd']
+
+
+def test_cache_backend():
+    cache.clear()
+    backend = CacheCoalescingBackend()
+    first = backend.claim('key')
+    assert backend.is_latest('key', first) is True
+    second = backend.claim('key')
+    assert backend.is_latest('key', first) is False
+    assert backend.is_latest('key', second) is True
+    cache.clear()
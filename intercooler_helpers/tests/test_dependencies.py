@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import pytest
+from django.apps.registry import Apps
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+
+from intercooler_helpers.dependencies import DependencyRegistry
+from intercooler_helpers.middleware import (IntercoolerData,
+                                            IntercoolerResponseHeaders)
+
+
+@pytest.fixture
+def registry():
+    registry = DependencyRegistry()
+    yield registry
+    post_save.disconnect(dispatch_uid=registry._dispatch_uid())
+    post_delete.disconnect(dispatch_uid=registry._dispatch_uid())
+
+
+def _handle(rf, method, callback, status=200, intercooler=True):
+    headers = {}
+    if intercooler:
+        headers = dict(HTTP_X_IC_REQUEST="true",
+                       HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    request = getattr(rf, method)('/', **headers)
+    IntercoolerData().process_request(request)
+    mw = IntercoolerResponseHeaders()
+    mw.process_request(request)
+    callback()
+    return mw.process_response(request, HttpResponse(status=status))
+
+
+def test_save_during_post_refreshes_dependents(rf, registry):
+    registry.register(User, '/users/', lambda user: '/profiles/{}/'.format(
+        user.username))
+    registry.register(Group, '/groups/')
+    user = User(username='bob')
+    response = _handle(rf, 'post', lambda: post_save.send(
+        sender=User, instance=user, created=True))
+    assert response['X-IC-Refresh'] == '/users/,/profiles/bob/'
+
+
+def test_delete_during_post_refreshes_dependents(rf, registry):
+    registry.register(User, lambda user: ['/a/', '/b/'], lambda user: None)
+    response = _handle(rf, 'post', lambda: post_delete.send(
+        sender=User, instance=User(username='bob')))
+    assert response['X-IC-Refresh'] == '/a/,/b/'
+
+
+def test_url_names_are_reversed(rf, registry):
+    registry.register(User, 'polling')
+    response = _handle(rf, 'post', lambda: post_save.send(
+        sender=User, instance=User(), created=False))
+    assert response['X-IC-Refresh'] == '/polling/'
+
+
+def test_proxy_models_use_concrete_model(rf, registry):
+    class ProxyUser(User):
+        class Meta:
+            proxy = True
+            app_label = 'auth'
+            # Kept out of the real app registry.
+            apps = Apps(['django.contrib.auth'])
+
+    registry.register(User, '/users/')
+    response = _handle(rf, 'post', lambda: post_save.send(
+        sender=ProxyUser, instance=ProxyUser(), created=False))
+    assert response['X-IC-Refresh'] == '/users/'
+
+
+def test_unregistered_models_ignored(rf, registry):
+    registry.register(User, '/users/')
+    response = _handle(rf, 'post', lambda: post_save.send(
+        sender=Group, instance=Group(), created=False))
+    assert response.has_header('X-IC-Refresh') is False
+
+
+def test_safe_methods_do_not_refresh(rf, registry):
+    registry.register(User, '/users/')
+    response = _handle(rf, 'get', lambda: post_save.send(
+        sender=User, instance=User(), created=False))
+    assert response.has_header('X-IC-Refresh') is False
+
+
+def test_plain_form_posts_do_not_refresh(rf, registry):
+    registry.register(User, '/users/')
+    response = _handle(rf, 'post', lambda: post_save.send(
+        sender=User, instance=User(), created=False), intercooler=False)
+    assert response.has_header('X-IC-Refresh') is False
+
+
+@pytest.mark.parametrize('status', [400, 404, 500])
+def test_failed_requests_do_not_refresh(rf, registry, status):
+    registry.register(User, '/users/')
+    response = _handle(rf, 'post', lambda: post_save.send(
+        sender=User, instance=User(), created=False), status=status)
+    assert response.has_header('X-IC-Refresh') is False
+
+
+def test_arbitrary_keys(rf, registry):
+    registry.register('sidebar-counts', '/sidebar/')
+    response = _handle(rf, 'post', lambda: registry.changed('sidebar-counts'))
+    assert response['X-IC-Refresh'] == '/sidebar/'
+
+
+def test_outside_a_request_does_nothing(registry):
+    registry.register('key', '/path/')
+    assert registry.changed('key') == []
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+import pytest
+from django.http import HttpResponse
+from django.template import Context, Template
+
+from intercooler_helpers.headers import (IntercoolerHeaders, coalesce_paths,
+                                         current_headers, trigger, refresh)
+from intercooler_helpers.middleware import (IntercoolerData,
+                                            IntercoolerResponseHeaders)
+
+
+@pytest.fixture
+def request_with_headers(rf):
+    request = rf.post('/', HTTP_X_IC_REQUEST="true",
+                      HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    IntercoolerData().process_request(request)
+    return request
+
+
+def test_coalesce_paths():
+    paths = ['/contacts/1/', '/contacts/', ' /contacts/ ', '/other/', '',
+             '/contacts/2/edit/']
+    assert coalesce_paths(paths) == ['/contacts/', '/other/']
+
+
+def test_triggers_are_deduplicated():
+    response = IntercoolerHeaders().trigger('saved').trigger(
+        'counted', 1).trigger('saved').trigger('counted', 2).apply(
+        HttpResponse())
+    assert json.loads(response['X-IC-Trigger']) == {'saved': [],
+                                                     'counted': [2]}
+
+
+def test_triggers_merge_with_existing_header():
+    original = HttpResponse()
+    original['X-IC-Trigger'] = 'fromView'
+    response = IntercoolerHeaders().trigger('collected').apply(original)
+    assert json.loads(response['X-IC-Trigger']) == {'fromView': [],
+                                                     'collected': []}
+
+
+def test_refresh_is_coalesced_with_existing_header():
+    original = HttpResponse()
+    original['X-IC-Refresh'] = '/a/b/'
+    response = IntercoolerHeaders().refresh('/a/', '/c/').refresh(
+        '/c/').apply(original)
+    assert response['X-IC-Refresh'] == '/a/,/c/'
+
+
+def test_explicit_headers_win():
+    original = HttpResponse()
+    original['X-IC-Title'] = 'From the view'
+    response = IntercoolerHeaders().title('Collected').push_url(
+        '/pushed/').apply(original)
+    assert response['X-IC-Title'] == 'From the view'
+    assert response['X-IC-PushURL'] == '/pushed/'
+
+
+def test_polling_is_last_one_wins():
+    response = IntercoolerHeaders().cancel_polling().resume_polling().apply(
+        HttpResponse())
+    assert response['X-IC-ResumePolling'] == 'true'
+    assert response.has_header('X-IC-CancelPolling') is False
+
+
+def test_scripts_and_local_vars():
+    response = IntercoolerHeaders().script('a()').script('b()').set_local_vars(
+        x='1').remove('1s').apply(HttpResponse())
+    assert response['X-IC-Script'] == 'a(); b()'
+    assert json.loads(response['X-IC-Set-Local-Vars']) == {'x': '1'}
+    assert response['X-IC-Remove'] == '1s'
+
+
+def test_middleware_applies_collected_headers(request_with_headers):
+    mw = IntercoolerResponseHeaders()
+    mw.process_request(request_with_headers)
+    # As a signal handler might, without access to the request.
+    trigger('contactSaved')
+    refresh('/contacts/')
+    assert current_headers() is request_with_headers.intercooler_headers
+    response = mw.process_response(request_with_headers, HttpResponse())
+    assert json.loads(response['X-IC-Trigger']) == {'contactSaved': []}
+    assert response['X-IC-Refresh'] == '/contacts/'
+    assert current_headers() is None
+
+
+def test_middleware_skips_unused_headers(request_with_headers):
+    mw = IntercoolerResponseHeaders()
+    mw.process_request(request_with_headers)
+    response = mw.process_response(request_with_headers, HttpResponse())
+    assert 'intercooler_headers' not in request_with_headers.__dict__
+    assert response.has_header('X-IC-Trigger') is False
+
+
+def test_outside_request_is_a_noop():
+    assert trigger('nothing') is None
+    assert refresh('/nothing/') is None
+
+
+def test_template_tags(request_with_headers):
+    template = Template('{% load intercooler %}'
+                        '{% ic_trigger "rendered" 1 %}'
+                        '{% ic_refresh "/a/" "/a/b/" %}done')
+    content = template.render(Context({'request': request_with_headers}))
+    assert content == 'done'
+    headers = request_with_headers.intercooler_headers
+    assert headers.triggers == {'rendered': [1]}
+    assert headers.refresh_paths == ['/a/', '/a/b/']
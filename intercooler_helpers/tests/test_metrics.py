@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import pytest
+from django.http import HttpResponse, StreamingHttpResponse
+
+from intercooler_helpers.metrics import (Histogram, IntercoolerMetrics,
+                                         Labels, MetricsRegistry,
+                                         metrics_view, prometheus_text,
+                                         request_measured)
+from intercooler_helpers.middleware import (HttpMethodOverride,
+                                            IntercoolerData)
+try:
+    from django.urls import resolve
+except ImportError:  # Django <1.10
+    from django.core.urlresolvers import resolve
+
+
+@pytest.fixture
+def middleware():
+    mw = IntercoolerMetrics()
+    mw.registry = MetricsRegistry()
+    return mw
+
+
+def _handle(mw, request, response):
+    HttpMethodOverride().process_request(request)
+    IntercoolerData().process_request(request)
+    mw.process_request(request)
+    request.resolver_match = resolve(request.path_info)
+    return mw.process_response(request, response)
+
+
+def test_histogram_buckets():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert list(histogram.cumulative()) == [(1, 2), (5, 3),
+                                            (float('inf'), 4)]
+    assert histogram.count == 4
+    assert histogram.sum == 14.5
+
+
+def test_records_intercooler_requests(rf, middleware):
+    request = rf.post('/click/?_method=PATCH', data={
+        'ic-request': 'true', 'ic-target-id': 'intro-btn',
+        'ic-trigger-id': 'intro-btn2', 'ic-element-id': 'intro-btn2',
+    }, HTTP_X_IC_REQUEST='true', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    _handle(middleware, request, HttpResponse('12345'))
+    (labels, duration, size, statuses), = middleware.registry.collect()
+    assert labels == Labels(view='click', target='intro-btn',
+                            trigger='intro-btn2', method='PATCH',
+                            changed_method='true')
+    assert duration.count == 1
+    assert size.sum == 5
+    assert statuses == {200: 1}
+
+
+def test_ignores_other_requests(rf, middleware):
+    _handle(middleware, rf.get('/polling/'), HttpResponse())
+    assert middleware.registry.collect() == []
+
+
+def test_streaming_responses_have_no_size(rf, middleware):
+    request = rf.get('/polling/', data={'ic-element-id': 'poller'},
+                     HTTP_X_IC_REQUEST='true',
+                     HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    _handle(middleware, request, StreamingHttpResponse(['a'], status=202))
+    (labels, duration, size, statuses), = middleware.registry.collect()
+    assert labels.trigger == 'poller'
+    assert size.count == 0
+    assert statuses == {202: 1}
+
+
+def test_signal(rf, middleware):
+    received = []
+
+    def receiver(sender, **kwargs):
+        received.append(kwargs)
+    request_measured.connect(receiver)
+    try:
+        request = rf.get('/polling/', HTTP_X_IC_REQUEST='true',
+                         HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        _handle(middleware, request, HttpResponse('ok', status=201))
+    finally:
+        request_measured.disconnect(receiver)
+    event, = received
+    assert event['request'] is request
+    assert event['labels'].view == 'polling'
+    assert event['size'] == 2
+    assert event['status'] == 201
+
+
+def test_series_are_bounded():
+    registry = MetricsRegistry(max_series=2)
+    for target in 'abcd':
+        registry.observe(Labels('v', target, '', 'GET', 'false'), 0.1, 1, 200)
+    targets = sorted(labels.target for labels, _, _, _ in registry.collect())
+    assert targets == ['a', 'b', 'other']
+
+
+def test_prometheus_text():
+    registry = MetricsRegistry()
+    labels = Labels('view', 'tar"get', '', 'GET', 'false')
+    registry.observe(labels, 0.02, 150, 200)
+    registry.observe(labels, 0.3, 50, 404)
+    text = prometheus_text(registry)
+    label_text = ('view="view",target="tar\\"get",trigger="",method="GET",'
+                  'changed_method="false"')
+    assert ('intercooler_request_duration_seconds_bucket{%s,le="0.025"} 1'
+            % label_text) in text
+    assert ('intercooler_request_duration_seconds_bucket{%s,le="+Inf"} 2'
+            % label_text) in text
+    assert ('intercooler_request_duration_seconds_count{%s} 2'
+            % label_text) in text
+    assert ('intercooler_response_size_bytes_bucket{%s,le="100.0"} 1'
+            % label_text) in text
+    assert ('intercooler_responses_total{%s,status="404"} 1'
+            % label_text) in text
+    assert '# TYPE intercooler_responses_total counter' in text
+
+
+def test_metrics_view(rf):
+    response = metrics_view(rf.get('/metrics/'))
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    assert b'# TYPE intercooler_request_duration_seconds histogram' in \
+        response.content
@@ -1,11 +1,20 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals
 
-from django.utils.six.moves.urllib.parse import urlparse
+import copy
+import pickle
+try:
+    from urllib.parse import urlparse
+except ImportError:  # Python 2
+    from urlparse import urlparse
 
 import pytest
+from django.http import QueryDict
+from django.utils.functional import empty
 from intercooler_helpers.middleware import (IntercoolerData,
-                                            HttpMethodOverride)
+                                            IntercoolerQueryDict,
+                                            HttpMethodOverride,
+                                            _scan_body_for_method)
 
 
 @pytest.fixture
@@ -23,12 +32,23 @@ def http_method_mw():
     "intercooler_data",
     "_processed_intercooler_data",
 ])
-def test_methods_dont_exist_on_class_only_on_instance(rf, ic_mw, method):
+def test_methods_dont_exist_on_original_class_only_on_instance(rf, ic_mw, method):
     request = rf.get('/')
+    original_class = request.__class__
     ic_mw.process_request(request)
     assert request.intercooler_data.id == 0
     assert hasattr(request, method) is True
-    assert hasattr(request.__class__, method) is False
+    assert hasattr(original_class, method) is False
+    assert isinstance(request, original_class) is True
+
+
+def test_request_class_is_reused(rf, ic_mw):
+    request1 = rf.get('/')
+    request2 = rf.get('/')
+    ic_mw.process_request(request1)
+    ic_mw.process_request(request2)
+    ic_mw.process_request(request2)
+    assert request1.__class__ is request2.__class__
 
 
 def test_maybe_intercooler_via_header(rf, ic_mw):
@@ -50,6 +70,15 @@ def test_is_intercooler(rf, ic_mw):
     assert request.is_intercooler() is True
 
 
+def test_is_intercooler_is_cached_on_request(rf, ic_mw):
+    request = rf.get('/', HTTP_X_IC_REQUEST="true",
+                     HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    ic_mw.process_request(request)
+    assert request.is_intercooler() is True
+    del request.META['HTTP_X_IC_REQUEST']
+    assert request.is_intercooler() is True
+
+
 def test_intercooler_data(rf, ic_mw):
     querystring_data = {
         'ic-id': '3',
@@ -81,9 +110,10 @@ def test_intercooler_data(rf, ic_mw):
     assert data.target_id == 'target_html_id'
     assert data.trigger == ('triggered_by_html_name', 'triggered_by_id')
     assert data.prompt_value == 'undocumented'
-    assert data._mutable is False
+    with pytest.raises(AttributeError):
+        data.id = 4
     assert data.dict() == querystring_data
-    # ensure that after calling the property (well, SimpleLazyObject)
+    # ensure that after calling the property (well, cached_property)
     # the request has cached the data structure to an attribute.
     request._processed_intercooler_data
 
@@ -113,7 +143,111 @@ def test_intercooler_data_removes_data_from_GET(rf, ic_mw):
     assert len(request.GET) == 1
 
 
-# TODO : test removes data from POST
+def test_intercooler_data_removes_data_from_POST(rf, ic_mw):
+    postdata = {
+        'ic-id': '3',
+        'ic-request': 'true',
+        'ic-target-id': 'target_html_id',
+        'field': 'value',
+    }
+    request = rf.post('/', data=postdata, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    ic_mw.process_request(request)
+    assert len(request.POST) == 4
+    assert request.intercooler_data.id == 3
+    assert request.POST.dict() == {'field': 'value'}
+    assert request.POST._mutable is False
+
+
+def test_intercooler_data_keeps_last_value(rf, ic_mw):
+    request = rf.get('/?ic-id=1&ic-id=2')
+    ic_mw.process_request(request)
+    assert request.intercooler_data.getlist('ic-id') == ['2']
+    assert 'ic-id' not in request.GET
+
+
+def test_intercooler_data_preserve_request_data(rf, ic_mw, settings):
+    settings.INTERCOOLER_HELPERS_PRESERVE_REQUEST_DATA = True
+    request = rf.get('/', data={'ic-id': '3', 'ic-target-id': 'x', 'a': '1'})
+    ic_mw.process_request(request)
+    data = request.intercooler_data
+    assert data.id == 3
+    assert len(request.GET) == 3
+    assert 'ic-id' not in data.app_data
+    assert data.app_data.dict() == {'a': '1'}
+    assert data.app_data.getlist('ic-target-id') == []
+    assert data.app_data.get('ic-target-id', 'missing') == 'missing'
+
+
+def test_intercooler_params_querydict_compatibility(rf, ic_mw):
+    request = rf.get('/', data={'ic-id': '3', 'ic-target-id': 'x',
+                                'ic-current-url': '/lol/?a=1'})
+    ic_mw.process_request(request)
+    data = request.intercooler_data
+    assert data['ic-target-id'] == 'x'
+    assert data.get('ic-element-id') is None
+    assert data.getlist('ic-element-id') == []
+    with pytest.raises(KeyError):
+        data['ic-element-id']
+    with pytest.raises(TypeError):
+        data['ic-id'] = '4'
+    with pytest.raises(AttributeError):
+        data.target_id = 'y'
+    assert 'ic-target-id=x' in data.urlencode()
+    assert data.getlist('ic-id') == ['3']
+    assert dict(data.lists())['ic-target-id'] == ['x']
+    qd = data.querydict()
+    assert isinstance(qd, IntercoolerQueryDict)
+    assert isinstance(qd, QueryDict)
+    assert qd._mutable is False
+    assert (qd.id, qd.target_id, qd.url) == (3, 'x', data.url)
+    assert qd.app_data is data.app_data
+    copied = data.copy()
+    assert isinstance(copied, IntercoolerQueryDict)
+    copied['ic-id'] = '4'
+    assert copied.id == 4
+    assert data.id == 3
+    assert data.url is data.url
+    assert copy.copy(data).dict() == data.dict()
+
+
+def test_intercooler_params_id_must_be_a_number(rf, ic_mw):
+    request = rf.get('/', data={'ic-id': 'x', 'ic-target-id': 't'})
+    ic_mw.process_request(request)
+    data = request.intercooler_data
+    assert data.target_id == 't'
+    with pytest.raises(ValueError):
+        data.id
+
+
+def test_intercooler_params_pickle(rf, ic_mw):
+    request = rf.get('/', data={'ic-id': '3', 'ic-element-id': 'e', 'a': '1'})
+    ic_mw.process_request(request)
+    pickled = pickle.dumps(request.intercooler_data)
+    data = pickle.loads(pickled)
+    assert data.id == 3
+    assert data.element == (None, 'e')
+    # Not the whole of request.GET.
+    assert data.app_data is None
+    assert b'QueryDictView' not in pickled
+    assert repr(data) == repr(request.intercooler_data)
+
+
+def test_querydictview_is_read_only_view(rf, ic_mw):
+    request = rf.get('/', data={'ic-id': '3', 'a': '1', 'b': '2'})
+    ic_mw.process_request(request)
+    view = request.intercooler_data.app_data
+    assert view['a'] == '1'
+    assert len(view) == 2
+    assert sorted(view.keys()) == ['a', 'b']
+    assert sorted(view.items()) == [('a', '1'), ('b', '2')]
+    with pytest.raises(KeyError):
+        view['ic-id']
+    with pytest.raises(TypeError):
+        view['a'] = '2'
+    copied = view.copy()
+    copied['c'] = '3'
+    assert 'c' not in view
+    assert view.urlencode() in ('a=1&b=2', 'b=2&a=1')
 
 
 def test_http_method_override_via_querystring(rf, http_method_mw):
@@ -142,9 +276,124 @@ def test_http_method_override_via_header(rf, http_method_mw):
     assert request.PATCH is request.POST
 
 
+@pytest.mark.parametrize("url,extra", [
+    ('/', {'HTTP_X_HTTP_METHOD_OVERRIDE': 'patch'}),
+    ('/?_method=patch', {}),
+])
+def test_http_method_override_parse_mode_parses_eagerly(rf, http_method_mw,
+                                                        url, extra):
+    request = rf.post(url, data={'field': 'value'}, **extra)
+    http_method_mw.process_request(request)
+    assert request.method == 'PATCH'
+    assert _body_parsed(request) is True
+    assert request.PATCH is request.POST
+    assert request.POST.dict() == {'field': 'value'}
+
+
 def test_intercooler_querydict_copied_change_method_from_request(rf, http_method_mw, ic_mw):
     request = rf.post('/?_method=patch', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
     http_method_mw.process_request(request)
     ic_mw.process_request(request)
     assert request.changed_method is True
     assert request.intercooler_data.changed_method is True
+
+
+def _body_parsed(request):
+    post = request.__dict__.get('_post')
+    return post is not None and getattr(post, '_wrapped', None) is not empty
+
+
+@pytest.fixture
+def scanning_mw(settings):
+    settings.INTERCOOLER_HELPERS_METHOD_OVERRIDE_BODY = 'scan'
+    settings.INTERCOOLER_HELPERS_METHOD_OVERRIDE_SCAN_BYTES = 256
+    return HttpMethodOverride()
+
+
+def test_http_method_override_scan_multipart_doesnt_parse(rf, scanning_mw):
+    request = rf.post('/', data={'_method': 'delete', 'upload': 'x' * 1000})
+    scanning_mw.process_request(request)
+    assert request.method == 'DELETE'
+    assert request.original_method == 'POST'
+    assert _body_parsed(request) is False
+    # The body can still be read in full, or parsed, afterwards.
+    assert len(request.body) == int(request.META['CONTENT_LENGTH'])
+    assert request.DELETE['upload'] == 'x' * 1000
+    assert request.POST is request.DELETE._wrapped
+
+
+def test_http_method_override_scan_leaves_stream_readable(rf, scanning_mw):
+    request = rf.post('/', data='_method=put&' + 'a=b&' * 200,
+                      content_type='application/x-www-form-urlencoded')
+    scanning_mw.process_request(request)
+    assert request.method == 'PUT'
+    lines = list(request)
+    assert b''.join(lines).startswith(b'_method=put&a=b&')
+    assert len(b''.join(lines)) == 12 + 4 * 200
+
+
+@pytest.mark.parametrize("body", [
+    # Beyond the scanned bytes.
+    'a=b&' * 100 + '_method=put',
+    # Cut off by the scan, after '_method=pu'.
+    'a=' + 'b' * 243 + '&_method=put',
+])
+def test_http_method_override_scan_only_reads_the_start(rf, scanning_mw,
+                                                        body):
+    request = rf.post('/', data=body + '&' + 'c' * 100,
+                      content_type='application/x-www-form-urlencoded')
+    scanning_mw.process_request(request)
+    assert request.method == 'POST'
+    assert request.changed_method is False
+
+
+def test_http_method_override_scan_ignores_a_cut_off_value(rf):
+    body = 'a=' + 'b' * 243 + '&_method=put&c=d'
+    request = rf.post('/', data=body,
+                      content_type='application/x-www-form-urlencoded')
+    assert _scan_body_for_method(request, 256) is None
+    assert _scan_body_for_method(request, 258) == 'put'
+
+
+@pytest.mark.parametrize("body_mode", ['parse', 'scan'])
+def test_http_method_override_body_with_intercooler_data(rf, settings, ic_mw,
+                                                         body_mode):
+    settings.INTERCOOLER_HELPERS_METHOD_OVERRIDE_BODY = body_mode
+    request = rf.post('/', data={'_method': 'put', 'ic-id': '3',
+                                 'ic-target-id': 'x', 'field': 'value'},
+                      HTTP_X_IC_REQUEST='true',
+                      HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    HttpMethodOverride().process_request(request)
+    ic_mw.process_request(request)
+    assert request.method == 'PUT'
+    data = request.intercooler_data
+    assert (data.id, data.target_id) == (3, 'x')
+    assert request.PUT.dict() == {'field': 'value'}
+    assert request.POST.dict() == {'field': 'value'}
+
+
+def test_http_method_override_scan_post_before_put(rf, scanning_mw):
+    request = rf.post('/', data={'_method': 'put', 'field': 'value'})
+    scanning_mw.process_request(request)
+    # Still possible, as nothing has been parsed yet.
+    request.upload_handlers = []
+    assert request.POST.dict() == {'field': 'value'}
+    assert request.PUT.dict() == {'field': 'value'}
+    assert request.FILES.dict() == {}
+
+
+def test_http_method_override_scan_checks_header_first(rf, scanning_mw):
+    request = rf.post('/', data={'_method': 'put'},
+                      HTTP_X_HTTP_METHOD_OVERRIDE='patch')
+    scanning_mw.process_request(request)
+    assert request.method == 'PATCH'
+    assert _body_parsed(request) is False
+    assert request.PATCH['_method'] == 'put'
+
+
+def test_http_method_override_ignoring_body(rf, settings):
+    settings.INTERCOOLER_HELPERS_METHOD_OVERRIDE_BODY = 'ignore'
+    request = rf.post('/', data={'_method': 'put'})
+    HttpMethodOverride().process_request(request)
+    assert request.method == 'POST'
+    assert '_post' not in request.__dict__
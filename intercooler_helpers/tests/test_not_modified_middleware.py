@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from intercooler_helpers.middleware import IntercoolerData
+from intercooler_helpers.not_modified import IntercoolerNotModified
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class Session(object):
+    def __init__(self, session_key):
+        self.session_key = session_key
+
+
+def _poll(rf, ic_id=1, target_id='polling-content', session='abc',
+          current_url='/dashboard/', **extra):
+    data = {'ic-id': ic_id, 'ic-target-id': target_id}
+    if current_url is not None:
+        data['ic-current-url'] = current_url
+    request = rf.get('/polling/', data=data,
+                     HTTP_X_IC_REQUEST="true",
+                     HTTP_X_REQUESTED_WITH='XMLHttpRequest', **extra)
+    if session is not None:
+        request.session = Session(session)
+    IntercoolerData().process_request(request)
+    return request
+
+
+def test_first_poll_gets_content_and_etag(rf):
+    response = IntercoolerNotModified().process_response(
+        _poll(rf), HttpResponse('hello'))
+    assert response.content == b'hello'
+    assert response.has_header('ETag') is True
+
+
+def test_unchanged_poll_is_emptied(rf):
+    mw = IntercoolerNotModified()
+    mw.process_response(_poll(rf, ic_id=1), HttpResponse('hello'))
+    response = mw.process_response(_poll(rf, ic_id=2), HttpResponse('hello'))
+    assert response.status_code == 200
+    assert response.content == b''
+
+
+def test_changed_poll_is_sent(rf):
+    mw = IntercoolerNotModified()
+    mw.process_response(_poll(rf, ic_id=1), HttpResponse('hello'))
+    response = mw.process_response(_poll(rf, ic_id=2), HttpResponse('bye'))
+    assert response.content == b'bye'
+
+
+def test_different_target_is_sent(rf):
+    mw = IntercoolerNotModified()
+    mw.process_response(_poll(rf), HttpResponse('hello'))
+    response = mw.process_response(_poll(rf, target_id='other'),
+                                   HttpResponse('hello'))
+    assert response.content == b'hello'
+
+
+def test_different_client_is_sent(rf):
+    mw = IntercoolerNotModified()
+    mw.process_response(_poll(rf), HttpResponse('hello'))
+    response = mw.process_response(_poll(rf, session='def'),
+                                   HttpResponse('hello'))
+    assert response.content == b'hello'
+
+
+def test_tabs_on_other_pages_are_sent(rf):
+    mw = IntercoolerNotModified()
+    mw.process_response(_poll(rf), HttpResponse('hello'))
+    response = mw.process_response(_poll(rf, current_url='/other/'),
+                                   HttpResponse('hello'))
+    assert response.content == b'hello'
+
+
+@pytest.mark.parametrize("kwargs", [
+    {'target_id': ''},
+    {'current_url': None},
+])
+def test_unidentified_elements_are_always_sent(rf, kwargs):
+    mw = IntercoolerNotModified()
+    mw.process_response(_poll(rf, **kwargs), HttpResponse('hello'))
+    response = mw.process_response(_poll(rf, **kwargs),
+                                   HttpResponse('hello'))
+    assert response.content == b'hello'
+
+
+def test_clients_without_a_session_are_always_sent(rf):
+    mw = IntercoolerNotModified()
+    mw.process_response(_poll(rf, session=None), HttpResponse('hello'))
+    response = mw.process_response(_poll(rf, session=None),
+                                   HttpResponse('hello'))
+    assert response.content == b'hello'
+    etag = response['ETag']
+    response = mw.process_response(
+        _poll(rf, session=None, HTTP_IF_NONE_MATCH=etag),
+        HttpResponse('hello'))
+    assert response.status_code == 304
+
+
+def test_if_none_match_gives_304(rf):
+    mw = IntercoolerNotModified()
+    etag = mw.process_response(_poll(rf), HttpResponse('hello'))['ETag']
+    response = mw.process_response(_poll(rf, HTTP_IF_NONE_MATCH=etag),
+                                   HttpResponse('hello'))
+    assert response.status_code == 304
+    assert response.content == b''
+
+
+def test_polling_headers_are_kept(rf):
+    mw = IntercoolerNotModified()
+    mw.process_response(_poll(rf), HttpResponse('hello'))
+    original = HttpResponse('hello')
+    original['X-IC-CancelPolling'] = 'true'
+    response = mw.process_response(_poll(rf), original)
+    assert response.content == b''
+    assert response['X-IC-CancelPolling'] == 'true'
+
+
+@pytest.mark.parametrize("response", [
+    HttpResponse('hello', status=201),
+    HttpResponse('hello', status=404),
+])
+def test_non_200_responses_untouched(rf, response):
+    mw = IntercoolerNotModified()
+    mw.process_response(_poll(rf), HttpResponse('hello'))
+    changed = mw.process_response(_poll(rf), response)
+    assert changed.content == b'hello'
+    assert changed.has_header('ETag') is False
+
+
+def test_non_intercooler_requests_untouched(rf):
+    mw = IntercoolerNotModified()
+    request = rf.get('/polling/')
+    IntercoolerData().process_request(request)
+    mw.process_response(request, HttpResponse('hello'))
+    response = mw.process_response(request, HttpResponse('hello'))
+    assert response.content == b'hello'
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import re
+
+import pytest
+from django.contrib.auth.models import User
+from django.views.generic import TemplateView
+try:
+    from urllib.parse import unquote
+except ImportError:  # Python 2
+    from urllib import unquote
+
+from intercooler_helpers.middleware import IntercoolerData
+from intercooler_helpers.pagination import (InvalidCursor, KeysetPage,
+                                            KeysetStreamingMixin,
+                                            decode_cursor, encode_cursor)
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def users():
+    # Two per name, so that ordering by name alone isn't enough.
+    for i in range(7):
+        for suffix in 'ab':
+            User.objects.create(username='user{}{}'.format(i, suffix),
+                                first_name='name{}'.format(i))
+
+
+class UserRows(KeysetStreamingMixin, TemplateView):
+    queryset = User.objects.all()
+    ordering = ('-first_name',)
+    page_size = 4
+    template_name = 'keyset_page.html'
+    row_template_name = 'keyset_row.html'
+    next_page_tag = 'tr'
+    next_page_target = '#rows'
+
+
+def _pages(queryset, ordering, page_size):
+    cursor = None
+    while True:
+        page = KeysetPage(queryset, ordering, page_size=page_size,
+                          cursor=cursor)
+        yield [user.username for user in page]
+        cursor = page.next_cursor
+        if cursor is None:
+            return
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(['a', 1])) == ['a', 1]
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(['a', 1]) + 'x')
+
+
+def test_pages_cover_every_row_once(users):
+    pages = list(_pages(User.objects.all(), ('-first_name',), 4))
+    assert [len(page) for page in pages] == [4, 4, 4, 2]
+    flat = [name for page in pages for name in page]
+    assert flat == list(User.objects.order_by('-first_name', '-pk')
+                        .values_list('username', flat=True))
+
+
+def test_exact_multiple_of_page_size(users):
+    pages = list(_pages(User.objects.filter(first_name='name0'), ('pk',), 2))
+    assert pages == [['user0a', 'user0b']]
+
+
+def test_cursor_must_match_ordering(users):
+    with pytest.raises(InvalidCursor):
+        KeysetPage(User.objects.all(), ('username',),
+                   cursor=encode_cursor([1, 2, 3]))
+
+
+def test_full_page_renders_next_page_element(rf, users):
+    request = rf.get('/users/', data={'q': 'x'})
+    IntercoolerData().process_request(request)
+    response = UserRows.as_view()(request)
+    content = response.render().content.decode('utf-8')
+    assert content.count('<td>') == 4
+    next_row = re.search(r'<tr ic-append-from="/users/\?([^"]+)" '
+                         r'ic-trigger-on="scrolled-into-view" '
+                         r'ic-target="#rows"></tr>', content)
+    assert next_row is not None
+    assert next_row.group(1).startswith('q=x&amp;cursor=')
+
+
+def test_intercooler_requests_stream_rows(rf, users):
+    first = rf.get('/users/')
+    IntercoolerData().process_request(first)
+    content = UserRows.as_view()(first).render().content.decode('utf-8')
+    cursor = unquote(re.search(r'cursor=([^"&]+)', content).group(1))
+    request = rf.get('/users/', data={'cursor': cursor, 'ic-request': 'true',
+                                      'ic-id': '2'},
+                     HTTP_X_IC_REQUEST='true',
+                     HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    IntercoolerData().process_request(request)
+    response = UserRows.as_view()(request)
+    assert response.streaming is True
+    chunks = [chunk.decode('utf-8') for chunk in response.streaming_content]
+    assert chunks[:4] == ['<tr><td>user4b</td></tr>\n',
+                          '<tr><td>user4a</td></tr>\n',
+                          '<tr><td>user3b</td></tr>\n',
+                          '<tr><td>user3a</td></tr>\n']
+    # The ic-* parameters aren't carried over to the next page.
+    assert chunks[4].startswith('<tr ic-append-from="/users/?cursor=')
+    assert len(chunks) == 5
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import pytest
+from django.http import HttpResponse
+
+from intercooler_helpers.middleware import (IntercoolerPollingBackpressure,
+                                            IntercoolerData, LoadMonitor)
+
+
+@pytest.fixture
+def backpressure_mw(settings):
+    settings.INTERCOOLER_HELPERS_POLL_INTERVALS = {'polling-content': 2,
+                                                   'slow': 20}
+    settings.INTERCOOLER_HELPERS_POLL_MAX_INTERVAL = 10
+    settings.INTERCOOLER_HELPERS_POLL_TARGET_LATENCY = 0.5
+    settings.INTERCOOLER_HELPERS_POLL_MAX_IN_FLIGHT = 10
+    settings.INTERCOOLER_HELPERS_POLL_LOW_PRIORITY_TARGETS = ('ticker',)
+    mw = IntercoolerPollingBackpressure()
+    mw.monitor = LoadMonitor(alpha=1)
+    return mw
+
+
+def _poll(rf, mw, target_id='polling-content'):
+    request = rf.get('/polling/', data={'ic-target-id': target_id},
+                     HTTP_X_IC_REQUEST="true",
+                     HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    IntercoolerData().process_request(request)
+    mw.process_request(request)
+    return request
+
+
+def test_in_flight_is_tracked(rf, backpressure_mw):
+    request = _poll(rf, backpressure_mw)
+    assert backpressure_mw.monitor.snapshot().in_flight == 1
+    backpressure_mw.process_response(request, HttpResponse())
+    assert backpressure_mw.monitor.snapshot().in_flight == 0
+
+
+def test_no_header_when_not_loaded(rf, backpressure_mw):
+    request = _poll(rf, backpressure_mw)
+    response = backpressure_mw.process_response(request, HttpResponse())
+    assert response.has_header('X-IC-SetPollInterval') is False
+
+
+def test_slows_down_when_loaded(rf, backpressure_mw):
+    requests = [_poll(rf, backpressure_mw) for _ in range(15)]
+    response = backpressure_mw.process_response(requests[0], HttpResponse())
+    # 14 still in flight, out of a maximum of 10.
+    assert response['X-IC-SetPollInterval'] == '2800ms'
+
+
+def test_interval_is_capped(rf, backpressure_mw):
+    requests = [_poll(rf, backpressure_mw) for _ in range(100)]
+    response = backpressure_mw.process_response(requests[0], HttpResponse())
+    assert response['X-IC-SetPollInterval'] == '10000ms'
+
+
+def test_slower_pollers_are_never_sped_up(rf, backpressure_mw):
+    requests = [_poll(rf, backpressure_mw, target_id='slow')
+                for _ in range(15)]
+    response = backpressure_mw.process_response(requests[0], HttpResponse())
+    assert response['X-IC-SetPollInterval'] == '20000ms'
+
+
+def test_restores_interval_after_overload(rf, backpressure_mw):
+    requests = [_poll(rf, backpressure_mw) for _ in range(15)]
+    backpressure_mw.process_response(requests[0], HttpResponse())
+    for request in requests[1:]:
+        backpressure_mw.process_response(request, HttpResponse())
+    for target_id, interval in (('polling-content', '2000ms'),
+                                ('slow', '20000ms')):
+        request = _poll(rf, backpressure_mw, target_id=target_id)
+        response = backpressure_mw.process_response(request, HttpResponse())
+        assert response['X-IC-SetPollInterval'] == interval
+
+
+def test_requests_for_other_targets_untouched(rf, backpressure_mw):
+    requests = [_poll(rf, backpressure_mw, target_id='sidebar')
+                for _ in range(30)]
+    response = backpressure_mw.process_response(requests[0], HttpResponse())
+    assert response.has_header('X-IC-SetPollInterval') is False
+    assert response.has_header('X-IC-CancelPolling') is False
+
+
+def test_cancels_low_priority_targets_when_overloaded(rf, backpressure_mw):
+    requests = [_poll(rf, backpressure_mw, target_id='ticker')
+                for _ in range(30)]
+    response = backpressure_mw.process_response(requests[0], HttpResponse())
+    assert response['X-IC-CancelPolling'] == 'true'
+    assert response.has_header('X-IC-SetPollInterval') is False
+
+
+def test_existing_polling_headers_untouched(rf, backpressure_mw):
+    requests = [_poll(rf, backpressure_mw) for _ in range(30)]
+    original = HttpResponse()
+    original['X-IC-ResumePolling'] = 'true'
+    response = backpressure_mw.process_response(requests[0], original)
+    assert response.has_header('X-IC-SetPollInterval') is False
+
+
+def test_non_intercooler_requests_untouched(rf, backpressure_mw):
+    [_poll(rf, backpressure_mw) for _ in range(30)]
+    request = rf.get('/')
+    IntercoolerData().process_request(request)
+    backpressure_mw.process_request(request)
+    response = backpressure_mw.process_response(request, HttpResponse())
+    assert response.has_header('X-IC-SetPollInterval') is False
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import marshal
+
+import pytest
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import Http404, HttpResponse
+
+from intercooler_helpers import profiling
+from intercooler_helpers.middleware import IntercoolerData
+from intercooler_helpers.profiling import (DirectoryProfileStore,
+                                           IntercoolerProfiler,
+                                           LocalProfileStore, profiles_view)
+try:
+    from django.urls import resolve
+except ImportError:  # Django <1.10
+    from django.core.urlresolvers import resolve
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = LocalProfileStore(size=2)
+    monkeypatch.setattr(profiling, '_store', store)
+    return store
+
+
+def _ic_get(rf, path='/polling/', **extra):
+    request = rf.get(path, data={'ic-element-id': 'poller',
+                                 'ic-target-id': 'list'},
+                     HTTP_X_IC_REQUEST='true',
+                     HTTP_X_REQUESTED_WITH='XMLHttpRequest', **extra)
+    IntercoolerData().process_request(request)
+    return request
+
+
+def _handle(request):
+    mw = IntercoolerProfiler()
+    mw.process_request(request)
+    request.resolver_match = resolve(request.path_info)
+    sum(range(1000))
+    return mw.process_response(request, HttpResponse('ok'))
+
+
+def test_not_profiled_by_default(rf, store):
+    _handle(_ic_get(rf))
+    assert store.records() == []
+
+
+def test_profiles_authorised_header(rf, store, settings):
+    settings.INTERCOOLER_HELPERS_PROFILE_TOKEN = 'sekrit'
+    _handle(_ic_get(rf, HTTP_X_IC_PROFILE='wrong'))
+    assert store.records() == []
+    _handle(_ic_get(rf, HTTP_X_IC_PROFILE='sekrit'))
+    record, = store.records()
+    assert record.view == 'polling'
+    assert record.target == 'list'
+    assert record.path == '/polling/'
+    assert record.duration > 0
+    stats = marshal.loads(store.data(record.id))
+    assert any(func[2] == 'process_response' for func in stats)
+
+
+def test_profiles_elements_and_samples(rf, store, settings):
+    settings.INTERCOOLER_HELPERS_PROFILE_ELEMENTS = ['poller']
+    _handle(_ic_get(rf))
+    settings.INTERCOOLER_HELPERS_PROFILE_ELEMENTS = []
+    settings.INTERCOOLER_HELPERS_PROFILE_SAMPLE_RATE = 1
+    _handle(_ic_get(rf))
+    # Only Intercooler.js requests are profiled.
+    request = rf.get('/polling/')
+    IntercoolerData().process_request(request)
+    _handle(request)
+    assert len(store.records()) == 2
+
+
+def test_store_is_bounded(store):
+    for i in range(3):
+        store.add(b'data', view='v', target=str(i), method='GET', path='/',
+                  duration=0.1)
+    newest, older = store.records()
+    assert (newest.target, older.target) == ('2', '1')
+    assert store.data(older.id) == b'data'
+    assert len(store._data) == 2
+
+
+def test_directory_store(tmpdir):
+    store = DirectoryProfileStore(size=1, directory=str(tmpdir))
+    first = store.add(b'one', view='v', target='', method='GET', path='/',
+                      duration=0.1)
+    second = store.add(b'two', view='v', target='', method='GET', path='/',
+                       duration=0.1)
+    assert store.data(first.id) is None
+    assert store.data(second.id) == b'two'
+    assert tmpdir.listdir() == [tmpdir.join('{}.prof'.format(second.id))]
+
+
+def test_view_is_staff_only(rf, store):
+    request = rf.get('/profiles/')
+    request.user = AnonymousUser()
+    assert profiles_view(request).status_code == 302
+
+
+def test_view_lists_and_downloads(rf, store):
+    record = store.add(b'data', view='app:view', target='<list>',
+                       method='GET', path='/', duration=0.0123)
+    store.add(b'data', view='other', target='', method='GET', path='/',
+              duration=0.1)
+    staff = User(username='staff', is_staff=True, is_active=True)
+    request = rf.get('/profiles/', data={'view': 'app:view'})
+    request.user = staff
+    content = profiles_view(request).content.decode('utf-8')
+    assert '&lt;list&gt;' in content
+    assert '12.3ms' in content
+    assert 'other' not in content
+    request = rf.get('/profiles/', data={'download': record.id})
+    request.user = staff
+    response = profiles_view(request)
+    assert response.content == b'data'
+    assert response['Content-Disposition'] == \
+        'attachment; filename="app_view-_list_-{}.prof"'.format(record.id)
+    request = rf.get('/profiles/', data={'download': 'nope'})
+    request.user = staff
+    with pytest.raises(Http404):
+        profiles_view(request)
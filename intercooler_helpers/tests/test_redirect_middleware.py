@@ -43,3 +43,93 @@ def test_redirect_dies_without_intercoolerdata_middleware(rf):
     with pytest.raises(AttributeError) as exc:
         IntercoolerRedirector().process_response(request, response)
 
+
+def _ic_post(rf, path='/form/'):
+    request = rf.post(path, data={'ic-target-id': 'form-target',
+                                  'ic-current-url': '/form/'},
+                      HTTP_X_IC_REQUEST="true",
+                      HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    IntercoolerData().process_request(request)
+    return request
+
+
+def test_redirect_is_changed_in_place(rf):
+    request = _ic_post(rf)
+    response = redirect('/redirector/redirected/')
+    response.set_cookie('saved', 'yes')
+    changed_response = IntercoolerRedirector().process_response(request,
+                                                                response)
+    assert changed_response is response
+    assert changed_response.status_code == 200
+    assert changed_response.cookies['saved'].value == 'yes'
+
+
+def test_redirects_followed_in_process(rf, settings):
+    settings.INTERCOOLER_HELPERS_FOLLOW_REDIRECTS = True
+    request = _ic_post(rf)
+    response = IntercoolerRedirector().process_response(
+        request, redirect('/redirector/redirected/?a=1'))
+    assert response.status_code == 200
+    assert response.has_header('X-IC-Redirect') is False
+    assert response['X-IC-PushURL'] == '/redirector/redirected/?a=1'
+    assert b'redirected' in response.content
+    # The original request is untouched.
+    assert request.method == 'POST'
+    assert request.intercooler_data.target_id == 'form-target'
+
+
+@pytest.mark.parametrize("url", [
+    'http://example.com/redirector/redirected/',
+    'https://testserver/redirector/redirected/',
+    '/does/not/exist/',
+])
+def test_redirects_not_followed_elsewhere(rf, settings, url):
+    settings.INTERCOOLER_HELPERS_FOLLOW_REDIRECTS = True
+    response = IntercoolerRedirector().process_response(_ic_post(rf),
+                                                        redirect(url))
+    assert response['X-IC-Redirect'] == url
+    assert response.has_header('X-IC-PushURL') is False
+
+
+def test_redirects_followed_with_ic_parameters(rf, settings):
+    settings.INTERCOOLER_HELPERS_FOLLOW_REDIRECTS = True
+    response = IntercoolerRedirector().process_response(
+        _ic_post(rf), redirect('http://testserver/infinite/scrolling/'))
+    assert response['X-IC-PushURL'] == 'http://testserver/infinite/scrolling/'
+    # Only the fragment, as the view saw an Intercooler.js request.
+    assert b'<html' not in response.content
+
+
+def test_redirect_body_is_dropped(rf):
+    response = redirect('/test/')
+    response.content = b'<p>Moved</p>'
+    response = IntercoolerRedirector().process_response(_ic_post(rf),
+                                                        response)
+    assert response['X-IC-Redirect'] == '/test/'
+    assert response.content == b''
+
+
+def test_redirects_to_disallowed_hosts_not_followed(rf, settings):
+    settings.INTERCOOLER_HELPERS_FOLLOW_REDIRECTS = True
+    settings.ALLOWED_HOSTS = ['testserver']
+    request = _ic_post(rf)
+    request.META['HTTP_HOST'] = 'evil.example.com'
+    url = 'http://evil.example.com/redirector/redirected/'
+    response = IntercoolerRedirector().process_response(request,
+                                                        redirect(url))
+    assert response['X-IC-Redirect'] == url
+
+
+def test_redirects_left_to_browser_when_view_fails(rf, settings,
+                                                   monkeypatch):
+    from intercooler_helpers import batch
+
+    def dispatch_subrequest(request):
+        raise RuntimeError('broken')
+    settings.INTERCOOLER_HELPERS_FOLLOW_REDIRECTS = True
+    monkeypatch.setattr(batch, 'dispatch_subrequest', dispatch_subrequest)
+    response = IntercoolerRedirector().process_response(
+        _ic_post(rf), redirect('/redirector/redirected/'))
+    assert response['X-IC-Redirect'] == '/redirector/redirected/'
+    assert response.has_header('X-IC-PushURL') is False
+    assert response.content == b''
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import pytest
+try:
+    from django.urls import clear_url_caches
+except ImportError:  # Django <1.10
+    from django.core.urlresolvers import clear_url_caches
+
+from intercooler_helpers.middleware import IntercoolerData
+from intercooler_helpers.resolver import (ResolverCache, resolver_cache,
+                                          cache_info)
+
+
+@pytest.fixture
+def cache():
+    return ResolverCache(maxsize=2)
+
+
+def test_resolve_counts_hits_and_misses(cache):
+    first = cache.resolve('/click/')
+    second = cache.resolve('/click/')
+    assert first is second
+    assert first.url_name == 'click'
+    assert cache.info() == (1, 1, 2, 1)
+
+
+def test_resolve_caches_404s_as_none(cache):
+    assert cache.resolve('/not/a/real/url/') is None
+    assert cache.resolve('/not/a/real/url/') is None
+    assert cache.info().hits == 1
+
+
+def test_resolve_evicts_least_recently_used(cache):
+    cache.resolve('/click/')
+    cache.resolve('/form/')
+    cache.resolve('/click/')
+    cache.resolve('/polling/')
+    assert len(cache) == 2
+    cache.resolve('/click/')
+    assert cache.info().hits == 2
+    cache.resolve('/form/')
+    assert cache.info().misses == 4
+
+
+def test_resolve_discarded_after_clear_url_caches(cache):
+    first = cache.resolve('/click/')
+    clear_url_caches()
+    second = cache.resolve('/click/')
+    assert first is not second
+    assert cache.info() == (0, 2, 2, 1)
+
+
+def test_resolve_with_zero_maxsize_never_stores():
+    cache = ResolverCache(maxsize=0)
+    cache.resolve('/click/')
+    cache.resolve('/click/')
+    assert cache.info() == (0, 2, 0, 0)
+
+
+def test_settings_change_resets_shared_cache(settings):
+    resolver_cache.resolve('/click/')
+    assert cache_info().currsize > 0
+    settings.ROOT_URLCONF = 'test_urls'
+    assert cache_info() == (0, 0, 256, 0)
+
+
+def test_querydict_url_is_memoized(rf):
+    request = rf.get('/', data={'ic-current-url': '/click/'})
+    IntercoolerData().process_request(request)
+    data = request.intercooler_data
+    assert data.url is data.url
+    assert data.url.match.url_name == 'click'
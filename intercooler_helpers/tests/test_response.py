@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import pytest
+from django.template import Context, Engine
+from django.template.loader import get_template
+
+from intercooler_helpers.middleware import IntercoolerData
+from intercooler_helpers.response import (IntercoolerTemplateResponse,
+                                          BlockNotFound, render_block)
+
+
+def _request(rf, target_id=None):
+    data = {}
+    if target_id is not None:
+        data['ic-target-id'] = target_id
+    request = rf.get('/', data=data, HTTP_X_IC_REQUEST="true",
+                     HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    IntercoolerData().process_request(request)
+    return request
+
+
+def test_render_block_skips_parent_template(rf):
+    template = get_template('redirected.html')
+    content = render_block(template, 'content', {}, rf.get('/'))
+    assert content.strip() == 'You were redirected via <code>/redirector/</code>'
+
+
+def test_render_block_found_in_parent_template(rf):
+    template = get_template('redirected.html')
+    assert render_block(template, 'content') != ''
+
+
+def test_render_block_uses_overridden_nested_blocks():
+    engine = Engine(loaders=[('django.template.loaders.locmem.Loader', {
+        'parent.html': '<html>{% block outer %}[outer {% block inner %}'
+                       'parent-inner{% endblock %}]{% endblock %}</html>',
+        'child.html': '{% extends "parent.html" %}{% block inner %}'
+                      'child-inner {{ block.super }}{% endblock %}',
+    })])
+    template = engine.get_template('child.html')
+    assert template.render(Context()) == \
+        '<html>[outer child-inner parent-inner]</html>'
+    assert render_block(template, 'outer') == \
+        '[outer child-inner parent-inner]'
+    assert render_block(template, 'inner') == 'child-inner parent-inner'
+
+
+def test_render_block_missing(rf):
+    template = get_template('redirected.html')
+    with pytest.raises(BlockNotFound):
+        render_block(template, 'nope')
+
+
+def test_response_renders_named_block(rf):
+    response = IntercoolerTemplateResponse(_request(rf), 'redirected.html',
+                                           block='content')
+    response.render()
+    assert b'<html' not in response.content
+    assert b'You were redirected' in response.content
+
+
+def test_response_renders_block_matching_target_id(rf):
+    response = IntercoolerTemplateResponse(_request(rf, target_id='content'),
+                                           'redirected.html')
+    response.render()
+    assert b'<html' not in response.content
+    assert b'You were redirected' in response.content
+
+
+def test_response_renders_full_page_for_unknown_target_id(rf):
+    response = IntercoolerTemplateResponse(_request(rf, target_id='unknown'),
+                                           'redirected.html')
+    response.render()
+    assert b'<html' in response.content
+
+
+def test_response_unknown_named_block_is_an_error(rf):
+    response = IntercoolerTemplateResponse(_request(rf), 'redirected.html',
+                                           block='unknown')
+    with pytest.raises(BlockNotFound):
+        response.render()
+
+
+def test_response_renders_full_page_outside_intercooler(rf):
+    request = rf.get('/')
+    IntercoolerData().process_request(request)
+    response = IntercoolerTemplateResponse(request, 'redirected.html',
+                                           block='content')
+    response.render()
+    assert b'<html' in response.content
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from django.conf.urls import include, url
+from django.conf.urls.i18n import i18n_patterns
+from django.http import HttpResponse
+
+from intercooler_helpers import middleware
+from intercooler_helpers.middleware import (HttpMethodOverride,
+                                            IntercoolerData,
+                                            IntercoolerRequestMixin)
+from intercooler_helpers.scope import (PathIndex, _literal_prefix,
+                                       find_prefixes, get_index,
+                                       uses_intercooler)
+
+
+@uses_intercooler
+def fragment(request, pk=None):
+    return HttpResponse('fragment')
+
+
+def plain(request, pk=None):
+    return HttpResponse('plain')
+
+
+_app_patterns = [
+    url(r'^list/$', plain),
+]
+
+_item_patterns = [
+    url(r'^edit/$', fragment),
+]
+
+urlpatterns = [
+    url(r'^app/', include((_app_patterns, 'app'))),
+    url(r'^items/(?P<pk>\d+)/', include(_item_patterns)),
+    url(r'^fragments/one/$', fragment),
+    url(r'^api/$', plain),
+]
+
+
+def test_path_index():
+    index = PathIndex(['/app/', '/app/deeper/', '/b'])
+    assert len(index) == 2
+    assert index.matches('/app/') is True
+    assert index.matches('/app/deeper/x') is True
+    assert index.matches('/ap') is False
+    assert index.matches('/bar/') is True
+    assert index.matches('/c/') is False
+    assert PathIndex(['']).matches('/anything/') is True
+    assert PathIndex().matches('/') is False
+
+
+def test_find_prefixes():
+    urlconf = __name__
+    assert find_prefixes(namespaces=['app'], urlconf=urlconf) == ['/app/']
+    # items/ is as far as the fixed part of the pattern goes.
+    assert find_prefixes(['/extra/'], views=True, urlconf=urlconf) == \
+        ['/extra/', '/items/', '/fragments/one/']
+    assert find_prefixes(namespaces=['missing'], urlconf=urlconf) == []
+
+
+def test_locale_prefix_is_not_literal(settings):
+    settings.USE_I18N = True
+    pattern, = i18n_patterns(url(r'^fragments/one/$', fragment))
+    assert _literal_prefix(pattern) == ('', False)
+
+
+def test_unscoped_by_default():
+    assert get_index() is None
+
+
+def _request(rf, path):
+    request = rf.post(path, data={'_method': 'PUT'}, HTTP_X_IC_REQUEST='true',
+                      HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    HttpMethodOverride().process_request(request)
+    IntercoolerData().process_request(request)
+    return request
+
+
+def test_middleware_skips_out_of_scope_paths(rf, settings):
+    settings.ROOT_URLCONF = __name__
+    settings.INTERCOOLER_HELPERS_SCOPE_PATHS = ['/polling/']
+    settings.INTERCOOLER_HELPERS_SCOPE_VIEWS = True
+    assert len(get_index()) == 3
+    request = _request(rf, '/api/')
+    assert request.is_intercooler() is False
+    assert request.maybe_intercooler() is False
+    assert request.method == 'POST'
+    assert request.changed_method is False
+    # The request is otherwise left alone.
+    assert not isinstance(request, IntercoolerRequestMixin)
+    for path in ('/polling/', '/items/3/edit/'):
+        request = _request(rf, path)
+        assert request.is_intercooler() is True
+        assert request.method == 'PUT'
+
+
+def test_scope_checked_once_per_request(rf, settings, monkeypatch):
+    settings.INTERCOOLER_HELPERS_SCOPE_PATHS = ['/polling/']
+    calls = []
+
+    def in_scope(request):
+        calls.append(request.path_info)
+        return request.path_info.startswith('/polling/')
+    monkeypatch.setattr(middleware, 'in_scope', in_scope)
+    _request(rf, '/polling/')
+    _request(rf, '/api/')
+    assert calls == ['/polling/', '/api/']
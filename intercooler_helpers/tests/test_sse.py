@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import threading
+
+import pytest
+
+from intercooler_helpers import sse
+from intercooler_helpers.sse import (LocalBroker, format_event, event_stream,
+                                     EventStreamView, get_broker)
+try:
+    import asyncio
+except ImportError:  # Python 2
+    asyncio = None
+
+needs_async = pytest.mark.skipif(sse.local_alisten is None,
+                                 reason="needs Python 3.6+")
+needs_async_streaming = pytest.mark.skipif(not sse.ASYNC_STREAMING,
+                                           reason="needs Django 4.2+")
+
+
+def _run(awaitable):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(awaitable)
+    finally:
+        loop.close()
+
+
+def _consume(iterator):
+    loop = asyncio.new_event_loop()
+    chunks = []
+    try:
+        while True:
+            try:
+                chunks.append(loop.run_until_complete(iterator.__anext__()))
+            except StopAsyncIteration:
+                return chunks
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def broker():
+    return LocalBroker(history=3)
+
+
+def test_format_event():
+    assert format_event('hi') == 'data: hi\n\n'
+    assert format_event('a\nb', event='update', id=3) == \
+        'id: 3\nevent: update\ndata: a\ndata: b\n\n'
+    assert format_event(retry=1000) == 'retry: 1000\n\n'
+
+
+def test_listen_returns_newer_events(broker):
+    first = broker.publish('chan', 'one')
+    broker.publish('other', 'ignored')
+    second = broker.publish('chan', 'two')
+    assert broker.listen('chan', 0) == [first, second]
+    assert broker.listen('chan', first.id) == [second]
+
+
+def test_listen_keeps_limited_history(broker):
+    for i in range(5):
+        broker.publish('chan', i)
+    assert [e.data for e in broker.listen('chan', 0)] == [2, 3, 4]
+
+
+def test_latest_id_is_per_channel(broker):
+    assert broker.latest_id('chan') == 0
+    first = broker.publish('chan', 'one')
+    broker.publish('other', 'two')
+    assert broker.latest_id('chan') == first.id
+
+
+def test_listen_times_out(broker):
+    assert broker.listen('chan', broker.latest_id('chan'), timeout=0.01) == []
+
+
+def test_listen_wakes_on_publish(broker):
+    timer = threading.Timer(0.05, broker.publish, args=('chan', 'late'))
+    timer.start()
+    events = broker.listen('chan', broker.latest_id('chan'), timeout=5)
+    timer.join()
+    assert [e.data for e in events] == ['late']
+
+
+def test_event_stream_replays_from_last_event_id(rf, broker):
+    first = broker.publish('chan', 'one')
+    broker.publish('chan', 'two', event='named')
+    request = rf.get('/', HTTP_LAST_EVENT_ID=str(first.id))
+    response = event_stream(request, 'chan', broker=broker, heartbeat=0.01,
+                            retry=500, max_duration=0)
+    assert response['Content-Type'] == 'text/event-stream'
+    assert response['Cache-Control'] == 'no-cache'
+    content = b''.join(response.streaming_content).decode('utf-8')
+    assert content == 'retry: 500\n\nid: 2\nevent: named\ndata: two\n\n'
+
+
+def test_event_stream_heartbeat_for_new_clients(rf, broker):
+    broker.publish('chan', 'old')
+    response = event_stream(rf.get('/'), 'chan', broker=broker,
+                            heartbeat=0.01, max_duration=0)
+    assert b''.join(response.streaming_content) == b':\n\n'
+
+
+def test_event_stream_view(rf, settings, monkeypatch):
+    settings.INTERCOOLER_HELPERS_SSE_BROKER = 'intercooler_helpers.sse.LocalBroker'
+    monkeypatch.setattr(sse, '_broker', None)
+    get_broker().publish('view-chan', 'one')
+    view = EventStreamView.as_view(channel='view-chan', heartbeat=0.01,
+                                   max_duration=0)
+    response = view(rf.get('/', data={'lastEventId': '0'}))
+    assert b''.join(response.streaming_content) == b'id: 1\ndata: one\n\n'
+
+
+@needs_async
+def test_alisten_wakes_on_publish_from_another_thread(broker):
+    timer = threading.Timer(0.05, broker.publish, args=('chan', 'late'))
+    timer.start()
+    events = _run(broker.alisten('chan', broker.latest_id('chan'),
+                                 timeout=5))
+    timer.join()
+    assert [e.data for e in events] == ['late']
+    assert broker._waiters == {}
+
+
+@needs_async
+def test_alisten_times_out(broker):
+    timer = threading.Timer(0.01, broker.publish, args=('other', 'ignored'))
+    timer.start()
+    events = _run(broker.alisten('chan', 0, timeout=0.05))
+    timer.join()
+    assert events == []
+    assert broker._waiters == {}
+
+
+@needs_async_streaming
+def test_async_event_stream_view(rf, broker, monkeypatch):
+    monkeypatch.setattr(sse, '_broker', broker)
+    broker.publish('chan', 'one')
+    view = sse.AsyncEventStreamView.as_view(channel='chan', heartbeat=0.01,
+                                            retry=500, max_duration=0)
+    response = _run(view(rf.get('/', data={'lastEventId': '0'})))
+    assert response['Content-Type'] == 'text/event-stream'
+    assert response.is_async is True
+    assert b''.join(_consume(response.streaming_content)) == \
+        b'retry: 500\n\nid: 1\ndata: one\n\n'
+
+
+@needs_async_streaming
+def test_async_event_stream_with_a_blocking_broker(rf):
+    class BlockingBroker(LocalBroker):
+        alisten = alatest_id = None
+
+    broker = BlockingBroker()
+    broker.publish('chan', 'old')
+    response = _run(sse.aevent_stream(rf.get('/'), 'chan', broker=broker,
+                                      heartbeat=0.01, max_duration=0))
+    assert b''.join(_consume(response.streaming_content)) == b':\n\n'
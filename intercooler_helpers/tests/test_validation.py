@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import pytest
+from django import forms
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views.generic import FormView
+
+from intercooler_helpers.middleware import IntercoolerData
+from intercooler_helpers.validation import (InlineValidationMixin,
+                                            field_for_request,
+                                            inline_validation, render_field,
+                                            validate_field)
+
+
+class SignupForm(forms.Form):
+    username = forms.CharField(max_length=10, help_text='Pick one')
+    password1 = forms.CharField()
+    password2 = forms.CharField()
+    age = forms.IntegerField(min_value=18)
+
+    checks = []
+
+    def clean_username(self):
+        self.checks.append(self.cleaned_data['username'])
+        if self.cleaned_data['username'] == 'taken':
+            raise forms.ValidationError('Already taken')
+        return self.cleaned_data['username'].lower()
+
+    def clean_password2(self):
+        if self.cleaned_data.get('password1') != \
+                self.cleaned_data['password2']:
+            raise forms.ValidationError("Passwords don't match")
+        return self.cleaned_data['password2']
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    SignupForm.checks = []
+    cache.clear()
+
+
+def _request(rf, data, element=None, trigger=None):
+    data = dict(data, **{'ic-request': 'true'})
+    if element is not None:
+        data['ic-element-name'] = element
+    if trigger is not None:
+        data['ic-trigger-name'] = trigger
+    request = rf.post('/signup/', data=data, HTTP_X_IC_REQUEST='true',
+                      HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    IntercoolerData().process_request(request)
+    return request
+
+
+def test_field_for_request(rf):
+    form = SignupForm(prefix='signup')
+    assert field_for_request(_request(rf, {}, element='signup-age'),
+                             form) == 'age'
+    assert field_for_request(_request(rf, {}, element='form',
+                                       trigger='signup-username'),
+                             form) == 'username'
+    assert field_for_request(_request(rf, {}, element='form'), form) is None
+    not_intercooler = rf.post('/', data={'ic-element-name': 'signup-age'})
+    IntercoolerData().process_request(not_intercooler)
+    assert field_for_request(not_intercooler, form) is None
+
+
+def test_validate_only_one_field():
+    form = SignupForm(data={'username': 'Bob', 'age': '3'})
+    assert validate_field(form, 'username') is True
+    assert form.cleaned_data == {'username': 'bob'}
+    assert dict(form.errors) == {}
+    assert validate_field(form, 'age') is False
+    assert list(form.errors) == ['age']
+
+
+def test_dependencies_are_cleaned_but_not_reported():
+    form = SignupForm(data={'password2': 'a'})
+    assert validate_field(form, 'password2', ('password1',)) is False
+    assert form.errors['password2'] == ["Passwords don't match"]
+    assert 'password1' not in form.errors
+    form = SignupForm(data={'password1': 'a', 'password2': 'a'})
+    assert validate_field(form, 'password2', ('password1',)) is True
+
+
+def test_memoized_per_value():
+    for value in ('taken', 'taken', 'free', 'taken'):
+        form = SignupForm(data={'username': value})
+        validate_field(form, 'username', memoize=60)
+    assert SignupForm.checks == ['taken', 'free']
+    assert form.errors['username'] == ['Already taken']
+    form = SignupForm(data={'username': 'free'})
+    assert validate_field(form, 'username', memoize=60) is True
+    assert form.cleaned_data['username'] == 'free'
+
+
+def test_render_field():
+    form = SignupForm(data={'username': 'taken'})
+    validate_field(form, 'username')
+    html = render_field(form, 'username')
+    assert html.startswith('<div id="id_username_container">'
+                           '<ul class="errorlist"><li>Already taken</li></ul>'
+                           '<label for="id_username">Username:</label> '
+                           '<input ')
+    assert html.endswith(' <span class="helptext">Pick one</span></div>')
+
+
+def test_inline_validation_view(rf):
+    class SignupView(InlineValidationMixin, FormView):
+        form_class = SignupForm
+        template_name = 'form.html'
+        validation_dependencies = {'password2': ('password1',)}
+
+        def form_invalid(self, form):
+            return HttpResponse('whole form')
+
+    request = _request(rf, {'password1': 'a', 'password2': 'b'},
+                       element='password2')
+    response = SignupView.as_view()(request)
+    assert b"Passwords don&#39;t match" in response.content or \
+        b"Passwords don&#x27;t match" in response.content
+    assert b'id_password2_container' in response.content
+    assert b'username' not in response.content
+    request = _request(rf, {'password1': 'a'}, element='signup-form')
+    assert SignupView.as_view()(request).content == b'whole form'
+
+
+def test_inline_validation_memoize_per_field(rf):
+    for _ in range(2):
+        request = _request(rf, {'username': 'x'}, element='username')
+        assert inline_validation(request, SignupForm(request.POST),
+                                 memoize={'username': 60}) is not None
+    assert SignupForm.checks == ['x']
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import logging
+from io import StringIO
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.core.signals import request_started
+
+from intercooler_helpers.resolver import cache_clear, cache_info
+from intercooler_helpers.warmup import find_templates, find_urls, warm_up
+
+
+def test_find_templates():
+    names = find_templates()
+    # Uses ic-* attributes, or matches INTERCOOLER_HELPERS_WARM_UP_TEMPLATES
+    assert 'polling_include.html' in names
+    assert 'polling_response.html' in names
+    # Included by one which uses ic-* attributes.
+    assert 'infinite_scrolling_partial.html' in names
+    assert 'demo_project.html' in names
+    assert 'base.html' in names
+    assert 'redirected.html' not in names
+
+
+def test_find_urls():
+    urls = find_urls(extra=['/extra/'])
+    assert urls[0] == '/extra/'
+    assert '/polling/' in urls
+    assert '/redirector/redirected/' in urls
+
+
+def test_warm_up():
+    cache_clear()
+    report = warm_up(templates=['polling_response.html', 'missing.html'],
+                     urls=['/polling/', '/nope/'])
+    assert [name for name, _ in report.templates] == ['polling_response.html']
+    assert [name for name, _ in report.errors] == ['missing.html']
+    assert list(report.timings) == ['resolver', 'discovery', 'templates',
+                                    'urls']
+    assert report.cached is False
+    assert cache_info().currsize == 2
+
+
+# request_started also closes old database connections.
+@pytest.mark.django_db
+def test_ready_is_opt_in(settings, caplog):
+    config = apps.get_app_config('intercooler_helpers')
+    with caplog.at_level(logging.INFO, logger='intercooler_helpers'):
+        config.ready()
+        request_started.send(sender=None)
+        assert caplog.records == []
+        settings.INTERCOOLER_HELPERS_WARM_UP = True
+        config.ready()
+        # The URLconf isn't touched until the first request.
+        assert caplog.records == []
+        request_started.send(sender=None)
+        assert 'Warmed up' in caplog.records[0].getMessage()
+        count = len(caplog.records)
+        request_started.send(sender=None)
+    assert len(caplog.records) == count
+
+
+def test_command():
+    out = StringIO()
+    call_command('intercooler_warm_up', 'polling_response.html',
+                 verbosity=2, stdout=out)
+    output = out.getvalue()
+    assert 'polling_response.html' in output
+    assert 'Templates: 1 compiled' in output
+    assert 'not kept' in output
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.forms import FileField
+from django.forms.utils import ErrorDict
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.encoding import force_bytes
+from django.utils.html import format_html
+
+
+__all__ = ['field_for_request', 'validate_field', 'render_field',
+           'inline_validation', 'InlineValidationMixin']
+
+
+def field_for_request(request, form):
+    """
+    The name of the field in ``form`` which triggered this Intercooler.js
+    request (from ``ic-element-name``, or failing that ``ic-trigger-name``),
+    or ``None`` if the request wasn't about a single field.
+    """
+    if not request.is_intercooler():
+        return None
+    data = request.intercooler_data
+    names = dict((form.add_prefix(name), name) for name in form.fields)
+    for html_name in (data.element.name, data.trigger.name):
+        if html_name in names:
+            return names[html_name]
+    return None
+
+
+def _raw_value(form, name):
+    field = form.fields[name]
+    if getattr(field, 'disabled', False):
+        return form.initial.get(name, field.initial)
+    return field.widget.value_from_datadict(form.data, form.files,
+                                            form.add_prefix(name))
+
+
+def _clean(form, name):
+    field = form.fields[name]
+    value = _raw_value(form, name)
+    try:
+        if isinstance(field, FileField):
+            value = field.clean(value, form.initial.get(name, field.initial))
+        else:
+            value = field.clean(value)
+        form.cleaned_data[name] = value
+        clean_method = getattr(form, 'clean_{}'.format(name), None)
+        if clean_method is not None:
+            form.cleaned_data[name] = clean_method()
+    except ValidationError as e:
+        form.add_error(name, e)
+
+
+def _cache_key(form, names):
+    parts = ['{}.{}'.format(form.__class__.__module__,
+                            form.__class__.__name__)]
+    parts.extend('{}={!r}'.format(name, _raw_value(form, name))
+                 for name in names)
+    digest = hashlib.md5(force_bytes('\n'.join(parts))).hexdigest()
+    return 'intercooler_helpers.validation.{}'.format(digest)
+
+
+def validate_field(form, name, dependencies=(), memoize=None):
+    """
+    Cleans only the field ``name`` of a bound ``form`` (running its
+    ``clean_<name>()`` method, if any), rather than the whole form, leaving
+    ``form.errors`` holding only that field's errors.
+
+    ``dependencies`` are the names of fields whose cleaned values
+    ``clean_<name>()`` uses; they're cleaned first, but their errors aren't
+    reported.
+
+    If ``memoize`` is a number of seconds, the outcome is remembered for
+    that long (in the ``INTERCOOLER_HELPERS_VALIDATION_CACHE`` cache), for
+    the same submitted values of the field and its dependencies. Only use
+    it when nothing else (eg: the current user) affects the outcome.
+    """
+    form.cleaned_data = {}
+    form._errors = ErrorDict()
+    for dependency in dependencies:
+        _clean(form, dependency)
+    form._errors = ErrorDict()
+    if memoize is None or isinstance(form.fields[name], FileField):
+        _clean(form, name)
+        return not form._errors
+    cache = caches[getattr(settings, 'INTERCOOLER_HELPERS_VALIDATION_CACHE',
+                           'default')]
+    key = _cache_key(form, (name,) + tuple(dependencies))
+    outcome = cache.get(key)
+    if outcome is None:
+        _clean(form, name)
+        if name in form._errors:
+            outcome = ('error', ValidationError(form._errors[name].data))
+        else:
+            outcome = ('ok', form.cleaned_data[name])
+        cache.set(key, outcome, memoize)
+    elif outcome[0] == 'error':
+        form.add_error(name, outcome[1])
+    else:
+        form.cleaned_data[name] = outcome[1]
+    return not form._errors
+
+
+def render_field(form, name, template_name=None, request=None):
+    """
+    The HTML for a single field, its label, help text and errors. Rendered
+    with ``template_name`` (given ``form`` and ``field``) if provided.
+    """
+    field = form[name]
+    if template_name is not None:
+        return render_to_string(template_name, {'form': form, 'field': field},
+                                request=request)
+    help_text = ''
+    if field.help_text:
+        help_text = format_html(' <span class="helptext">{}</span>',
+                                field.help_text)
+    return format_html('<div id="{}_container">{}{} {}{}</div>',
+                       field.auto_id or field.html_name, field.errors.as_ul(),
+                       field.label_tag(), field, help_text)
+
+
+def inline_validation(request, form, dependencies=None, memoize=None,
+                      template_name=None):
+    """
+    For views handling a form: if this Intercooler.js request was triggered
+    by one of ``form``'s fields, validate and render only that field, and
+    return the response. Otherwise returns ``None``, and the view should
+    carry on as usual.
+
+    ``dependencies`` maps field names to the names of fields they depend on.
+    ``memoize`` is either a number of seconds to memoize every field for, or
+    a dictionary of field names to seconds.
+    """
+    name = field_for_request(request, form)
+    if name is None:
+        return None
+    if isinstance(memoize, dict):
+        memoize = memoize.get(name)
+    validate_field(form, name, (dependencies or {}).get(name, ()),
+                   memoize=memoize)
+    return HttpResponse(render_field(form, name, template_name, request))
+
+
+class InlineValidationMixin(object):
+    """
+    For ``FormView`` and friends; Intercooler.js ``POST`` requests triggered
+    by a single field get only that field validated and rendered, via
+    ``inline_validation``. Anything else is handled as usual.
+    """
+    validation_dependencies = None
+    validation_memoize = None
+    field_template_name = None
+
+    def post(self, request, *args, **kwargs):
+        response = inline_validation(request, self.get_form(),
+                                     dependencies=self.validation_dependencies,
+                                     memoize=self.validation_memoize,
+                                     template_name=self.field_template_name)
+        if response is not None:
+            return response
+        return super(InlineValidationMixin, self).post(request, *args,
+                                                       **kwargs)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import io
+import os
+import re
+from collections import OrderedDict, namedtuple
+from fnmatch import fnmatch
+from timeit import default_timer
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+from django.template.utils import get_app_template_dirs
+try:
+    from django.urls import NoReverseMatch, get_resolver, get_urlconf, reverse
+except ImportError:  # Django <1.10
+    from django.core.urlresolvers import (NoReverseMatch, get_resolver,
+                                          get_urlconf, reverse)
+
+from .resolver import _default_maxsize, cached_resolve, resolver_cache
+try:
+    string_types = (basestring,)
+except NameError:  # Python 3
+    string_types = (str,)
+
+
+__all__ = ['WarmUpReport', 'find_templates', 'find_urls', 'warm_up']
+
+
+WarmUpReport = namedtuple('WarmUpReport', 'templates urls errors timings '
+                                          'cached')
+
+# Intercooler.js attributes, or this app's template tags.
+_INTERCOOLER = re.compile(r'\bic-[a-z-]+=|{%\s*load\s[^%]*\bintercooler\b')
+_REFERENCE = re.compile(
+    r'{%\s*(?:include|extends)\s+["\']([^"\']+)["\']')
+_VIEW_TEMPLATE_ATTRIBUTES = ('template_name', 'row_template_name',
+                             'field_template_name')
+
+
+def _django_engines():
+    return [backend.engine for backend in engines.all()
+            if isinstance(backend, DjangoTemplates)]
+
+
+def _loaders(engine):
+    for loader in engine.template_loaders:
+        # The cached loader wraps the real ones.
+        for inner in getattr(loader, 'loaders', (loader,)):
+            yield inner
+
+
+def _template_dirs(engine):
+    dirs = OrderedDict()
+    for loader in _loaders(engine):
+        get_dirs = getattr(loader, 'get_dirs', None)
+        if get_dirs is not None:
+            dirs.update((d, None) for d in get_dirs())
+    if not dirs:  # Django 1.8
+        dirs.update((d, None) for d in engine.dirs)
+        if engine.app_dirs:
+            dirs.update((d, None) for d in get_app_template_dirs('templates'))
+    return list(dirs)
+
+
+def _template_sources(engine):
+    for directory in _template_dirs(engine):
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, directory).replace(os.sep, '/')
+                try:
+                    with io.open(path, encoding=engine.file_charset,
+                                 errors='replace') as f:
+                        yield name, f.read()
+                except (IOError, OSError):
+                    continue
+
+
+def _url_patterns(patterns, namespace=''):
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            if pattern.namespace:
+                prefix = '{}{}:'.format(namespace, pattern.namespace)
+            else:
+                prefix = namespace
+            for item in _url_patterns(pattern.url_patterns, prefix):
+                yield item
+        else:
+            name = None
+            if pattern.name:
+                name = '{}{}'.format(namespace, pattern.name)
+            yield pattern, name
+
+
+def _view_templates(callback):
+    view_class = getattr(callback, 'view_class', None)
+    initkwargs = getattr(callback, 'view_initkwargs', {})
+    for attribute in _VIEW_TEMPLATE_ATTRIBUTES:
+        value = initkwargs.get(attribute, getattr(view_class, attribute, None))
+        if isinstance(value, string_types):
+            yield value
+        elif isinstance(value, (list, tuple)):
+            for name in value:
+                yield name
+
+
+def find_templates(patterns=None):
+    """
+    The names of the templates likely to be rendered for Intercooler.js
+    requests: those using Intercooler.js attributes (or ``{% load
+    intercooler %}``), those matching any of the glob ``patterns`` (default:
+    ``INTERCOOLER_HELPERS_WARM_UP_TEMPLATES``), those named by class-based
+    views in the URLconf, and everything they include or extend.
+    """
+    if patterns is None:
+        patterns = getattr(settings, 'INTERCOOLER_HELPERS_WARM_UP_TEMPLATES',
+                           ())
+    sources = {}
+    for engine in _django_engines():
+        for name, source in _template_sources(engine):
+            sources.setdefault(name, source)
+    found = OrderedDict()
+    for name in sorted(sources):
+        source = sources[name]
+        if (_INTERCOOLER.search(source) or
+                any(fnmatch(name, pattern) for pattern in patterns)):
+            found[name] = None
+    for pattern, _ in _url_patterns(get_resolver(get_urlconf()).url_patterns):
+        found.update((name, None) for name in _view_templates(
+            getattr(pattern, 'callback', None)))
+    pending = list(found)
+    while pending:
+        name = pending.pop()
+        for reference in _REFERENCE.findall(sources.get(name, '')):
+            if reference not in found:
+                found[reference] = None
+                pending.append(reference)
+    return list(found)
+
+
+def find_urls(extra=None):
+    """
+    The paths of every named URL which can be reversed without arguments,
+    plus ``extra`` (default: ``INTERCOOLER_HELPERS_WARM_UP_URLS``).
+    """
+    if extra is None:
+        extra = getattr(settings, 'INTERCOOLER_HELPERS_WARM_UP_URLS', ())
+    paths = OrderedDict((path, None) for path in extra)
+    for _, name in _url_patterns(get_resolver(get_urlconf()).url_patterns):
+        if name is None:
+            continue
+        try:
+            paths[reverse(name)] = None
+        except NoReverseMatch:
+            continue
+    return list(paths)
+
+
+def _compile_patterns(patterns):
+    for pattern in patterns:
+        # Django 2.0+ keeps the regex on .pattern
+        getattr(pattern, 'pattern', pattern).regex
+        if hasattr(pattern, 'url_patterns'):
+            _compile_patterns(pattern.url_patterns)
+
+
+def warm_up(templates=None, urls=None):
+    """
+    Compiles ``templates`` (default: ``find_templates()``) into the cached
+    template loader, builds the URL resolver's lookup tables, and primes the
+    resolver cache used by ``request.intercooler_data.url`` with ``urls``
+    (default: ``find_urls()``).
+
+    Returns a ``WarmUpReport`` of the templates compiled and how long each
+    took, the URLs resolved, any errors, how long each step took and whether
+    a cached loader exists to keep the compiled templates.
+    """
+    timings = OrderedDict()
+    start = default_timer()
+    resolver = get_resolver(get_urlconf())
+    # Populating the reverse lookups is what makes the first {% url %} slow.
+    resolver.reverse_dict
+    _compile_patterns(resolver.url_patterns)
+    timings['resolver'] = default_timer() - start
+
+    start = default_timer()
+    if templates is None:
+        templates = find_templates()
+    timings['discovery'] = default_timer() - start
+
+    start = default_timer()
+    compiled = []
+    errors = []
+    for name in templates:
+        began = default_timer()
+        try:
+            for engine in _django_engines():
+                try:
+                    engine.get_template(name)
+                except TemplateDoesNotExist:
+                    continue
+                break
+            else:
+                raise TemplateDoesNotExist(name)
+        except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+            errors.append((name, e))
+            continue
+        compiled.append((name, default_timer() - began))
+    timings['templates'] = default_timer() - start
+
+    start = default_timer()
+    if urls is None:
+        urls = find_urls()
+    maxsize = resolver_cache.maxsize
+    if maxsize is None:
+        maxsize = _default_maxsize()
+    # Any more would only push each other out of the cache.
+    urls = urls[:maxsize]
+    for path in urls:
+        cached_resolve(path)
+    timings['urls'] = default_timer() - start
+
+    cached = any(isinstance(loader, CachedLoader)
+                 for engine in _django_engines()
+                 for loader in engine.template_loaders)
+    return WarmUpReport(templates=compiled, urls=list(urls), errors=errors,
+                        timings=timings, cached=cached)
@@ -0,0 +1,361 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Simulates Intercooler.js clients against the WSGI (or ASGI) application,
+in-process, to find out how many polling, scrolling and clicking clients a
+single worker can keep up with.
+
+Each virtual client sends what Intercooler.js would (the ``X-IC-Request``
+header, an incrementing ``ic-id``, ``ic-current-url`` and so on), waits its
+interval between requests, and obeys ``X-IC-SetPollInterval`` and
+``X-IC-CancelPolling``. Under WSGI, requests are handled by ``--threads``
+threads, like a threaded worker; latency includes any time spent waiting for
+one.
+
+Needs Python 3 (and Django 3.0+ for ``--asgi``)::
+
+    python loadtest.py
+    python loadtest.py --clients polling=200,scrolling=20 --duration 30
+    python loadtest.py --app myproject.wsgi:application --path polling=/feed/
+"""
+import argparse
+import asyncio
+import heapq
+import importlib
+import io
+import itertools
+import os
+import random
+import sys
+import threading
+import timeit
+from collections import defaultdict
+from urllib.parse import urlencode
+sys.dont_write_bytecode = True
+
+
+PATTERNS = {
+    # name: (method, path, element id, seconds between requests)
+    'polling': ('GET', '/polling/', 'poller', 2.0),
+    'scrolling': ('GET', '/infinite/scrolling/', 'contactTableBody', 5.0),
+    'clicking': ('POST', '/click/', 'intro-btn', 10.0),
+}
+
+
+class Client(object):
+    """
+    One browser tab's worth of Intercooler.js, repeatedly triggering a
+    single element.
+    """
+    def __init__(self, pattern, method, path, element, interval,
+                 current_url='/'):
+        self.pattern = pattern
+        self.method = method
+        self.path = path
+        self.element = element
+        self.interval = interval
+        self.current_url = current_url
+        self.ic_id = 0
+        self.cancelled = False
+
+    def next_request(self):
+        self.ic_id += 1
+        data = urlencode({
+            'ic-request': 'true',
+            'ic-id': self.ic_id,
+            'ic-element-id': self.element,
+            'ic-target-id': self.element,
+            'ic-trigger-id': self.element,
+            'ic-current-url': self.current_url,
+        })
+        headers = {
+            'HTTP_X_IC_REQUEST': 'true',
+            'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest',
+            'HTTP_ACCEPT': 'text/html, */*; q=0.01',
+        }
+        if self.method == 'GET':
+            return self.method, self.path, data, b'', headers
+        headers['CONTENT_TYPE'] = 'application/x-www-form-urlencoded'
+        return self.method, self.path, '', data.encode('ascii'), headers
+
+    def handle_response(self, headers):
+        if headers.get('x-ic-cancelpolling') == 'true':
+            self.cancelled = True
+        interval = headers.get('x-ic-setpollinterval')
+        if interval:
+            self.interval = _parse_interval(interval, self.interval)
+
+
+def _parse_interval(value, default):
+    value = value.strip()
+    try:
+        if value.endswith('ms'):
+            return float(value[:-2]) / 1000
+        if value.endswith('s'):
+            return float(value[:-1])
+        return float(value) / 1000
+    except ValueError:
+        return default
+
+
+class Stats(object):
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.lock = threading.Lock()
+
+    def record(self, pattern, latency, status):
+        with self.lock:
+            self.latencies[pattern].append(latency)
+            self.statuses[pattern][status] += 1
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_clients(spec, paths):
+    clients = []
+    for part in spec.split(','):
+        name, _, count = part.partition('=')
+        method, path, element, interval = PATTERNS[name.strip()]
+        path = paths.get(name.strip(), path)
+        for _ in range(int(count or 1)):
+            clients.append(Client(name.strip(), method, path, element,
+                                  interval))
+    return clients
+
+
+def wsgi_environ(method, path, query, body, headers):
+    environ = {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    environ.update(headers)
+    return environ
+
+
+def call_wsgi(app, method, path, query, body, headers):
+    captured = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        captured['status'] = int(status.split(' ', 1)[0])
+        captured['headers'] = dict((key.lower(), value)
+                                   for key, value in response_headers)
+
+    result = app(wsgi_environ(method, path, query, body, headers),
+                 start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return captured['status'], captured['headers']
+
+
+def run_wsgi(app, clients, duration, threads, stats):
+    """
+    Each client's next request is queued for when it's due; ``threads``
+    threads take requests off the queue as they become due, as a threaded
+    server's workers would.
+    """
+    start = timeit.default_timer()
+    deadline = start + duration
+    counter = itertools.count()
+    queue = []
+    for client in clients:
+        # Spread the first requests over the first interval.
+        due = start + random.uniform(0, client.interval)
+        heapq.heappush(queue, (due, next(counter), client))
+    condition = threading.Condition()
+
+    def worker():
+        while True:
+            with condition:
+                while True:
+                    if not queue:
+                        return
+                    due, _, client = queue[0]
+                    if due >= deadline:
+                        return
+                    wait = due - timeit.default_timer()
+                    if wait <= 0:
+                        heapq.heappop(queue)
+                        break
+                    condition.wait(wait)
+            status, headers = call_wsgi(app, *client.next_request())
+            finished = timeit.default_timer()
+            stats.record(client.pattern, finished - due, status)
+            client.handle_response(headers)
+            if not client.cancelled:
+                with condition:
+                    heapq.heappush(queue, (finished + client.interval,
+                                           next(counter), client))
+                    condition.notify()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return timeit.default_timer() - start
+
+
+async def call_asgi(app, method, path, query, body, headers):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode('ascii'),
+        'query_string': query.encode('ascii'),
+        'root_path': '',
+        'headers': [(key[5:].replace('_', '-').lower().encode('latin-1')
+                     if key.startswith('HTTP_') else
+                     key.replace('_', '-').lower().encode('latin-1'),
+                     value.encode('latin-1'))
+                    for key, value in headers.items()],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    sent = False
+    captured = {}
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            captured['status'] = message['status']
+            captured['headers'] = dict(
+                (key.decode('latin-1').lower(), value.decode('latin-1'))
+                for key, value in message.get('headers', ()))
+
+    await app(scope, receive, send)
+    return captured['status'], captured['headers']
+
+
+async def run_asgi(app, clients, duration, stats):
+    start = timeit.default_timer()
+    deadline = start + duration
+
+    async def run_client(client):
+        due = start + random.uniform(0, client.interval)
+        while due < deadline and not client.cancelled:
+            await asyncio.sleep(max(0, due - timeit.default_timer()))
+            status, headers = await call_asgi(app, *client.next_request())
+            finished = timeit.default_timer()
+            stats.record(client.pattern, finished - due, status)
+            client.handle_response(headers)
+            due = finished + client.interval
+
+    await asyncio.gather(*(run_client(client) for client in clients))
+    return timeit.default_timer() - start
+
+
+def load_app(path, asgi):
+    if path is None:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_settings")
+        if asgi:
+            import django
+            django.setup()
+            from django.core.asgi import get_asgi_application
+            return get_asgi_application()
+        path = 'demo_project:application'
+    module, _, attr = path.partition(':')
+    return getattr(importlib.import_module(module), attr or 'application')
+
+
+def report(stats, clients, elapsed):
+    row = "{name:<10} {clients:>7} {requests:>9} {rps:>9} {p50:>9} " \
+          "{p90:>9} {p99:>9} {max:>9} {errors:>7} {cancelled:>9}"
+    print(row.format(name='pattern', clients='clients', requests='requests',
+                     rps='req/s', p50='p50 ms', p90='p90 ms', p99='p99 ms',
+                     max='max ms', errors='errors', cancelled='cancelled'))
+    names = sorted(set(client.pattern for client in clients))
+    everything = []
+    for name in names + ['total']:
+        if name == 'total':
+            latencies = sorted(everything)
+            ours = clients
+            statuses = defaultdict(int)
+            for counts in stats.statuses.values():
+                for status, count in counts.items():
+                    statuses[status] += count
+        else:
+            latencies = sorted(stats.latencies[name])
+            everything.extend(latencies)
+            ours = [client for client in clients if client.pattern == name]
+            statuses = stats.statuses[name]
+        errors = sum(count for status, count in statuses.items()
+                     if status >= 500)
+        print(row.format(
+            name=name, clients=len(ours), requests=len(latencies),
+            rps='{:.1f}'.format(len(latencies) / elapsed),
+            p50='{:.1f}'.format(_percentile(latencies, 0.5) * 1000),
+            p90='{:.1f}'.format(_percentile(latencies, 0.9) * 1000),
+            p99='{:.1f}'.format(_percentile(latencies, 0.99) * 1000),
+            max='{:.1f}'.format((latencies[-1] if latencies else 0) * 1000),
+            errors=errors,
+            cancelled=sum(1 for client in ours if client.cancelled)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--app', default=None,
+                        help="module:attribute of the application "
+                             "(default: demo_project)")
+    parser.add_argument('--asgi', action='store_true',
+                        help="the application is ASGI rather than WSGI")
+    parser.add_argument('--clients', default='polling=50,scrolling=5,'
+                                             'clicking=5',
+                        help="how many of each pattern ({})".format(
+                            ', '.join(sorted(PATTERNS))))
+    parser.add_argument('--path', action='append', default=[],
+                        metavar='PATTERN=PATH',
+                        help="request PATH for PATTERN instead")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--threads', type=int, default=4,
+                        help="WSGI worker threads")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    paths = dict(path.split('=', 1) for path in args.path)
+    clients = make_clients(args.clients, paths)
+    app = load_app(args.app, args.asgi)
+    stats = Stats()
+    if args.asgi:
+        elapsed = asyncio.run(run_asgi(app, clients, args.duration, stats))
+    else:
+        elapsed = run_wsgi(app, clients, args.duration, args.threads, stats)
+    report(stats, clients, elapsed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -58,6 +58,9 @@ setup(
     long_description=LONG_DESCRIPTION,
     packages=[
         "intercooler_helpers",
+        "intercooler_helpers.templatetags",
+        "intercooler_helpers.management",
+        "intercooler_helpers.management.commands",
     ],
     include_package_data=True,
     install_requires=[
@@ -67,10 +67,15 @@ MIDDLEWARE_CLASSES = (
     'intercooler_helpers.middleware.IntercoolerData',
     'intercooler_helpers.middleware.IntercoolerRedirector',
 )
+# Django 1.10+
+MIDDLEWARE = MIDDLEWARE_CLASSES
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'test_collectstatic')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'test_media')
 
 USE_TZ = True
 
+# Fragments which don't use any Intercooler.js attributes themselves.
+INTERCOOLER_HELPERS_WARM_UP_TEMPLATES = ('*_response.html',)
+
 SILENCED_SYSTEM_CHECKS = ['1_8.W001']
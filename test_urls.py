@@ -9,6 +9,9 @@ from django.http import HttpResponse, Http404
 from django.shortcuts import redirect
 from django.template.defaultfilters import pluralize
 from django.template.response import TemplateResponse
+
+from intercooler_helpers.batch import BatchView
+from intercooler_helpers.response import IntercoolerTemplateResponse
 try:
     from django.urls import reverse
 except ImportError:  # Django <1.10
@@ -85,13 +88,14 @@ def polling(request):
 
 
 def infinite_scrolling(request):
+    # Intercooler.js requests only get the content block, rather than the
+    # whole page.
     template = "infinite_scrolling.html"
-    if request.is_intercooler():
-        template = "infinite_scrolling_include.html"
     context = {
         'rows': _page_data(),
     }
-    return TemplateResponse(request, template=template, context=context)
+    return IntercoolerTemplateResponse(request, template=template,
+                                       context=context, block='content')
 
 
 def root(request):
@@ -112,6 +116,7 @@ urlpatterns = [
     url('^polling/start/$', polling_start, name='polling_start'),
     url('^polling/$', polling, name='polling'),
     url('^infinite/scrolling/$', infinite_scrolling, name='infinite_scrolling'),
+    url('^batch/$', BatchView.as_view(), name='batch'),
     url('^$', root, name='root'),
 ]
 